@@ -1,3 +1,50 @@
-from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from config import models
+from config.tests import FrameTestCase
+
+
+class UpcomingItemDisplayTestCase(FrameTestCase):
+    ITEMS = 10
+
+    def setUp(self):
+        super().setUp()
+        self._display = models.Display.objects.create(user=self._user, frame=self._frame, name='Display', description='', enabled=True)
+        self._client = APIClient()
+        self._client.force_authenticate(user=self._user)
+
+    def _upcoming(self, count):
+        _response = self._client.get(reverse('display_item_upcoming-list', args=[self._display.id]), {'count': count})
+        self.assertEqual(200, _response.status_code)
+        return [_item['id'] for _item in _response.data['results']]
+
+    def _reserved(self):
+        self._display.refresh_from_db()
+        return self._display.items_reserved
+
+    def test_reserved(self):
+        _first = self._upcoming(4)
+        self.assertEqual(4, len(set(_first)))
+        self.assertEqual(_first, self._reserved()['items'])
+        _second = self._upcoming(4)
+        self.assertFalse(set(_first) & set(_second))
+        self.assertEqual(_first + _second, self._reserved()['items'])
+        self.assertEqual(set([_item.id for _item in self._items]) - set(_first + _second), set(self._upcoming(4)))
+
+    def test_reserved_frame_changed(self):
+        self._upcoming(8)
+        models.Frame.increase_version(self._frame.id)
+        _second = self._upcoming(8)
+        self.assertEqual(8, len(_second))
+        self.assertEqual(_second, self._reserved()['items'])
+        self.assertEqual(self._frame.version + 1, self._reserved()['version'])
+
+    def test_reserved_display(self):
+        _other = models.Display.objects.create(user=self._frame.user, frame=self._frame, name='Other', description='', enabled=True)
+        self._upcoming(8)
+        self.assertIsNone(models.Display.objects.get(pk=_other.id).items_reserved)
+        _response = self._client.get(reverse('display_item_upcoming-list', args=[_other.id]), {'count': 8})
+        self.assertEqual(8, len(_response.data['results']))
 
-# Create your tests here.
@@ -4,7 +4,7 @@ import mimetypes
 from django.shortcuts import render
 from django.utils import timezone
 from django.db.models import Q
-from django.http import StreamingHttpResponse
+from django.http import StreamingHttpResponse, FileResponse
 from rest_framework import generics, viewsets, mixins, permissions, serializers, decorators, response
 from rest_framework.exceptions import NotFound
 from rest_framework.renderers import JSONRenderer
@@ -78,9 +78,9 @@ class FrameSerializer(BaseSerializer):
 
     class Meta:
         model = models.Frame
-        fields = BaseSerializer.Meta.fields + ('name', 'description', 'enabled')
-        read_only_fields = BaseSerializer.Meta.read_only_fields
-        map_fields = BaseSerializer.Meta.fields
+        fields = BaseSerializer.Meta.fields + ('name', 'description', 'enabled', 'version', 'load_downscale')
+        read_only_fields = BaseSerializer.Meta.read_only_fields + ('version',)
+        map_fields = BaseSerializer.Meta.fields + ('version',)
 
     def get_links(self, obj):
         return super().get_links(obj) + (
@@ -193,9 +193,9 @@ class ItemDisplaySerializer(BaseSerializer):
 
     class Meta:
         model = models.Item
-        fields = BaseSerializer.Meta.fields + ('date_creation', 'url',)
-        read_only_fields = BaseSerializer.Meta.read_only_fields
-        map_fields = BaseSerializer.Meta.fields + ('url',)
+        fields = BaseSerializer.Meta.fields + ('date_creation', 'url', 'version')
+        read_only_fields = BaseSerializer.Meta.read_only_fields + ('version',)
+        map_fields = BaseSerializer.Meta.fields + ('url', 'version')
 
     def get_links(self, obj):
         _display_id = self.get_kwargs().get('display_id')
@@ -453,6 +453,11 @@ class ItemDisplayViewSet(BaseViewSet):
     @decorators.action(detail=True, url_path='download', url_name='display_item_all_download')
     def download(self, request, display_id, pk):
         _item = self.get_object()
+        _cache = utils.Network.download_cache(server=True)
+        if _cache:
+            _file, _mime = _cache.download(_item.url, lambda url, headers: utils.Network.get_url(
+                url, utils.Network.METHOD_GET, headers=headers, stream=True))
+            return FileResponse(open(_file, 'rb'), content_type=_mime or 'application/octet-stream')
         _response = utils.Network.get_url(_item.url, utils.Network.METHOD_GET, stream=True)
         return StreamingHttpResponse(
             (_chunk for _chunk in _response.iter_content(1024*64)),
@@ -495,7 +500,7 @@ class NextItemDisplayViewSet(BaseViewSet):  # BaseDetailView
         _frames = self.qs().frames.filter(display__id=_display_id)
         if len(_frames) == 0:
             raise NotFound()
-        _processor = sorting.Processor(sorting.Context(_frames[0], random_item=True))
+        _processor = sorting.Processor(sorting.Context(_frames[0], random_item=True, display_id=int(_display_id)))
         _result = _processor.process()
         _items = list(_result['items'])
         if self.request.query_params.get('hit', '0') == '1' and len(_items) > 0:
@@ -517,6 +522,38 @@ class NextItemDisplayViewSet(BaseViewSet):  # BaseDetailView
         return _items
 
 
+class UpcomingItemDisplayViewSet(BaseViewSet):
+    serializer_class = RankedItemDisplaySerializer
+    COUNT_DEFAULT = 10
+    COUNT_MAX = 50
+
+    def get_queryset(self, *args, **kwargs):
+        _display_id = self.kwargs.get('display_id')
+        _displays = self.qs().displays.filter(pk=_display_id).select_related('frame')
+        if len(_displays) == 0 or _displays[0].frame is None:
+            raise NotFound()
+        _display = _displays[0]
+        _frame = _display.frame
+        try:
+            _count = int(self.request.query_params.get('count', UpcomingItemDisplayViewSet.COUNT_DEFAULT))
+        except ValueError:
+            _count = UpcomingItemDisplayViewSet.COUNT_DEFAULT
+        _count = max(1, min(_count, UpcomingItemDisplayViewSet.COUNT_MAX))
+
+        # Items handed out recently are excluded as the display most likely did
+        # not show all of them yet - reset when the frame changed as the display
+        # drops its queue then too
+        _reserved = _display.items_reserved
+        if not _reserved or _reserved.get('version') != _frame.version:
+            _reserved = {'version': _frame.version, 'items': []}
+        _processor = sorting.Processor(sorting.Context(_frame, random_item=True, random_count=_count, exclude=set(_reserved['items']), display_id=_display.id))
+        _result = _processor.process()
+        _items = list(_result['items'])
+        _reserved['items'] = (_reserved['items'] + [_item.id for _item in _items])[-UpcomingItemDisplayViewSet.COUNT_MAX:]
+        models.Display.objects.filter(pk=_display.id).update(items_reserved=_reserved)
+        return _items
+
+
 class FinishingDisplayViewSet(BaseViewSet):
     serializer_class = FinishingDisplaySerializer
     
@@ -23,11 +23,12 @@ class CreateFrameForm(base.BaseModelForm):
 class UpdateFrameForm(base.BaseModelForm):
     class Meta:
         model = models.Frame
-        fields = ['name', 'description', 'enabled']
+        fields = ['name', 'description', 'enabled', 'load_downscale']
         widgets = {
             'name': base.charFieldWidget(),
             'description': base.textareaFieldWidget(),
             'enabled': base.booleanFieldWidget(),
+            'load_downscale': base.booleanFieldWidget(),
         }
 
 
@@ -83,7 +84,7 @@ class SourceStepForm(BasePluginForm):
     class Meta:
         model = models.SourceStep
         fields = []
-        untangled_fields = ['title', 'description', 'instance', 'data_in', 'mime_in', 'merge_in', 'data_out', 'mime_out', 'loop_out']
+        untangled_fields = ['title', 'description', 'instance', 'data_in', 'mime_in', 'merge_in', 'data_out', 'mime_out', 'loop_out', 'concurrency']
         widgets = {
             'title': base.charFieldWidget(),
             'description': base.textareaFieldWidget(),
@@ -94,6 +95,7 @@ class SourceStepForm(BasePluginForm):
             'data_out': base.charFieldWidget(),
             'mime_out': base.selectFieldWidget(choices=models.MIME_CHOICES),
             'loop_out': base.booleanFieldWidget(),
+            'concurrency': base.charFieldWidget(),
         }
 
 
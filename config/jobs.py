@@ -6,7 +6,7 @@ from django.db.models import Q, F, functions
 from framarama import jobs
 from framarama.base import utils
 from config import models
-from config.utils import source as source_util, finishing
+from config.utils import source as source_util, sorting, finishing
 
 logger = logging.getLogger(__name__)
 
@@ -14,9 +14,13 @@ logger = logging.getLogger(__name__)
 class Scheduler(jobs.Scheduler):
     CFG_SOURCE_UPDATE = 'cfg_source_update'
     CFG_ITEM_THUMBNAIL = 'cfg_item_thumbnail'
+    CFG_FRAME_RANK = 'cfg_frame_rank'
+    CFG_FRAME_RANK_CHECK = 'cfg_frame_rank_check'
 
     def configure(self):
         self.register_job(Scheduler.CFG_SOURCE_UPDATE, self.source_update, minutes=1, name='Config source updates')
+        self.register_job(Scheduler.CFG_FRAME_RANK, self.frame_rank, manually=True, name='Update frame ranking')
+        self.register_job(Scheduler.CFG_FRAME_RANK_CHECK, self.frame_rank_check, minutes=1, name='Check frame rankings')
         self.register_job(Scheduler.CFG_ITEM_THUMBNAIL, self.item_thumbnail, manually=True, name='Generate item thumbnail')
         self.enable_jobs()
         self.trigger_job(Scheduler.CFG_SOURCE_UPDATE)
@@ -65,6 +69,36 @@ class Scheduler(jobs.Scheduler):
     def run_source_update(self, source):
         _processor = source_util.Processor(source_util.Context(source.frame, source, source.frame.get_variables()))
         _processor.process()
+        self.frame_rank_schedule(source.frame)
+
+    def frame_rank_schedule(self, frame, postpone=True):
+        # Changes often come in batches (e.g. editing several sortings), so
+        # the ranking is updated once after no more changes were scheduled
+        _delay = utils.DateTime.delta(settings.FRAMARAMA['CONFIG_SORTING_RANK_DELAY'])
+        if not postpone:
+            # Reading an outdated ranking must not postpone a pending update
+            _job_id = self._job_id(Scheduler.CFG_FRAME_RANK, frame.id)
+            if self.get_job(_job_id) or self.running_jobs(Scheduler.CFG_FRAME_RANK, instance=frame.id):
+                return _job_id
+        return self.debounce_job(Scheduler.CFG_FRAME_RANK, instance=frame.id, delay=_delay.total_seconds() if _delay else 0, frame_id=frame.id)
+
+    def frame_rank(self, frame_id):
+        _frame = models.Frame.objects.filter(pk=frame_id).first()
+        if _frame is None:
+            return
+        sorting.Processor(sorting.Context(_frame)).rank_update()
+
+    def frame_rank_check(self):
+        # Update outdated rankings of frames in use which were not updated
+        # after a change (e.g. after a restart) or reached the maximum age
+        _outdated = Q(rank_version__isnull=True) | ~Q(rank_version=F('version'))
+        _max_age = utils.DateTime.delta(settings.FRAMARAMA['CONFIG_SORTING_RANK_MAX_AGE'])
+        if _max_age:
+            _outdated = _outdated | Q(rank_date__lt=utils.DateTime.now() - _max_age)
+        _frames = models.Frame.objects.filter(_outdated, enabled=True, display__enabled=True).distinct()
+        for _frame in _frames:
+            if self.running_jobs(Scheduler.CFG_FRAME_RANK, instance=_frame.id) == 0:
+                self.frame_rank(_frame.id)
 
     def item_thumbnail(self, item):
         logger.info("Generating thumbnail for {}".format(item))
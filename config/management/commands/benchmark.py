@@ -0,0 +1,234 @@
+import io
+import os
+import time
+import ctypes
+import tempfile
+import logging
+import multiprocessing
+
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+
+from framarama.base import utils
+from config import models
+from config.utils import source, context, sorting, finishing
+from config.utils.data import DataType, DataContainer
+
+
+class Command(BaseCommand):
+    help = 'Run benchmarks for performance critical parts using synthetic data'
+    BENCHMARKS = ['import', 'template', 'sampler', 'decode', 'adapters']
+    ADAPTERS = ['config.utils.finishing.WandImageProcessingAdapter', 'config.utils.finishing.PillowImageProcessingAdapter']
+    SAMPLE_SIZES = [(4000, 3000), (6000, 4000), (8000, 6000)]
+
+    def add_arguments(self, parser):
+        parser.add_argument('benchmark', choices=Command.BENCHMARKS, help='Name of benchmark to run')
+        parser.add_argument('--count', type=int, default=100000, help='Amount of synthetic items to use (default 100000)')
+        parser.add_argument('--image', action='append', default=[], help='Sample image to decode (can be repeated, default synthetic JPEGs)')
+        parser.add_argument('--size', default='1280x800', help='Display size to use as decode hint (default 1280x800)')
+        parser.add_argument('--adapter', action='append', default=[], help='Image processing adapter to use (can be repeated, default all)')
+        parser.add_argument('--verbose-log', action='store_true', help='Do not silence application logging while running')
+
+    def handle(self, *args, **options):
+        if not options['verbose_log']:
+            logging.disable(logging.INFO)
+        try:
+            getattr(self, '_benchmark_' + options['benchmark'])(options)
+        finally:
+            logging.disable(logging.NOTSET)
+
+    def _measure(self, name, count, func):
+        _start = time.perf_counter()
+        _result = func()
+        _duration = time.perf_counter() - _start
+        self.stdout.write('{:<40} {:>10.3f}s {:>12.1f} items/s'.format(name, _duration, count / _duration if _duration else 0))
+        return _result
+
+    def _memory(self, name):
+        with open('/proc/self/status') as f:
+            return next(int(_line.split()[1]) for _line in f if _line.startswith(name + ':'))
+
+    def _measure_memory(self, name, count, func):
+        # Run in forked process to get the peak memory usage of the function only
+        _context = multiprocessing.get_context('fork')
+        _queue = _context.Queue()
+        def _run():
+            try:
+                ctypes.CDLL(None).malloc_trim(0)  # release memory freed before forking to not reuse it
+                utils.Filesystem.file_write('/proc/self/clear_refs', b'5')  # reset peak (VmHWM) to current usage
+                _rss = self._memory('VmRSS')
+                _start = time.perf_counter()
+                func()
+                _queue.put((time.perf_counter() - _start, self._memory('VmHWM') - _rss, None))
+            except Exception as e:
+                _queue.put((None, None, str(e)))
+        _process = _context.Process(target=_run)
+        _process.start()
+        _duration, _rss, _error = _queue.get()
+        _process.join()
+        if _error:
+            self.stdout.write('{:<40} failed: {}'.format(name, _error))
+        else:
+            self.stdout.write('{:<40} {:>10.3f}s {:>12.1f} items/s {:>10.1f} MB peak'.format(
+                name, _duration, count / _duration if _duration else 0, _rss / 1024))
+
+    def _user(self):
+        _username = 'benchmark-{}'.format(int(time.time()))
+        return get_user_model().objects.create(username=_username)
+
+    def _benchmark_import(self, options):
+        _count = options['count']
+        _user = self._user()
+        try:
+            _frame = models.Frame.objects.create(user=_user, name='Benchmark', description='Benchmark', enabled=False)
+            _source = models.Source.objects.create(
+                frame=_frame, name='Benchmark', enabled=False,
+                map_item_id_ext='id', map_item_url='url', map_item_date_creation='date')
+            _processor = source.Processor(source.Context(_frame, _source))
+            def _rows(start, end):
+                return DataContainer([{
+                    'id': str(_i),
+                    'url': 'https://localhost/benchmark/{}.jpg'.format(_i),
+                    'date': '2024-01-01T00:00:00',
+                } for _i in range(start, end)], data_type=DataType(DataType.TYPE, 'dict'))
+            _changed = int(_count / 10)
+            for _name, _data, _items in [
+                ('Initial import (create)', _rows(0, _count), _count),
+                ('Repeated import (update)', _rows(0, _count), _count),
+                ('Partial import (create/update/delete)', _rows(_changed, _count + _changed), _count + _changed),
+                ('Empty import (delete)', _rows(0, 0), _count),
+            ]:
+                _stats = self._measure(_name, _items, lambda: _processor._process_items_update(_source, _data))
+                self.stdout.write('  {} created, {} updated, {} deleted, {} errors'.format(
+                    _stats['create'], _stats['update'], _stats['delete'], len(_stats['errors'])))
+        finally:
+            _user.delete()
+
+    def _benchmark_sampler(self, options):
+        _picks = 1000
+        _user = self._user()
+        try:
+            for _count in [int(options['count'] / 10), options['count'], options['count'] * 10]:
+                self.stdout.write('{} items'.format(_count))
+                _frame = models.Frame.objects.create(user=_user, name='Benchmark', description='Benchmark', enabled=False)
+                _source = models.Source.objects.create(frame_id=_frame.id, name='Benchmark', enabled=False, map_item_url='url')
+                _now = utils.DateTime.now()
+                for _chunk in utils.Lists.chunked(range(_count), 10000):
+                    models.Item.objects.bulk_create([models.Item(
+                        frame_id=_frame.id, source_id=_source.id, url='https://localhost/benchmark/{}.jpg'.format(_i),
+                        date_creation=_now, created=_now, updated=_now) for _i in _chunk], batch_size=1000)
+                _processor = sorting.Processor(sorting.Context(_frame, random_item=True))
+                self._measure('  Ranking update', _count, lambda: _processor.rank_update(force=True))
+                self._measure('  Ranking query (live)', 10, lambda: [
+                    list(sorting.Processor(sorting.Context(_frame, random_item=True, sortings=[])).process()['items']) for _i in range(10)])
+                self._measure('  Ranking lookup (SQL)', _picks, lambda: [_processor._rank_random_items_query(_frame) for _i in range(_picks)])
+                _sampler = self._measure('  Sampler load', _count, lambda: sorting.Sampler.load(_frame))
+                self._measure('  Sampler pick', _picks, lambda: [_sampler.sample(1) for _i in range(_picks)])
+                self._measure('  Sampler pick (10 items)', _picks * 10, lambda: [_sampler.sample(10) for _i in range(_picks)])
+                self._measure('  Sampler pick with items', _picks, lambda: [_processor._rank_random_items_sampler(_sampler, 1) for _i in range(_picks)])
+                _frame.delete()
+        finally:
+            _user.delete()
+
+    def _sample_image(self, width, height):
+        try:
+            _pil_image = utils.Classes.load('PIL.Image')
+        except ImportError:
+            with utils.Classes.load('wand.image').Image(width=width, height=height, pseudo='plasma:') as _image:
+                _image.format = 'jpeg'
+                return _image.make_blob()
+        _bands = [
+            _pil_image.linear_gradient('L').resize((width, height)),
+            _pil_image.radial_gradient('L').resize((width, height)),
+            _pil_image.effect_noise((width, height), 32)]
+        _data = io.BytesIO()
+        _pil_image.merge('RGB', _bands).save(_data, 'JPEG', quality=90)
+        return _data.getvalue()
+
+    def _sample_images(self, options):
+        _images = [(os.path.basename(_file), utils.Filesystem.file_read(_file)) for _file in options['image']]
+        if not _images:
+            _images = [('Synthetic {}x{}'.format(_width, _height), self._sample_image(_width, _height)) for _width, _height in Command.SAMPLE_SIZES]
+        return _images
+
+    def _adapters(self, names):
+        _adapters = []
+        for _name in names:
+            try:
+                _adapters.append(utils.Classes.load(_name, fqcn=True)())
+            except ImportError as e:
+                self.stdout.write('{} not available: {}'.format(_name, e))
+        return _adapters
+
+    def _benchmark_decode(self, options):
+        _repeat = 3
+        _width, _height = [int(_value) for _value in options['size'].split('x')]
+        _size_hint = finishing.Size(_width, _height)
+        _adapters = self._adapters(options['adapter']) if options['adapter'] else [finishing.ImageProcessingAdapter.get_default()]
+        def _decode(adapter, data, size_hint):
+            for _i in range(_repeat):
+                _image = adapter.image_open(data, size_hint=size_hint)
+                _meta = adapter.image_meta(_image)
+                adapter.image_close(_image)
+            return _meta
+        for _name, _data in self._sample_images(options):
+            self.stdout.write('{} ({} bytes)'.format(_name, len(_data)))
+            for _adapter in _adapters:
+                for _title, _hint in [('Full resolution', None), ('Size hint {}x{}'.format(_width, _height), _size_hint)]:
+                    _meta = _decode(_adapter, _data, _hint)
+                    self._measure_memory('  {} {} ({}x{})'.format(type(_adapter).__name__.replace('ImageProcessingAdapter', ''), _title, _meta['width'], _meta['height']), _repeat, lambda: _decode(_adapter, _data, _hint))
+
+    def _reference_finishings(self, frame, width, height):
+        # Common finishings: fit to display, slightly rotated with text and border
+        _finishings = [
+            ('resize', {'resize_x': width, 'resize_y': height, 'keep_aspect': True}),
+            ('transform', {'mode': 'rotate', 'factor': 2}),
+            ('transform', {'mode': 'blur', 'factor': 1.5}),
+            ('shape', {'shape': 'rectangle', 'color_stroke': 'white', 'color_fill': 'black', 'color_alpha': 40, 'stroke_width': 4,
+                'start_x': 20, 'start_y': height - 100, 'size_x': width - 40, 'size_y': 80}),
+            ('text', {'text': 'Benchmark 2024-01-01', 'size': 48, 'color_stroke': 'white', 'color_fill': 'black', 'alignment': 'center', 'rotate': 5,
+                'start_x': int(width / 2), 'start_y': height - 40, 'border': 2, 'border_alpha': 50, 'border_padding': 10}),
+        ]
+        return [models.Finishing(
+            frame=frame, enabled=True, depth=1, ordering=_i, title=_plugin, plugin=_plugin, plugin_config=_config
+        ) for _i, (_plugin, _config) in enumerate(_finishings)]
+
+    def _benchmark_adapters(self, options):
+        _repeat = 3
+        _width, _height = [int(_value) for _value in options['size'].split('x')]
+        _display = models.Display(name='Benchmark', enabled=True, device_width=_width, device_height=_height)
+        _frame = models.Frame(name='Benchmark', enabled=True)
+        _finishings = self._reference_finishings(_frame, _width, _height)
+        _adapters = self._adapters(options['adapter'] if options['adapter'] else Command.ADAPTERS)
+        def _process(adapter, filename):
+            for _i in range(_repeat):
+                _context = finishing.Context(_display, _frame, [], models.Item(url=filename), _finishings, {}, adapter)
+                with _context:
+                    finishing.Processor(_context).process()
+        with tempfile.TemporaryDirectory() as _path:
+            for _name, _data in self._sample_images(options):
+                self.stdout.write('{} ({} bytes)'.format(_name, len(_data)))
+                _file = os.path.join(_path, 'sample.jpg')
+                utils.Filesystem.file_write(_file, _data)
+                for _adapter in _adapters:
+                    self._measure_memory('  {}'.format(type(_adapter).__name__), _repeat, lambda: _process(_adapter, _file))
+
+    def _benchmark_template(self, options):
+        _count = options['count']
+        _ctx = context.Context()
+        _ctx.set_resolver('item', context.ResultValue({'id': 'abc', 'width': 1920, 'height': 1080}))
+        _static = {'font': 'DejaVu Sans', 'size': '24', 'color': 'white', 'position': 'bottom'}
+        _templated = {'text': 'Item {{ item.id }}', 'size': '{{ item.height / 40 }}', 'color': 'white', 'position': 'bottom'}
+        def _uncached(expr):
+            # previous behaviour: new environment and template compilation for each value
+            _env = utils.Template._env(undefined=utils.Template.IgnoreUndefined)
+            _env.globals.update(_ctx._resolvers)
+            return {_k: _env.from_string(_v).render() for _k, _v in expr.items()}
+        _plan = context.EvaluationPlan(_templated)
+        for _name, _func in [
+            ('Static values', lambda: _ctx.evaluate(_static)),
+            ('Templated values (cached)', lambda: _ctx.evaluate(_templated)),
+            ('Templated values (uncached)', lambda: _uncached(_templated)),
+            ('Templated values (evaluation plan)', lambda: _plan.evaluate(_ctx._resolvers)),
+        ]:
+            self._measure(_name, _count, lambda: [_func() for _i in range(_count)])
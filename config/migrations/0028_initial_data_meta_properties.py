@@ -5,11 +5,13 @@ from config.utils import finishing
 
 
 def forward(apps, schema_editor):
-    _adapter = finishing.ImageProcessingAdapter.get_default()
+    _adapter = None
     model = apps.get_model('config', 'Data')
     for row in model.objects.all():
         if row.meta and 'width' in row.meta:
             continue
+        if _adapter is None:
+            _adapter = finishing.ImageProcessingAdapter.get_default()
         _image = _adapter.image_open(row.data_file.path)
         _meta = _adapter.image_meta(_image)
         _row_meta = {
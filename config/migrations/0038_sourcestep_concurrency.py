@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-18 13:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('config', '0037_displayitem_count_error_displayitem_date_last_error_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sourcestep',
+            name='concurrency',
+            field=models.PositiveIntegerField(default=1, help_text='Amount of input results processed in parallel (e.g. to fetch multiple URLs at once)', verbose_name='Parallel processing'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.27 on 2026-10-18 13:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('config', '0038_sourcestep_concurrency'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='frame',
+            name='rank_date',
+            field=models.DateTimeField(help_text='Date when the materialized ranking was calculated', null=True, verbose_name='Ranking date'),
+        ),
+        migrations.AddField(
+            model_name='frame',
+            name='rank_version',
+            field=models.IntegerField(help_text='The version of the frame the materialized ranking was calculated for', null=True, verbose_name='Ranking version'),
+        ),
+        migrations.CreateModel(
+            name='ItemRank',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.FloatField(help_text='Cumulative weight of all items up to this item', verbose_name='Rank')),
+                ('weight', models.FloatField(help_text='Calculated weight of this item', verbose_name='Weight')),
+                ('frame', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ranks', to='config.frame')),
+                ('item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='ranking', to='config.item')),
+            ],
+            options={
+                'db_table': 'config_item_rank',
+                'indexes': [models.Index(fields=['frame', 'rank'], name='config_item_frame_i_73b942_idx')],
+            },
+        ),
+    ]
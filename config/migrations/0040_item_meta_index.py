@@ -0,0 +1,29 @@
+# Generated by Django 4.2.27 on 2026-10-18 14:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('config', '0039_frame_rank'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='itemmeta',
+            index=models.Index(fields=['name', 'value_text'], name='config_item_name_398139_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='itemmeta',
+            index=models.Index(fields=['name', 'value_int'], name='config_item_name_a5ac56_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='itemmeta',
+            index=models.Index(fields=['name', 'value_date'], name='config_item_name_a2046c_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='itemmeta',
+            constraint=models.UniqueConstraint(fields=('item', 'name'), name='config_item_meta_item_name_uniq'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.27 on 2026-10-18 14:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('config', '0040_item_meta_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='frame',
+            name='rank_count',
+            field=models.IntegerField(help_text='Amount of items contained in the materialized ranking', null=True, verbose_name='Ranking items'),
+        ),
+        migrations.AddField(
+            model_name='frame',
+            name='rank_duration',
+            field=models.DurationField(help_text='Time it took to calculate the materialized ranking', null=True, verbose_name='Ranking duration'),
+        ),
+    ]
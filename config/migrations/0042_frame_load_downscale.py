@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-18 14:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('config', '0041_frame_rank_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='frame',
+            name='load_downscale',
+            field=models.BooleanField(default=False, help_text='Decode images already close to the display size when loading them (uses less memory, finishings get a smaller image).', verbose_name='Downscale on load'),
+        ),
+    ]
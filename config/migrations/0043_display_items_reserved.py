@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-18 14:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('config', '0042_frame_load_downscale'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='display',
+            name='items_reserved',
+            field=models.JSONField(blank=True, editable=False, help_text='Items handed out to the display in advance', null=True, verbose_name='Reserved items'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-18 15:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('config', '0043_display_items_reserved'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='display',
+            name='items_shuffle',
+            field=models.JSONField(blank=True, editable=False, help_text='Permutation of the frame items currently shown', null=True, verbose_name='Shuffled items'),
+        ),
+    ]
@@ -90,6 +90,21 @@ class Data(BaseModel):
         _instance.meta = meta if meta else {}
         return _instance
 
+    @classmethod
+    def delete_bulk(cls, queryset):
+        _files = [_name for _name in queryset.values_list('data_file', flat=True) if _name]
+        queryset.delete()
+        return _files
+
+    @classmethod
+    def delete_files(cls, files):
+        _storage = Data._meta.get_field('data_file').storage
+        for _name in files:
+            try:
+                _storage.delete(_name)
+            except Exception as e:
+                logger.warning("Could not delete file {}: {}".format(_name, e))
+
     @classmethod
     def post_delete(cls, sender, instance, entity, *args, **kwargs):
         logger.debug("Delete from {} for {}: {}".format(sender, instance, entity))
@@ -47,6 +47,12 @@ class Display(BaseModel):
     access_key = models.CharField(
         max_length=64, blank=True, null=True,
         verbose_name='Key', help_text='A secret access token to access data for display.')
+    items_reserved = models.JSONField(
+        blank=True, null=True, editable=False,
+        verbose_name='Reserved items', help_text='Items handed out to the display in advance')
+    items_shuffle = models.JSONField(
+        blank=True, null=True, editable=False,
+        verbose_name='Shuffled items', help_text='Permutation of the frame items currently shown')
 
     def get_latest_status(self, count=None):
         _latest = self.status.order_by('id').reverse()
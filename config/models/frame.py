@@ -1,4 +1,5 @@
 import re
+import datetime
 
 from django.db import models
 from django.conf import settings
@@ -40,6 +41,25 @@ class Frame(BaseModel):
     version = models.IntegerField(
         default=0,
         verbose_name='Update version', help_text='The version number increasing on each update')
+    load_downscale = models.BooleanField(
+        default=False,
+        verbose_name='Downscale on load', help_text='Decode images already close to the display size when loading them (uses less memory, finishings get a smaller image).')
+    rank_version = models.IntegerField(
+        null=True,
+        verbose_name='Ranking version', help_text='The version of the frame the materialized ranking was calculated for')
+    rank_date = models.DateTimeField(
+        null=True,
+        verbose_name='Ranking date', help_text='Date when the materialized ranking was calculated')
+    rank_duration = models.DurationField(
+        null=True,
+        verbose_name='Ranking duration', help_text='Time it took to calculate the materialized ranking')
+    rank_count = models.IntegerField(
+        null=True,
+        verbose_name='Ranking items', help_text='Amount of items contained in the materialized ranking')
+
+    @staticmethod
+    def increase_version(frame_id, using=None):
+        Frame.objects.using(using).filter(pk=frame_id).update(version=models.F('version') + 1)
 
     def get_last_update(self):
         _max = self.sources.aggregate(models.Max('update_date_start'))
@@ -98,7 +118,7 @@ class Source(BaseModel):
 
 
 class SourceStep(PluginModel):
-    STR_FIELDS = PluginModel.STR_FIELDS + ["title", "instance", "data_in", "mime_in", "merge_in", "data_out", "mime_out", "loop_out"]
+    STR_FIELDS = PluginModel.STR_FIELDS + ["title", "instance", "data_in", "mime_in", "merge_in", "data_out", "mime_out", "loop_out", "concurrency"]
 
     CAT_NETWORK = 'network'
     CAT_DATA = 'data'
@@ -133,6 +153,9 @@ class SourceStep(PluginModel):
     loop_out = models.BooleanField(
         default=False,
         verbose_name='Iterate output results separately', help_text='Use results as one or iterate over the results data rows separately')
+    concurrency = models.PositiveIntegerField(
+        default=1,
+        verbose_name='Parallel processing', help_text='Amount of input results processed in parallel (e.g. to fetch multiple URLs at once)')
 
     class Meta:
         db_table = 'config_source_step'
@@ -186,8 +209,23 @@ class RankedItem(Item):
         managed = False
 
 
+class ItemRank(models.Model):
+    ''' Materialized ranking of items used for selecting the next item '''
+    frame = models.ForeignKey(Frame, on_delete=models.CASCADE, related_name='ranks')
+    item = models.OneToOneField(Item, on_delete=models.CASCADE, related_name='ranking')
+    rank = models.FloatField(
+        verbose_name='Rank', help_text='Cumulative weight of all items up to this item')
+    weight = models.FloatField(
+        verbose_name='Weight', help_text='Calculated weight of this item')
+
+    class Meta:
+        db_table = 'config_item_rank'
+        indexes = [models.Index(fields=['frame', 'rank'])]
+
+
 class ItemMeta(BaseModel):
     STR_FIELDS = BaseModel.STR_FIELDS + ["name", "value_text", "value_int", "value_date"]
+    VALUE_FIELDS = {'str': 'value_text', 'int': 'value_int', 'date': 'value_date'}
 
     item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='meta')
     name = models.CharField(
@@ -205,6 +243,29 @@ class ItemMeta(BaseModel):
 
     class Meta:
         db_table = 'config_item_meta'
+        constraints = [models.UniqueConstraint(fields=['item', 'name'], name='config_item_meta_item_name_uniq')]
+        indexes = [
+            models.Index(fields=['name', 'value_text']),
+            models.Index(fields=['name', 'value_int']),
+            models.Index(fields=['name', 'value_date']),
+        ]
+
+    @staticmethod
+    def get_values(value):
+        ''' Returns the value fields to store the given value '''
+        _values = {'value_text': None, 'value_int': None, 'value_date': None}
+        if isinstance(value, datetime.datetime):
+            _values['value_date'] = value
+        elif isinstance(value, int):
+            _values['value_int'] = value
+        elif value is not None:
+            _values['value_text'] = str(value)[0:255]
+        return _values
+
+    @staticmethod
+    def value(name, value_type='str'):
+        ''' Returns an expression for the meta value of items with the given name '''
+        return models.Subquery(ItemMeta.objects.filter(item=models.OuterRef('pk'), name=name).values(ItemMeta.VALUE_FIELDS[value_type]))
 
 
 class Sorting(PluginModel):
@@ -228,6 +289,12 @@ class Sorting(PluginModel):
         ordering = ['-weight']
 
 
+@receiver(models.signals.post_save, sender=Sorting)
+@receiver(models.signals.post_delete, sender=Sorting)
+def post_change_sorting(sender, instance, *args, **kwargs):
+    Frame.increase_version(instance.frame_id)
+
+
 class Finishing(TreePluginModel):
     STR_FIELDS = PluginModel.STR_FIELDS + ["title", "image_in", "image_out", "enabled"]
 
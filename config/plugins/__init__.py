@@ -1,5 +1,6 @@
 import pkgutil
 import logging
+import threading
 import collections
 
 from rest_framework import serializers
@@ -38,6 +39,7 @@ class Plugin:
         self.descr = self.impl.DESCR
         self._model = self.impl.Model
         self._instances = {}
+        self._lock = threading.Lock()
 
     def create_model(self):
         return self._model()
@@ -67,12 +69,16 @@ class Plugin:
     def run(self, *args, **kwargs):
         return self._run_instance('__default__', lambda instance: instance.run(*args, **kwargs))
 
+    def get_image_names(self, *args, **kwargs):
+        return self._run_instance('__default__', lambda instance: instance.get_image_names(*args, **kwargs))
+
     def run_instance(self, instance, *args, **kwargs):
          return self._run_instance(instance, lambda instance: instance.run(*args, **kwargs))
 
     def _run_instance(self, instance, func):
-        if instance not in self._instances:
-            self._instances[instance] = self.impl()
+        with self._lock:
+            if instance not in self._instances:
+                self._instances[instance] = self.impl()
         return func(self._instances[instance])
 
 
@@ -92,6 +98,9 @@ class PluginContext:
         self._variables[name].append(_new_variables)
         self.set_resolver(name, self._variables[name][-1])
 
+    def get_variables(self, name='globals'):
+        return self._variables[name][-1] if name in self._variables else {}
+
     def pop_variables(self, name):
         self._variables[name].pop()
         self.set_resolver(name, self._variables[name][-1])
@@ -102,6 +111,9 @@ class PluginContext:
     def evaluate(self, expr):
         return self._context.evaluate(expr)
 
+    def evaluate_config(self, model):
+        return self._context.evaluate_config(model)
+
     def evaluate_model(self, model):
         return self._context.evaluate_model(model)
 
@@ -288,6 +300,7 @@ class SourcePluginRegistry(PluginRegistry):
 
 class SourcePluginImplementation(PluginImplementation):
     Model = models.SourceStep
+    CONDITIONAL = False  # reports via set_modified() if fetched data changed
 
 
 class SortingPluginRegistry(PluginRegistry):
@@ -327,11 +340,19 @@ class ContextPluginRegistry(PluginRegistry):
 class ContextPluginImplementation(PluginImplementation):
     Model = models.FrameContext
 
-    def get_images(self, ctx, names, default=True):
+    def get_image_names(self, config):
+        ''' Returns the names of images the plugin depends on (None for all images) '''
+        return None
+
+    def image_names(self, names, default=True):
         _names = ['default'] if default else []
-        _names.extend(names.split(' '))
+        if names:
+            _names.extend(names.split(' '))
+        return _names
+
+    def get_images(self, ctx, names, default=True):
         _images = {}
-        for _name in _names:
+        for _name in self.image_names(names, default):
             _image = ctx.get_image_data(_name)
             if _image:
                 _images[_name] = _image
@@ -31,6 +31,9 @@ class Implementation(ContextPluginImplementation):
     
     Form = ExifForm
 
+    def get_image_names(self, config):
+        return self.image_names(config.image.as_str())
+
     def run(self, model, config, image, ctx):
         _image = config.image.as_str()
 
@@ -39,7 +42,7 @@ class Implementation(ContextPluginImplementation):
         _default = {}
         _additional = {}
         for _name, _img in self.get_images(ctx, _image).items():
-            _image_exif = _adapter.image_exif(_img) if _img.get_images() else {}
+            _image_exif = _adapter.image_exif_meta(_img)
             if _name == 'default':
                 _default = _image_exif
             else:
@@ -154,6 +154,9 @@ class Implementation(ContextPluginImplementation):
             self._cache[_key] = _json
         return self._cache[_key]
 
+    def get_image_names(self, config):
+        return self.image_names(config.image.as_str())
+
     def run(self, model, config, image, ctx):
         _image = config.image.as_str()
 
@@ -162,7 +165,7 @@ class Implementation(ContextPluginImplementation):
         _default = {}
         _additional = {}
         for _name, _img in self.get_images(ctx, _image).items():
-            _image_exif = _adapter.image_exif(_img) if _img.get_images() else {}
+            _image_exif = _adapter.image_exif_meta(_img)
 
             _image_geo = self._lookup(self._geo(_image_exif))
             if _name == 'default':
@@ -30,6 +30,9 @@ class Implementation(ContextPluginImplementation):
 
     Form = VariablesForm
 
+    def get_image_names(self, config):
+        return []
+
     def run(self, model, config, image, ctx):
         return {config.name.as_str(): context.EvaluatedResolver(ctx, context.MapResolver(config.variables))}
 
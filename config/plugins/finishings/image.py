@@ -42,7 +42,10 @@ class Implementation(FinishingPluginImplementation):
         _url = config.url.as_str()
         _color_fill = finishing.Color(config.color_fill.as_str()) if config.color_fill.as_str() else None
         _color_alpha = config.color_alpha.as_int()
-        _image = _adapter.image_open(_url, _color_fill)
+        _size_hint = None
+        if config.size_hint_width.as_int() and config.size_hint_height.as_int():
+            _size_hint = finishing.Size(config.size_hint_width.as_int(), config.size_hint_height.as_int())
+        _image = _adapter.image_open(_url, _color_fill, _size_hint)
         if _color_alpha:
             _adapter.image_alpha(_image, _color_fill, _color_alpha)
         return _image
@@ -45,7 +45,8 @@ class Implementation(SourcePluginImplementation):
         
         if _template_out:
             _data_out_dict = _data_out.get_as_dict()
-            _output = utils.Template.render(_template_out, globals_vars={'data': _data_out_dict.get() if _data_out_dict else {}})
+            _data = data.DataConverter.materialize(_data_out_dict.get()) if _data_out_dict else {}
+            _output = utils.Template.render(_template_out, globals_vars={'data': _data})
             
             _data_out = data.DataContainer(data=_output, data_type=data.DataType(data.DataType.MIME, _mime_out))
         
@@ -1,13 +1,17 @@
+import os
 import json
+import time
 import requests
 import hashlib
 import logging
+import itertools
+import concurrent.futures
 
 from django import forms
 from django.conf import settings
 
 from framarama.base import forms as base, api, utils
-from config.models import SourceStep
+from config.models import SourceStep, Data
 from config.plugins import SourcePluginImplementation
 from config.forms.frame import SourceStepForm
 from config.utils import data, finishing
@@ -30,31 +34,146 @@ class DirectoryForm(SourceStepForm):
     field_order = SourceStepForm.Meta.untangled_fields + Meta.entangled_fields['plugin_config']
 
 
+class FileIndex:
+    ''' Persistent index of extracted file information '''
+    VERSION = 1
+
+    def __init__(self, filename):
+        self._filename = filename
+        self._entries = {}
+        self._seen = {}
+        self._stats = {'scanned': 0, 'reused': 0, 'parsed': 0}
+        try:
+            if utils.Filesystem.file_exists(filename):
+                _index = utils.Json.to_dict(utils.Filesystem.file_read(filename))
+                if _index.get('version') == FileIndex.VERSION:
+                    self._entries = _index.get('entries', {})
+        except Exception as e:
+            logger.warning("Ignoring broken file index {}: {}".format(filename, e))
+
+    @staticmethod
+    def signature(filename):
+        _stat = os.stat(filename)
+        return [_stat.st_size, _stat.st_mtime_ns, _stat.st_ino]
+
+    def lookup(self, filename):
+        _signature = FileIndex.signature(filename)
+        _entry = self._entries.get(filename)
+        self._stats['scanned'] = self._stats['scanned'] + 1
+        if _entry and _entry['signature'] == _signature and _entry['values'] is not None:
+            self._stats['reused'] = self._stats['reused'] + 1
+            self._seen[filename] = _entry
+            return _entry['values']
+        self._seen[filename] = {'signature': _signature, 'values': None}
+        return None
+
+    def update(self, filename, values):
+        self._seen[filename]['values'] = values
+        self._stats['parsed'] = self._stats['parsed'] + 1
+
+    def get(self, filename, func):
+        _values = self.lookup(filename)
+        if _values is None:
+            _values = func(filename)
+            self.update(filename, _values)
+        return _values
+
+    def get_stats(self):
+        return self._stats
+
+    def is_modified(self):
+        return self._stats['parsed'] > 0 or len(self._seen) != len(self._entries)
+
+    def save(self):
+        utils.Filesystem.path_create(os.path.dirname(self._filename))
+        _tmp = self._filename + '.tmp'
+        utils.Filesystem.file_write(_tmp, utils.Json.from_dict({
+            'version': FileIndex.VERSION,
+            'entries': self._seen,
+        }).encode())
+        os.replace(_tmp, self._filename)
+        self._entries = self._seen
+        self._seen = {}
+
+
+def file_info(root, filename):
+    _exif = finishing.ImageProcessingAdapter.image_exif_read(filename)
+    if 'datetime' not in _exif:
+        _adapter = finishing.ImageProcessingAdapter.get_default()
+        _image = _adapter.image_open(filename)
+        _exif = _adapter.image_exif(_image)
+        _adapter.image_close(_image)
+    return {
+        'id': hashlib.md5(filename.encode()).hexdigest(),
+        'url': filename.replace(root, ''),
+        'date': utils.DateTime.format(utils.DateTime.parse(_exif['datetime'])),
+    }
+
+
 class Implementation(SourcePluginImplementation):
     CAT = SourceStep.CAT_DIR
     TITLE = 'Directory'
     DESCR = 'Read media files from directory'
+    FILES_PER_WORKER = 32
     
     Form = DirectoryForm
     
     def run(self, model, config, data_in, ctx):
-        _adapter = finishing.ImageProcessingAdapter.get_default()
         _root = settings.FRAMARAMA['MEDIA_PATH'] + '/'
         _path = utils.Filesystem.path_normalize(config.path.as_str(), root=_root, absolute=True)
         _filter_files = config.filter_files.as_str() if config.filter_files.as_str() else '.*\.(jpg|JPG)'
+        _index = Data.path(['source', 'dir', '{}.json'.format(model.id)])
+        _state = {'reported': False}
+        _files = data.DataIterable(lambda: self._files(ctx, _state, _index, _root, _path, _filter_files))
+        return [data.DataContainer(_files, data_type=data.DataType(data.DataType.TYPE, 'dict'))]
 
-        logger.info('Reading {} (filter "{}")'.format(_path, _filter_files))
-        _files = []
-        for _file, _dummy in utils.Filesystem.file_match(_path, _filter_files, files=True, dirs=False, recurse=True):
-            _filename = _root + _file
-            _image = _adapter.image_open(_filename)
-            _exif = _adapter.image_exif(_image)
-            _adapter.image_close(_image);
-            _files.append({
-                'id': hashlib.md5(_filename.encode()).hexdigest(),
-                'url': _filename.replace(_root, ''),
-                'date': utils.DateTime.format(utils.DateTime.parse(_exif['datetime'])),
-            })
+    def _workers(self):
+        _workers = settings.FRAMARAMA['CONFIG_SOURCE_DIR_WORKERS']
+        return _workers if _workers else os.cpu_count() or 1
 
-        return [data.DataContainer(_files, data_type=data.DataType(data.DataType.TYPE, 'dict'))]
+    def _files(self, ctx, state, index, root, path, filter_files):
+        _workers = self._workers()
+        _index = FileIndex(index)
+        _start = time.perf_counter()
+
+        logger.info('Reading {} (filter "{}", {} workers)'.format(path, filter_files, _workers))
+        _files = [root + _file for _file, _dummy in utils.Filesystem.file_match(path, filter_files, files=True, dirs=False, recurse=True)]
+        _duration = time.perf_counter() - _start
+
+        # Files are passed to the workers in chunks, results are returned in
+        # order and only the chunk currently processed is kept in memory
+        _executor = concurrent.futures.ThreadPoolExecutor(max_workers=_workers) if _workers > 1 else None
+        try:
+            for _chunk in utils.Lists.chunked(_files, _workers * Implementation.FILES_PER_WORKER):
+                _start = time.perf_counter()
+                _values = [_index.lookup(_filename) for _filename in _chunk]
+                _parse = [_filename for _filename, _value in zip(_chunk, _values) if _value is None]
+                if _executor and len(_parse) > 1:
+                    _parsed = list(_executor.map(file_info, itertools.repeat(root), _parse, chunksize=max(1, len(_parse) // (_workers * 4))))
+                else:
+                    _parsed = [file_info(root, _filename) for _filename in _parse]
+                _parsed = dict(zip(_parse, _parsed))
+                for _filename, _value in _parsed.items():
+                    _index.update(_filename, _value)
+                _values = [_value if _value is not None else _parsed[_filename] for _filename, _value in zip(_chunk, _values)]
+                _duration = _duration + time.perf_counter() - _start
+                yield from _values
+        finally:
+            if _executor:
+                _executor.shutdown(cancel_futures=True)
+        _modified = _index.is_modified()
+        if _modified:
+            _index.save()
+        if state['reported']:
+            return
+        state['reported'] = True
+        ctx.set_modified(_modified)
 
+        _stats = _index.get_stats()
+        _status = 'Files: {} scanned ({} reused, {} parsed, {:.1f} files/s)'.format(
+            _stats['scanned'],
+            _stats['reused'],
+            _stats['parsed'],
+            _stats['scanned'] / _duration if _duration else 0)
+        logger.info(_status)
+        ctx.add_status(_status)
@@ -1,12 +1,15 @@
+import os
 import cgi
 import json
+import hashlib
 import requests
 import logging
+import threading
 
 from django import forms
 
-from framarama.base import forms as base, api
-from config.models import SourceStep
+from framarama.base import forms as base, api, utils
+from config.models import SourceStep, Data
 from config.plugins import SourcePluginImplementation
 from config.forms.frame import SourceStepForm
 from config.utils import data
@@ -57,15 +60,65 @@ class HttpForm(SourceStepForm):
     field_order = SourceStepForm.Meta.untangled_fields + Meta.entangled_fields['plugin_config']
 
 
+class ResponseCache:
+    ''' Cache of responses to send conditional requests '''
+
+    def __init__(self, path):
+        self._path = path
+
+    def key(self, args):
+        if args['method'] != api.ApiClient.METHOD_GET or 'data' in args:
+            return None
+        return hashlib.md5(args['url'].encode()).hexdigest()
+
+    def get(self, key):
+        if key is None:
+            return None
+        _filename = os.path.join(self._path, key + '.json')
+        if not utils.Filesystem.file_exists(_filename):
+            return None
+        try:
+            return utils.Json.to_dict(utils.Filesystem.file_read(_filename))
+        except Exception as e:
+            logger.warning("Ignoring broken cache entry {}: {}".format(_filename, e))
+        return None
+
+    def conditions(self, entry):
+        _headers = {}
+        if entry.get('etag'):
+            _headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            _headers['If-Modified-Since'] = entry['last_modified']
+        return _headers
+
+    def read(self, key):
+        return utils.Filesystem.file_read(os.path.join(self._path, key + '.data'))
+
+    def store(self, key, url, response):
+        _entry = {
+            'url': url,
+            'etag': response.headers.get('etag'),
+            'last_modified': response.headers.get('last-modified'),
+            'content_type': response.headers.get('content-type'),
+        }
+        if key is None or (_entry['etag'] is None and _entry['last_modified'] is None):
+            return
+        utils.Filesystem.path_create(self._path)
+        utils.Filesystem.file_write(os.path.join(self._path, key + '.data'), response.content)
+        utils.Filesystem.file_write(os.path.join(self._path, key + '.json'), utils.Json.from_dict(_entry).encode())
+
+
 class Implementation(SourcePluginImplementation):
     CAT = SourceStep.CAT_NETWORK
     TITLE = 'HTTP'
     DESCR = 'Fetch data using HTTP protocol'
+    CONDITIONAL = True
     
     Form = HttpForm
     
     def __init__(self):
         self._cookies = {}
+        self._lock = threading.Lock()
 
     def _args(self, model, config, data_in):
         _url = config.url.as_str()
@@ -88,7 +141,8 @@ class Implementation(SourcePluginImplementation):
         _args = {}
         _args["url"] = self.format_field(_url, _url_formatted, _data.get() if _data else {})
         _args["method"] = _api_methods[_method] if _method in _api_methods else api.ApiClient.METHOD_GET
-        _args["cookies"] = self._cookies
+        with self._lock:
+            _args["cookies"] = dict(self._cookies)
         _args["headers"] = {}
 
         if _body:
@@ -107,17 +161,29 @@ class Implementation(SourcePluginImplementation):
 
     def run(self, model, config, data_in, ctx):
         _args = self._args(model, config, data_in)
+        _cache = ResponseCache(Data.path(['source', 'http', str(model.id)]))
+        _key = _cache.key(_args)
+        _cached = _cache.get(_key)
+        if _cached:
+            _args["headers"].update(_cache.conditions(_cached))
         logger.info("Loading {}".format(_args["url"]))
         _response = api.ApiClient.get().get_url(**_args)
-        if _response:
+        if _response.status_code == 304 and _cached:
+            logger.info("Not modified, using cached response")
+            ctx.set_modified(False)
+            _content_type = _cached['content_type']
+            _content = _cache.read(_key)
+        elif _response:
+            ctx.set_modified(True)
             _content_type = _response.headers['content-type'] if 'content-type' in _response.headers else None
-            _mime_type = cgi.parse_header(_content_type)[0] if _content_type is not None else None
-
-            self._cookies.update(requests.utils.dict_from_cookiejar(_response.cookies))
-
-            return [data.DataContainer(_response.content, data_type=data.DataType(data.DataType.MIME, _mime_type), conv=data.NoopDataConverter())]
+            _content = _response.content
+            _cache.store(_key, _args["url"], _response)
         else:
             logger.error("Request returned non-success status code: {}".format(_response))
+            return []
 
-        return []
+        with self._lock:
+            self._cookies.update(requests.utils.dict_from_cookiejar(_response.cookies))
 
+        _mime_type = cgi.parse_header(_content_type)[0] if _content_type is not None else None
+        return [data.DataContainer(_content, data_type=data.DataType(data.DataType.MIME, _mime_type), conv=data.NoopDataConverter())]
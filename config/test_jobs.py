@@ -0,0 +1,41 @@
+from django import test
+from django.conf import settings
+from django.utils import timezone
+
+from config.jobs import Scheduler
+from config.tests import FrameTestCase
+
+
+class SchedulerTestCase(FrameTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self._scheduler = Scheduler()
+        self._scheduler.register_job(Scheduler.CFG_FRAME_RANK, self._scheduler.frame_rank, manually=True, name='Update frame ranking')
+
+    @test.override_settings(FRAMARAMA={**settings.FRAMARAMA, 'CONFIG_SORTING_RANK_DELAY': '00:00:30'})
+    def test_frame_rank_schedule(self):
+        _job_id = self._scheduler.frame_rank_schedule(self._frame)
+        _job = self._scheduler.get_job(_job_id)
+        self.assertEqual({'frame_id': self._frame.id}, _job.kwargs)
+        self.assertAlmostEqual(30, (_job.trigger.run_date - timezone.now()).total_seconds(), delta=2)
+        self.assertEqual(_job_id, self._scheduler.frame_rank_schedule(self._frame))
+        self.assertEqual([_job_id], [_job.id for _job in self._scheduler._scheduler.get_jobs()])
+
+    @test.override_settings(FRAMARAMA={**settings.FRAMARAMA, 'CONFIG_SORTING_RANK_DELAY': '00:00:30'})
+    def test_frame_rank_schedule_pending(self):
+        _job_id = self._scheduler.frame_rank_schedule(self._frame)
+        _run_date = self._scheduler.get_job(_job_id).trigger.run_date
+        self.assertEqual(_job_id, self._scheduler.frame_rank_schedule(self._frame, postpone=False))
+        self.assertEqual(_run_date, self._scheduler.get_job(_job_id).trigger.run_date)
+
+    @test.override_settings(FRAMARAMA={**settings.FRAMARAMA, 'CONFIG_SORTING_RANK_DELAY': None})
+    def test_frame_rank_schedule_no_delay(self):
+        _job = self._scheduler.get_job(self._scheduler.frame_rank_schedule(self._frame))
+        self.assertAlmostEqual(0, (_job.trigger.run_date - timezone.now()).total_seconds(), delta=2)
+
+    def test_frame_rank(self):
+        self._scheduler.frame_rank(self._frame.id)
+        self._frame.refresh_from_db()
+        self.assertEqual(self._frame.version, self._frame.rank_version)
+        self._scheduler.frame_rank(0)  # deleted frames are ignored
@@ -0,0 +1,29 @@
+from config import models
+from config.tests import FrameTestCase
+
+
+class QuerySetRandomTestCase(FrameTestCase):
+
+    def test_empty(self):
+        self.assertIsNone(models.Item.objects.filter(frame=self._frame).random())
+
+    def test_sparse(self):
+        # Objects following large gaps are picked more likely
+        self._create_items([1, 2, 50000, 100000], pk=True)
+        _picked = set(models.Item.objects.filter(frame=self._frame).random().id for _i in range(100))
+        self.assertTrue(_picked.issubset({1, 2, 50000, 100000}))
+        self.assertEqual({50000, 100000}, _picked & {50000, 100000})
+
+    def test_filtered(self):
+        self._create_items([1, 5, 10, 50, 100], pk=True)
+        _queryset = models.Item.objects.filter(frame=self._frame, id__in=[5, 50])
+        _picked = set(_queryset.random().id for _i in range(100))
+        self.assertEqual({5, 50}, _picked)
+
+    def test_filtered_empty(self):
+        self._create_items([1, 5], pk=True)
+        self.assertIsNone(models.Item.objects.filter(frame=self._frame, url='/missing.jpg').random())
+
+    def test_single(self):
+        self._create_items([42], pk=True)
+        self.assertEqual(42, models.Item.objects.filter(frame=self._frame).random().id)
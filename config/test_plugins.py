@@ -1,5 +1,6 @@
 import os
 import datetime
+import tempfile
 
 from unittest import TestCase
 from django import forms
@@ -7,13 +8,13 @@ from django.db import connection, models as fields
 
 from framarama.base import forms as base
 from framarama.base.models import PluginModel
-from config import plugins, models
+from config import plugins, models, test_utils_exif
 from config.forms.base import BasePluginForm
 from config.forms.frame import ContextForm
 from config.plugins.contexts import exif
 from config.plugins.finishings import shape
 from config.plugins.sortings import custom
-from config.plugins.sources import http
+from config.plugins.sources import http, dir
 
 
 class PluginRegistryTestCase(TestCase):
@@ -119,6 +120,144 @@ class SourcePluginRegistryTestCase(BasePluginRegistryTestCase, TestCase):
         return http.HttpForm.Meta.model(plugin=self._plugin(), **kwargs)
 
 
+class DirSourceFileIndexTestCase(TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._index = self._tmp.name + '/index/1.json'
+        self._file = self._tmp.name + '/image.jpg'
+        with open(self._file, 'wb') as f:
+            f.write(b'image')
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_reuse(self):
+        _index = dir.FileIndex(self._index)
+        self.assertEqual({'value': 1}, _index.get(self._file, lambda filename: {'value': 1}))
+        _index.save()
+        _index = dir.FileIndex(self._index)
+        self.assertEqual({'value': 1}, _index.get(self._file, lambda filename: {'value': 2}))
+        self.assertEqual({'scanned': 1, 'reused': 1, 'parsed': 0}, _index.get_stats())
+        self.assertFalse(_index.is_modified())
+
+    def test_changed(self):
+        _index = dir.FileIndex(self._index)
+        _index.get(self._file, lambda filename: {'value': 1})
+        _index.save()
+        with open(self._file, 'ab') as f:
+            f.write(b' changed')
+        _index = dir.FileIndex(self._index)
+        self.assertEqual({'value': 2}, _index.get(self._file, lambda filename: {'value': 2}))
+        self.assertEqual({'scanned': 1, 'reused': 0, 'parsed': 1}, _index.get_stats())
+        self.assertTrue(_index.is_modified())
+
+    def test_removed(self):
+        _index = dir.FileIndex(self._index)
+        _index.get(self._file, lambda filename: {'value': 1})
+        _index.save()
+        _index.save()
+        _index = dir.FileIndex(self._index)
+        self.assertEqual({'value': 2}, _index.get(self._file, lambda filename: {'value': 2}))
+
+    def test_broken(self):
+        os.makedirs(os.path.dirname(self._index))
+        with open(self._index, 'w') as f:
+            f.write('{broken')
+        _index = dir.FileIndex(self._index)
+        self.assertEqual({'value': 1}, _index.get(self._file, lambda filename: {'value': 1}))
+
+
+class DirSourceFilesTestCase(TestCase):
+
+    class Context:
+        def __init__(self):
+            self.status = []
+            self.modified = []
+
+        def add_status(self, status):
+            self.status.append(status)
+
+        def set_modified(self, modified):
+            self.modified.append(modified)
+
+    class Implementation(dir.Implementation):
+        WORKERS = 1
+
+        def _workers(self):
+            return self.WORKERS
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._root = self._tmp.name + '/media/'
+        self._index = self._tmp.name + '/index/1.json'
+        os.makedirs(self._root)
+        _jpeg = test_utils_exif.ExifReaderTestCase()._jpeg()
+        for _i in range(10):
+            with open(self._root + 'image{:02d}.jpg'.format(_i), 'wb') as f:
+                f.write(_jpeg)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _files(self, workers, ctx, state):
+        _plugin = DirSourceFilesTestCase.Implementation()
+        _plugin.WORKERS = workers
+        return list(_plugin._files(ctx, state, self._index, self._root, self._root, '.*\\.(jpg)'))
+
+    def test_parallel(self):
+        _ctx = DirSourceFilesTestCase.Context()
+        _files = self._files(4, _ctx, {'reported': False})
+        self.assertEqual(['image{:02d}.jpg'.format(_i) for _i in range(10)], [_file['url'] for _file in _files])
+        self.assertEqual(self._files(1, _ctx, {'reported': False}), _files)
+
+    def test_report_once(self):
+        _ctx = DirSourceFilesTestCase.Context()
+        _state = {'reported': False}
+        self._files(4, _ctx, _state)
+        self._files(4, _ctx, _state)
+        self.assertEqual([True], _ctx.modified)
+        self.assertEqual(1, len(_ctx.status))
+        self.assertIn('10 parsed', _ctx.status[0])
+
+
+class HttpSourceResponseCacheTestCase(TestCase):
+
+    class Response:
+        def __init__(self, headers, content):
+            self.headers = headers
+            self.content = content
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._cache = http.ResponseCache(self._tmp.name + '/cache')
+        self._args = {'url': 'https://localhost/list.json', 'method': 'GET'}
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_key(self):
+        self.assertIsNotNone(self._cache.key(self._args))
+        self.assertNotEqual(self._cache.key(self._args), self._cache.key(dict(self._args, url='https://localhost/other.json')))
+        self.assertIsNone(self._cache.key(dict(self._args, method='POST')))
+        self.assertIsNone(self._cache.key(dict(self._args, data='{}')))
+
+    def test_store(self):
+        _key = self._cache.key(self._args)
+        self.assertIsNone(self._cache.get(_key))
+        self._cache.store(_key, self._args['url'], HttpSourceResponseCacheTestCase.Response({
+            'etag': '"abc"', 'last-modified': 'Mon, 01 Jan 2024 00:00:00 GMT', 'content-type': 'application/json'}, b'[]'))
+        _entry = self._cache.get(_key)
+        self.assertEqual({'If-None-Match': '"abc"', 'If-Modified-Since': 'Mon, 01 Jan 2024 00:00:00 GMT'}, self._cache.conditions(_entry))
+        self.assertEqual('application/json', _entry['content_type'])
+        self.assertEqual(b'[]', self._cache.read(_key))
+
+    def test_store_uncacheable(self):
+        _key = self._cache.key(self._args)
+        self._cache.store(_key, self._args['url'], HttpSourceResponseCacheTestCase.Response({'content-type': 'application/json'}, b'[]'))
+        self.assertIsNone(self._cache.get(_key))
+
+
 class GeoContextPluginTestCase(TestCase):
 
   def test_empty(self):
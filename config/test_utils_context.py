@@ -138,6 +138,56 @@ class ContextTestCase(TestCase):
         self.assertEqual('aceh', _context.evaluate('{{test.key|keys|join}}'))
 
 
+class EvaluationPlanTestCase(TestCase):
+
+    class Model:
+        def __init__(self, pk, updated, config):
+            self.pk = pk
+            self.updated = updated
+            self.config = config
+
+        def get_config(self):
+            return self.config
+
+    def test_evaluate(self):
+        _config = {'size': 10, 'text': 'Hello {{test.name}}', 'list': ['a', '{{test.name}}'], 'none': None}
+        _plan = context.EvaluationPlan(_config)
+        self.assertFalse(_plan.is_static())
+        _context = context.Context()
+        for _name in ['first', 'second']:
+            _context.set_resolver('test', context.MapResolver({'name': _name}))
+            self.assertEqual(
+                _context.evaluate(_config),
+                _plan.evaluate(_context._resolvers))
+        self.assertEqual('Hello second', _plan.evaluate(_context._resolvers)['text'])
+        self.assertEqual(10, _plan.evaluate(_context._resolvers)['size'].as_int())
+        self.assertIsNone(_plan.evaluate(_context._resolvers)['none'].as_str())
+
+    def test_evaluate_static(self):
+        _plan = context.EvaluationPlan({'size': 10, 'nested': {'list': ['a', 'b']}})
+        self.assertTrue(_plan.is_static())
+        self.assertIs(_plan.evaluate({}), _plan.evaluate({}))
+        self.assertEqual('b', _plan.evaluate({})['nested']['list'][1])
+
+    def test_get_cached(self):
+        _model = EvaluationPlanTestCase.Model(1, 1, {'text': '{{test}}'})
+        _plan = context.EvaluationPlan.get(_model)
+        self.assertIs(_plan, context.EvaluationPlan.get(_model))
+        _model.config = {'text': '{{other}}'}
+        self.assertIsNot(_plan, context.EvaluationPlan.get(_model))
+
+    def test_get_config_changed(self):
+        _model = EvaluationPlanTestCase.Model(5, None, {'text': 'old {{x}}'})
+        _plan = context.EvaluationPlan.get(_model)
+        self.assertIs(_plan, context.EvaluationPlan.get(EvaluationPlanTestCase.Model(5, None, {'text': 'old {{x}}'})))
+        _model = EvaluationPlanTestCase.Model(5, None, {'text': 'new {{x}}'})
+        self.assertEqual('new 1', context.EvaluationPlan.get(_model).evaluate({'x': 1})['text'])
+
+    def test_get_unsaved(self):
+        _model = EvaluationPlanTestCase.Model(None, None, {'text': '{{test}}'})
+        self.assertIsNot(context.EvaluationPlan.get(_model), context.EvaluationPlan.get(_model))
+
+
 class ContextResolverTestCase(TestCase):
 
     def test_mapresolver(self):
@@ -174,6 +224,25 @@ class ContextResolverTestCase(TestCase):
         self.assertEqual(None, _context['missing']['missing'])
         self.assertEqual(None, _context.missing.missing)
 
+    def test_lazyresolver(self):
+        _calls = []
+        def create():
+            _calls.append(1)
+            return context.MapResolver({'key': 'value'})
+        _context = context.LazyResolver(create)
+        self.assertEqual(0, len(_calls))
+        self.assertEqual('value', _context['key'])
+        self.assertEqual('value', _context.key)
+        self.assertEqual(None, _context.missing)
+        self.assertEqual(1, len(_calls))
+        self.assertEqual(None, context.LazyResolver(lambda: None).key)
+
+    def test_functionresolver(self):
+        _context = context.FunctionResolver(lambda name: name.upper() if name != 'missing' else None)
+        self.assertEqual('KEY', _context['key'])
+        self.assertEqual('KEY', _context.key)
+        self.assertEqual(None, _context.missing)
+
     def text_evalresolver(self):
         _ctx = context.Context()
         _ctx.set_resolver('other', context.MapResolver({'value': 'test'}))
@@ -0,0 +1,52 @@
+from unittest import TestCase
+
+from config.utils.data import DataType, DataContainer, DataIterable, NoopDataConverter
+
+
+class DataIterableTestCase(TestCase):
+
+    def test_iter(self):
+        _data = DataIterable(lambda: iter([1, 2, 3]))
+        self.assertEqual([1, 2, 3], list(_data))
+        self.assertEqual([1, 2, 3], list(_data))
+
+    def test_len(self):
+        self.assertEqual(3, len(DataIterable(lambda: iter([1, 2, 3]))))
+        self.assertEqual(0, len(DataIterable(lambda: iter([]))))
+
+    def test_getitem(self):
+        _data = DataIterable(lambda: iter([1, 2, 3]))
+        self.assertEqual(1, _data[0])
+        self.assertEqual(3, _data[2])
+        self.assertEqual([2, 3], _data[1:])
+        with self.assertRaises(IndexError):
+            _data[3]
+
+
+class DataContainerTestCase(TestCase):
+
+    def test_csv(self):
+        _data = DataContainer('id,name\r\n1,first\r\n\r\n2,second\r\n', data_type=DataType(DataType.MIME, 'text/csv'))
+        _rows = _data.get_as_dict().get()
+        self.assertEqual([{'id': '1', 'name': 'first'}, {'id': '2', 'name': 'second'}], list(_rows))
+        self.assertEqual(2, len(_rows))
+
+    def test_items(self):
+        _data = DataContainer([{'id': 1}, {'id': 2}], data_type=DataType(DataType.TYPE, 'dict'))
+        self.assertEqual([{'id': 1}, {'id': 2}], [_item.get() for _item in _data.items()])
+
+    def test_merge_none(self):
+        self.assertIsNone(DataContainer.merge([]))
+
+    def test_merge_list(self):
+        _merged = DataContainer.merge(iter([
+            DataContainer([{'id': 1}], data_type=DataType(DataType.TYPE, 'dict')),
+            DataContainer([{'id': 2}, {'id': 3}], data_type=DataType(DataType.TYPE, 'dict'))]))
+        self.assertEqual([{'id': 1}, {'id': 2}, {'id': 3}], list(_merged.get()))
+
+    def test_merge_str(self):
+        _merged = DataContainer.merge([
+            DataContainer('a', data_type=DataType(DataType.TYPE, 'string'), conv=NoopDataConverter()),
+            DataContainer('b', data_type=DataType(DataType.TYPE, 'string'), conv=NoopDataConverter())])
+        self.assertEqual('ab', _merged.get())
+
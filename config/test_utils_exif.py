@@ -0,0 +1,73 @@
+import struct
+
+from unittest import TestCase
+
+from config.utils.exif import ExifReader
+
+
+class ExifReaderTestCase(TestCase):
+
+    def _ifd(self, order, offset, entries):
+        # entries: list of (tag, type, count, value bytes) with values stored after the IFD
+        _data_offset = offset + 2 + len(entries) * 12 + 4
+        _ifd = struct.pack(order + 'H', len(entries))
+        _data = b''
+        for _tag, _type, _count, _value in entries:
+            if len(_value) <= 4:
+                _ifd = _ifd + struct.pack(order + 'HHL', _tag, _type, _count) + _value.ljust(4, b'\x00')
+            else:
+                _ifd = _ifd + struct.pack(order + 'HHLL', _tag, _type, _count, _data_offset + len(_data))
+                _data = _data + _value
+        return _ifd + struct.pack(order + 'L', 0) + _data
+
+    def _exif(self, order='>', extra=()):
+        _tiff_header = (b'MM' if order == '>' else b'II') + struct.pack(order + 'HL', 42, 8)
+        _gps = [
+            (0x0001, 2, 2, b'N\x00'),
+            (0x0002, 5, 3, struct.pack(order + 'LLLLLL', 49, 1, 28, 1, 50264282, 1000000)),
+        ]
+        _ifd0_entries = [
+            (0x010f, 2, 6, b'Maker\x00'),
+            (0x0112, 3, 1, struct.pack(order + 'H', 6)),
+            (0x0132, 2, 20, b'2024:01:02 03:04:05\x00'),
+            *extra,
+            (0x8825, 4, 1, struct.pack(order + 'L', 0)),
+        ]
+        _ifd0 = self._ifd(order, 8, _ifd0_entries)
+        _ifd0_entries[-1] = (0x8825, 4, 1, struct.pack(order + 'L', 8 + len(_ifd0)))
+        _ifd0 = self._ifd(order, 8, _ifd0_entries)
+        return b'Exif\x00\x00' + _tiff_header + _ifd0 + self._ifd(order, 8 + len(_ifd0), _gps)
+
+    def _jpeg(self, order='>', extra=()):
+        _tiff = self._exif(order, extra)[6:]
+        _app0 = b'\xff\xe0' + struct.pack('>H', 16) + b'JFIF\x00' + b'\x00' * 9
+        _app1 = b'\xff\xe1' + struct.pack('>H', 2 + 6 + len(_tiff)) + b'Exif\x00\x00' + _tiff
+        return b'\xff\xd8' + _app0 + _app1 + b'\xff\xda' + b'\x00' * 64
+
+    def test_read(self):
+        self.assertEqual({
+            'make': 'Maker',
+            'orientation': '6',
+            'datetime': '2024:01:02 03:04:05',
+            'gpsinfo': '88',
+            'gpslatituderef': 'N',
+            'gpslatitude': '49/1, 28/1, 50264282/1000000',
+        }, ExifReader.read(self._jpeg()))
+
+    def test_read_unknown_tag(self):
+        _exif = ExifReader.read(self._jpeg(extra=[(0x7000, 3, 1, struct.pack('>H', 7))]))
+        self.assertEqual('7', _exif['0x7000'])
+        self.assertEqual('Maker', _exif['make'])
+
+    def test_read_little_endian(self):
+        self.assertEqual('2024:01:02 03:04:05', ExifReader.read(self._jpeg('<'))['datetime'])
+
+    def test_read_no_exif(self):
+        self.assertEqual({}, ExifReader.read(b'\xff\xd8\xff\xda' + b'\x00' * 64))
+
+    def test_read_no_jpeg(self):
+        self.assertEqual({}, ExifReader.read(b'\x89PNG\r\n\x1a\n'))
+
+    def test_read_truncated(self):
+        self.assertEqual({}, ExifReader.read(self._jpeg()[0:40]))
+
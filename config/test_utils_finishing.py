@@ -0,0 +1,261 @@
+import zlib
+import struct
+import tempfile
+
+from unittest import TestCase
+
+from django.conf import settings
+from django import test
+from django.test import override_settings
+
+from framarama.base.utils import Classes
+from config import models, test_utils_exif
+from config.utils import context, finishing
+from config.utils.exif import ExifReader
+
+
+class ImageProcessingAdapterTestCase(TestCase):
+
+    def test_get_default_unavailable(self):
+        with override_settings(FRAMARAMA=settings.FRAMARAMA | {'IMAGE_PROCESSING_ADAPTER': 'config.utils.finishing.MissingAdapter'}):
+            with self.assertRaisesRegex(ImportError, 'MissingAdapter not available'):
+                finishing.ImageProcessingAdapter.get_default()
+
+
+class BaseImageProcessingAdapterTestCase():
+    ADAPTER = None
+
+    def setUp(self):
+        try:
+            self._adapter = Classes.load(self.ADAPTER, fqcn=True)()
+        except ImportError as e:
+            self.skipTest('Image processing library not available: {}'.format(e))
+
+    @staticmethod
+    def _png(width, height, color=(255, 0, 0)):
+        def chunk(name, data):
+            return struct.pack('>L', len(data)) + name + data + struct.pack('>L', zlib.crc32(name + data))
+        _rows = b''.join(b'\x00' + bytes(color) * width for _i in range(height))
+        return b'\x89PNG\r\n\x1a\n' + \
+            chunk(b'IHDR', struct.pack('>LLBBBBB', width, height, 8, 2, 0, 0, 0)) + \
+            chunk(b'IDAT', zlib.compress(_rows)) + \
+            chunk(b'IEND', b'')
+
+    def _open(self, width=40, height=30, color=(255, 0, 0)):
+        return self._adapter.image_open(self._png(width, height, color))
+
+    def _size(self, image):
+        _meta = self._adapter.image_meta(image)
+        return (_meta['width'], _meta['height'])
+
+    def test_open(self):
+        _image = self._open()
+        self.assertEqual({'width': 40, 'height': 30, 'mime': 'image/png'}, self._adapter.image_meta(_image))
+        self._adapter.image_close(_image)
+
+    def test_open_background(self):
+        _image = self._adapter.image_open(self._png(40, 30), finishing.Color('blue'))
+        self.assertEqual((40, 30), self._size(_image))
+
+    def test_data(self):
+        _data = self._adapter.image_data(self._open())
+        self.assertEqual((40, 30), self._size(self._adapter.image_open(_data)))
+
+    def test_resize(self):
+        _image = self._open()
+        self._adapter.image_resize(_image, 20, 20, True)
+        self.assertEqual((20, 15), self._size(_image))
+        self._adapter.image_resize(_image, 10, 20, False)
+        self.assertEqual((10, 20), self._size(_image))
+
+    def test_scale(self):
+        _image = self._open()
+        self._adapter.image_scale(_image, 0.5)
+        self.assertEqual((20, 15), self._size(_image))
+
+    def test_rotate(self):
+        _image = self._open()
+        self._adapter.image_rotate(_image, 90)
+        self.assertEqual((30, 40), self._size(_image))
+
+    def test_blur(self):
+        _image = self._open()
+        self._adapter.image_blur(_image, 2)
+        self.assertEqual((40, 30), self._size(_image))
+
+    def test_alpha(self):
+        _image = self._open()
+        self._adapter.image_alpha(_image, finishing.Color('white'), 50)
+        self.assertEqual((40, 30), self._size(_image))
+
+    def test_merge(self):
+        _image = self._open()
+        _image.add_images(self._open(10, 10, (0, 0, 255)).get_images())
+        _merged = self._adapter.image_merge(_image, 'bottom-right')
+        self.assertEqual(1, len(_merged.get_images()))
+        self.assertEqual((40, 30), self._size(_merged))
+
+    def test_clone(self):
+        _image = self._open()
+        _clone = self._adapter.image_clone(_image)
+        self._adapter.image_scale(_clone, 0.5)
+        self.assertEqual((40, 30), self._size(_image))
+        self.assertEqual((20, 15), self._size(_clone))
+
+    def test_draw(self):
+        _image = self._open()
+        _data = self._adapter.image_data(_image)
+        _brush = finishing.Brush(finishing.Color('blue', 50), 2, finishing.Color('green'))
+        self._adapter.draw_line(_image, finishing.Position(0, 0), finishing.Position(40, 30), _brush)
+        self._adapter.draw_rect(_image, finishing.Position(5, 5), finishing.Position(15, 15), _brush)
+        self._adapter.draw_circle(_image, finishing.Position(30, 10), finishing.Size(35, 10), _brush)
+        self.assertEqual((40, 30), self._size(_image))
+        self.assertNotEqual(_data, self._adapter.image_data(_image))
+
+    def test_draw_text(self):
+        _image = self._open(200, 50)
+        _data = self._adapter.image_data(_image)
+        _text = finishing.Text('Hello', size=20, alignment=finishing.Text.ALIGN_CENTER)
+        _border = finishing.Brush(finishing.Color('black', 50), 1, finishing.Color('white', 50))
+        self._adapter.draw_text(
+            _image, finishing.Position(100, 30), _text, finishing.Brush(finishing.Color('black')),
+            border_brush=_border, border_radius=3, border_padding=2, rotate=10)
+        self.assertEqual((200, 50), self._size(_image))
+        self.assertNotEqual(_data, self._adapter.image_data(_image))
+
+
+class WandImageProcessingAdapterTestCase(BaseImageProcessingAdapterTestCase, TestCase):
+    ADAPTER = 'config.utils.finishing.WandImageProcessingAdapter'
+
+    def test_exif_read(self):
+        _wand_image = Classes.load('wand.image')
+        with _wand_image.Image(blob=self._png(40, 30)) as _image:
+            _image.format = 'jpeg'
+            _image.profiles['exif'] = test_utils_exif.ExifReaderTestCase()._exif()
+            _data = _image.make_blob()
+        _exif = self._adapter.image_exif(self._adapter.image_open(_data))
+        self.assertEqual(sorted(_exif.keys()), sorted(ExifReader.read(_data).keys()))
+
+
+class PillowImageProcessingAdapterTestCase(BaseImageProcessingAdapterTestCase, TestCase):
+    ADAPTER = 'config.utils.finishing.PillowImageProcessingAdapter'
+
+    def test_open_size_hint(self):
+        _pil_image = Classes.load('PIL.Image')
+        _image = self._open(400, 300)
+        _image.get_images()[0].info['format'] = 'JPEG'
+        _data = self._adapter.image_data(_image)
+        _image = self._adapter.image_open(_data, size_hint=finishing.Size(50, 100))
+        self.assertEqual((200, 150), self._size(_image))
+        self.assertEqual('image/jpeg', self._adapter.image_meta(_image)['mime'])
+
+
+class ProcessorTestCase(TestCase):
+
+    class Model:
+        def __init__(self, name, config):
+            self.name = name
+            self.config = config
+
+        def get_config(self):
+            return self.config
+
+    class Plugin:
+        def __init__(self, names):
+            self.names = names
+            self.runs = 0
+
+        def get_image_names(self, config):
+            return self.names
+
+        def run(self, model, config, image, ctx):
+            self.runs = self.runs + 1
+            return {model.name: context.MapResolver({'runs': self.runs})}
+
+    def setUp(self):
+        self._ctx = finishing.Context(None, None, [], None, [], {}, None)
+        self._processor = finishing.Processor(self._ctx)
+        self._plugin = ProcessorTestCase.Plugin(['default'])
+        self._model = ProcessorTestCase.Model('test', {})
+        self._ctx.set_image(finishing.ImageContainer())
+
+    def _register(self):
+        self._processor._register_context_resolvers([(self._plugin, self._model)], None)
+
+    def test_context_lazy(self):
+        self._register()
+        self.assertEqual(0, self._plugin.runs)
+        self.assertEqual('1', self._ctx.evaluate('{{test.runs}}{{test.missing}}'))
+        self.assertEqual(1, self._plugin.runs)
+
+    def test_context_memoized(self):
+        for _i in range(3):
+            self._register()
+            self._ctx.set_image_data('other', finishing.ImageContainer())
+            self.assertEqual('1', self._ctx.evaluate('{{test.runs}}'))
+        self._ctx.set_image(finishing.ImageContainer())
+        self._register()
+        self.assertEqual('2', self._ctx.evaluate('{{test.runs}}'))
+        self.assertEqual(2, self._plugin.runs)
+
+
+class ProcessorCacheKeyTestCase(TestCase):
+
+    def _key(self, item, frame=None, finishing_config=None):
+        _frame = frame if frame else models.Frame(id=1, name='Frame', version=1)
+        _finishing = models.Finishing(id=1, frame=_frame, plugin='resize', plugin_config=finishing_config if finishing_config else {'width': 100})
+        _ctx = finishing.Context(None, _frame, [], item, [_finishing], {}, None)
+        return finishing.Processor(_ctx).get_cache_key()
+
+    def _item(self, **kwargs):
+        return models.RankedItem(**({'id': 1, 'url': '/item1.jpg', 'version': 1, 'rank': 5} | kwargs))
+
+    def test_item(self):
+        _key = self._key(self._item())
+        self.assertEqual(_key, self._key(self._item()))
+        self.assertEqual(_key, self._key(self._item(rank=10)))
+        self.assertNotEqual(_key, self._key(self._item(version=2)))
+        self.assertNotEqual(_key, self._key(self._item(url='/item2.jpg')))
+        self.assertNotEqual(_key, self._key(self._item(id=2)))
+
+    def test_config(self):
+        _key = self._key(self._item())
+        self.assertEqual(_key, self._key(self._item(), frame=models.Frame(id=1, name='Frame', version=2, rank_version=2)))
+        self.assertNotEqual(_key, self._key(self._item(), frame=models.Frame(id=1, name='Other', version=1)))
+        self.assertNotEqual(_key, self._key(self._item(), finishing_config={'width': 200}))
+
+
+class ProcessorLoadTestCase(test.TestCase):
+    class Adapter(finishing.PillowImageProcessingAdapter):
+        def image_open(self, url, background=None, size_hint=None):
+            self.size_hint = size_hint
+            return super().image_open(url, background, size_hint)
+
+    def setUp(self):
+        try:
+            self._adapter = ProcessorLoadTestCase.Adapter()
+        except ImportError as e:
+            self.skipTest('Image processing library not available: {}'.format(e))
+        self._file = tempfile.NamedTemporaryFile(suffix='.png')
+        self._file.write(BaseImageProcessingAdapterTestCase._png(40, 30))
+        self._file.flush()
+
+    def tearDown(self):
+        self._file.close()
+
+    def _process(self, load_downscale):
+        _display = models.Display(name='Display', enabled=True, device_width=20, device_height=10)
+        _frame = models.Frame(name='Frame', enabled=True, load_downscale=load_downscale)
+        _ctx = finishing.Context(_display, _frame, [], models.Item(url=self._file.name), [], {}, self._adapter)
+        with _ctx:
+            _processor = finishing.Processor(_ctx)
+            _processor._watermark = []
+            return _processor.process()
+
+    def test_load(self):
+        self.assertIsNotNone(self._process(False))
+        self.assertIsNone(self._adapter.size_hint)
+
+    def test_load_downscale(self):
+        self.assertIsNotNone(self._process(True))
+        self.assertEqual((20, 10), (self._adapter.size_hint.get_width(), self._adapter.size_hint.get_height()))
@@ -0,0 +1,343 @@
+import json
+import random
+
+from unittest import TestCase
+
+from django import test
+from django.apps import apps
+from django.conf import settings
+from django.db import connection
+from django.urls import reverse
+
+from framarama.base import utils
+from config import models, jobs
+from config.tests import FrameTestCase
+from config.utils import sorting
+from config.utils.sorting import Sampler, Shuffle
+
+
+class SamplerTestCase(TestCase):
+
+    def test_sample(self):
+        _sampler = Sampler(None, [10, 11, 12], [1, 2, 3])
+        self.assertEqual(3, len(_sampler))
+        self.assertEqual(6, _sampler.get_rank(2))
+        self.assertEqual(2, _sampler.get_weight(1))
+        _counts = {0: 0, 1: 0, 2: 0}
+        _random = random.Random(1)
+        for _i in range(6000):
+            _counts[_sampler.sample(rnd=_random)[0]] += 1
+        self.assertAlmostEqual(1000, _counts[0], delta=150)
+        self.assertAlmostEqual(2000, _counts[1], delta=150)
+        self.assertAlmostEqual(3000, _counts[2], delta=150)
+
+    def test_sample_without_replacement(self):
+        _sampler = Sampler(None, range(100), [1] * 99 + [1000])
+        _indexes = _sampler.sample(100, rnd=random.Random(1))
+        self.assertEqual(100, len(_indexes))
+        self.assertEqual(set(range(100)), set(_indexes))
+
+    def test_sample_zero_weights(self):
+        _sampler = Sampler(None, [10, 11, 12, 13], [0, 1, -1, 1])
+        self.assertEqual({1, 3}, set(_sampler.sample(4)))
+        self.assertEqual(0, _sampler.get_weight(2))
+
+    def test_sample_exclude(self):
+        _sampler = Sampler(None, [10, 11, 12], [1, 1, 1])
+        self.assertEqual({0, 2}, set(_sampler.sample(3, exclude={11})))
+
+    def test_sample_empty(self):
+        self.assertEqual([], Sampler(None, [], []).sample(1))
+
+
+class ShuffleTestCase(TestCase):
+
+    def _take(self, state, key, sampler, count=1, window=0, rnd=random):
+        _items, _state = Shuffle.take(state, key, sampler, count, window, rnd)
+        return [_id for _id, _rank, _weight in _items], _state
+
+    def test_take(self):
+        _sampler = Sampler(None, [10, 11, 12, 13], [1, 0, 2, 3])
+        _random = random.Random(1)
+        _ids, _state = self._take(None, [1], _sampler, 2, rnd=_random)
+        _more, _state = self._take(_state, [1], _sampler, 1, rnd=_random)
+        self.assertEqual({10, 12, 13}, set(_ids + _more))
+        self.assertEqual(3, len(self._take(_state, [1], _sampler, 5, rnd=_random)[0]))
+
+    def test_take_window(self):
+        _sampler = Sampler(None, range(10), [1] * 10)
+        _random = random.Random(1)
+        _ids, _state = self._take(None, [1], _sampler, 10, window=4, rnd=_random)
+        for _i in range(20):
+            _more, _state = self._take(_state, [1], _sampler, window=4, rnd=_random)
+            _ids.extend(_more)
+        for _i in range(4, len(_ids)):
+            self.assertNotIn(_ids[_i], _ids[_i-4:_i])
+
+    def test_take_state(self):
+        _sampler = Sampler(None, range(10), [1] * 10)
+        _ids, _state = self._take(None, [1], _sampler, 3)
+        _state = json.loads(json.dumps(_state))
+        _next, _next_state = self._take(dict(_state), [1], _sampler, 3)
+        Shuffle._shuffles.clear()
+        self.assertEqual(_next, self._take(dict(_state), [1], _sampler, 3)[0])
+        self.assertEqual(_next, self._take(dict(_state), [1], Sampler(None, range(10), [1] * 10), 3)[0])
+        self.assertEqual(6, _next_state['position'])
+        self.assertEqual(6, len(set(_ids + _next)))
+
+    def test_take_changed(self):
+        _random = random.Random(1)
+        _ids, _state = self._take(None, [1], Sampler(None, [10, 11], [1, 1]), rnd=_random)
+        _ids, _state = self._take(_state, [2], Sampler(None, [20, 21], [1, 1]), 2, rnd=_random)
+        self.assertEqual({20, 21}, set(_ids))
+        self.assertEqual([2], _state['key'])
+
+    def test_take_empty(self):
+        self.assertEqual([], self._take(None, [1], Sampler(None, [], []))[0])
+
+
+class BaseSortingTestCase(FrameTestCase):
+    ITEMS = 10
+
+    def _sorting(self, code, weight=1):
+        return models.Sorting.objects.create(
+            frame=self._frame, ordering=0, title='Sorting', plugin='custom', weight=weight, enabled=True,
+            plugin_config={'code': code})
+
+    def _processor(self):
+        self._frame.refresh_from_db()
+        return sorting.Processor(sorting.Context(self._frame))
+
+
+class RankTestCase(BaseSortingTestCase):
+
+    def _ranks(self):
+        return list(models.ItemRank.objects.filter(frame=self._frame).order_by('rank').values_list('item_id', 'rank', 'weight'))
+
+    def test_update(self):
+        self.assertTrue(self._processor().rank_update())
+        self.assertEqual([(_item.id, _i + 1.0, 1.0) for _i, _item in enumerate(self._items)], self._ranks())
+        self._frame.refresh_from_db()
+        self.assertEqual(self._frame.version, self._frame.rank_version)
+        self.assertEqual(10, self._frame.rank_count)
+        self.assertIsNotNone(self._frame.rank_date)
+
+    def test_update_valid(self):
+        self.assertTrue(self._processor().rank_update())
+        self.assertFalse(self._processor().rank_update())
+        self.assertTrue(self._processor().rank_update(force=True))
+        self.assertEqual(10, len(self._ranks()))
+
+    def test_update_changed(self):
+        self._processor().rank_update()
+        self._sorting("Item.annotate(rank=Model.Window(expression=Function.Rank(), order_by=Model.F('id').desc()))", weight=2)
+        self.assertTrue(self._processor().rank_update())
+        _ranks = self._ranks()
+        self.assertEqual(10, len(_ranks))
+        self.assertEqual({2.0}, set(_weight for _id, _rank, _weight in _ranks))
+        self.assertEqual(20.0, _ranks[-1][1])
+
+    def test_update_error(self):
+        self._processor().rank_update()
+        self._sorting("Item.unknown()")
+        with self.assertRaises(Exception):
+            self._processor().rank_update()
+        self.assertEqual(10, len(self._ranks()))  # previous ranking kept
+
+    def _random(self, count):
+        self._frame.refresh_from_db()
+        _processor = sorting.Processor(sorting.Context(self._frame, random_item=True, random_count=count))
+        return [_item.id for _item in _processor.process()['items']]
+
+    def _scheduler(self):
+        _config = apps.get_app_config('config')
+        _scheduler = jobs.Scheduler()
+        _scheduler.register_job(jobs.Scheduler.CFG_FRAME_RANK, _scheduler.frame_rank, manually=True, name='Update frame ranking')
+        _config._scheduler = _scheduler
+        self.addCleanup(delattr, _config, '_scheduler')
+        return _scheduler
+
+    def test_process_initial(self):
+        self.assertEqual(10, len(self._random(10)))
+        self._frame.refresh_from_db()
+        self.assertEqual(self._frame.version, self._frame.rank_version)
+
+    def test_process_outdated(self):
+        _scheduler = self._scheduler()
+        self._processor().rank_update()
+        _item = models.Item.objects.create(
+            frame=self._frame, source=self._items[0].source, version=0, url='/item10.jpg',
+            date_creation=self._items[0].date_creation, created=self._items[0].created, updated=self._items[0].updated)
+        models.Frame.increase_version(self._frame.id)
+        _ids = self._random(11)
+        self.assertEqual(10, len(_ids))
+        self.assertNotIn(_item.id, _ids)
+        self._frame.refresh_from_db()
+        self.assertNotEqual(self._frame.version, self._frame.rank_version)
+
+        # Further reads use the pending update without postponing it
+        _job = _scheduler.get_job(_scheduler._job_id(jobs.Scheduler.CFG_FRAME_RANK, self._frame.id))
+        self.assertEqual({'frame_id': self._frame.id}, _job.kwargs)
+        _run_date = _job.trigger.run_date
+        self._random(1)
+        self.assertEqual(_run_date, _scheduler.get_job(_job.id).trigger.run_date)
+
+        _scheduler.frame_rank(self._frame.id)
+        self.assertIn(_item.id, self._random(11))
+
+    def test_process_outdated_unscheduled(self):
+        self._processor().rank_update()
+        self._sorting("Item.unknown()")
+        self.assertEqual(10, len(self._random(10)))
+        self._frame.refresh_from_db()
+        self.assertNotEqual(self._frame.version, self._frame.rank_version)
+
+
+class CompileTestCase(BaseSortingTestCase):
+
+    class Plugin:
+        def __init__(self):
+            self.runs = 0
+
+        def run(self, sorting, config, ctx):
+            self.runs = self.runs + 1
+            return config.code.as_str()
+
+    def _compile(self, plugin, model):
+        return self._processor()._compile(plugin, model, sorting.Processor._connection())
+
+    def test_cached(self):
+        _plugin = CompileTestCase.Plugin()
+        _sorting = self._sorting("Item.annotate(rank=Model.F('id'))")
+        _compiled = self._compile(_plugin, _sorting)
+        self.assertIs(_compiled, self._compile(_plugin, models.Sorting.objects.get(pk=_sorting.pk)))
+        self.assertEqual(1, _plugin.runs)
+
+    def test_changed(self):
+        _plugin = CompileTestCase.Plugin()
+        _sorting = self._sorting("Item.annotate(rank=Model.F('id'))")
+        _compiled = self._compile(_plugin, _sorting)
+        _sorting.plugin_config = {'code': "Item.annotate(rank=Model.F('id')*2)"}
+        _sorting.save()
+        self.assertNotEqual(_compiled, self._compile(_plugin, _sorting))
+        _sorting.weight = 3
+        _sorting.save()
+        self.assertIn(3, self._compile(_plugin, _sorting)[1])
+        self.assertEqual(3, _plugin.runs)
+
+    def test_unsaved(self):
+        _plugin = CompileTestCase.Plugin()
+        _sorting = models.Sorting(
+            frame=self._frame, ordering=0, title='Sorting', plugin='custom', weight=1, enabled=True,
+            plugin_config={'code': "Item.annotate(rank=Model.F('id'))"})
+        self.assertEqual(self._compile(_plugin, _sorting), self._compile(_plugin, _sorting))
+        self.assertEqual(2, _plugin.runs)
+
+
+class ListTestCase(BaseSortingTestCase):
+
+    def _list(self, cursor=None):
+        return sorting.Processor(sorting.Context(self._frame, cursor=cursor, limit=4)).process()
+
+    def test_list(self):
+        _result = self._list()
+        self.assertEqual({}, _result['errors'])
+        _page = utils.KeysetPage(_result['items'][:4], 3, lambda item: [item.weight, item.id])
+        self.assertEqual([_item.id for _item in reversed(self._items[7:])], [_item.id for _item in _page])
+        _cursor = utils.KeysetPage.cursor({'after': _page.next_cursor()}, 2)
+        _page = utils.KeysetPage(self._list(_cursor)['items'][:4], 3, lambda item: [item.weight, item.id], _cursor[0])
+        self.assertEqual([_item.id for _item in reversed(self._items[4:7])], [_item.id for _item in _page])
+
+    def test_list_error(self):
+        self._sorting("Item.annotate(rank=Model.Func(Model.F('id'), function='UNKNOWN'))")
+        _result = self._list()
+        self.assertIn('list', _result['errors'])
+        _items = _result['items'][:3]
+        self.assertEqual([_item.id for _item in self._items[:3]], [_item.id for _item in _items])
+        self.assertEqual([0.0] * 3, [_item.weight for _item in _items])
+
+    def test_view_error(self):
+        self._sorting("Item.annotate(rank=Model.Func(Model.F('id'), function='UNKNOWN'))")
+        self.client.force_login(self._frame.user)
+        _response = self.client.get(reverse('frame_sorting_list', args=[self._frame.id]), {'page_size': 3})
+        self.assertEqual(200, _response.status_code)
+        self.assertContains(_response, 'Error fetching items')
+        self.assertContains(_response, '/item2.jpg')
+        self.assertNotContains(_response, '/item3.jpg')
+
+
+@test.override_settings(FRAMARAMA={**settings.FRAMARAMA, 'CONFIG_SORTING_SHUFFLE': True})
+class ShuffleDisplayTestCase(BaseSortingTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self._display = models.Display.objects.create(user=self._frame.user, frame=self._frame, name='Display', description='', enabled=True)
+
+    def _take(self, count):
+        self._frame.refresh_from_db()
+        _processor = sorting.Processor(sorting.Context(self._frame, random_item=True, random_count=count, display_id=self._display.id))
+        return [_item.id for _item in _processor.process()['items']]
+
+    def test_take(self):
+        _ids = self._take(4)
+        Shuffle._shuffles.clear()
+        Sampler._samplers.clear()
+        _ids.extend(self._take(6))
+        self.assertEqual(set([_item.id for _item in self._items]), set(_ids))
+        self._display.refresh_from_db()
+        self.assertEqual(10, self._display.items_shuffle['position'])
+
+    def test_take_ranking_changed(self):
+        self._take(4)
+        self._display.refresh_from_db()
+        _state = self._display.items_shuffle
+        self._processor().rank_update(force=True)
+        self._take(4)
+        self._display.refresh_from_db()
+        self.assertNotEqual(_state['key'], self._display.items_shuffle['key'])
+        self.assertEqual(4, self._display.items_shuffle['position'])
+
+
+class ProfileTestCase(BaseSortingTestCase):
+
+    def _processor(self, explain=False):
+        self._frame.refresh_from_db()
+        return sorting.Processor(sorting.Context(self._frame, profile=True, explain=explain))
+
+    def test_profile(self):
+        _processor = self._processor(explain=True)
+        _profile = _processor._profile_query('Items', 'SELECT id FROM config_item WHERE frame_id = %s', [self._frame.id])
+        self.assertEqual(10, _profile['rows'])
+        self.assertEqual([str(self._frame.id)], _profile['params'])
+        self.assertGreaterEqual(_profile['duration'], 0)
+        self.assertTrue(_profile['plan'])
+        self.assertEqual([_profile], _processor._profile)
+
+    def test_profile_error(self):
+        _profile = self._processor()._profile_query('Unknown', 'SELECT id FROM unknown', [])
+        self.assertIn('error', _profile)
+        self.assertNotIn('rows', _profile)
+
+    def test_explain(self):
+        with connection.cursor() as _cursor:
+            _plan = sorting.Processor._explain_query(
+                _cursor, 'SELECT i.id FROM config_item i, config_source s WHERE i.source_id = s.id AND s.frame_id = %s', [self._frame.id])
+        self.assertEqual(2, len(_plan))
+        self.assertFalse(_plan[0].startswith(' '))
+
+    def test_explain_unsupported(self):
+        class Cursor:
+            db = type('', (object,), {'vendor': 'oracle'})
+        self.assertIsNone(sorting.Processor._explain_query(Cursor(), 'SELECT 1', []))
+
+    def test_log_slow(self):
+        self._sorting("Item.annotate(rank=Model.F('id'))")
+        with test.override_settings(FRAMARAMA={**settings.FRAMARAMA, 'CONFIG_SORTING_SLOW': 1.0}):
+            with self.assertLogs('config.utils.sorting', level='WARNING') as _logs:
+                self._processor()._log_slow(1.5, 10)
+            self.assertIn('returning 10 items in 1.500s using sortings Sorting', _logs.output[0])
+            with self.assertNoLogs('config.utils.sorting', level='WARNING'):
+                self._processor()._log_slow(0.5, 10)
+        with test.override_settings(FRAMARAMA={**settings.FRAMARAMA, 'CONFIG_SORTING_SLOW': None}):
+            with self.assertNoLogs('config.utils.sorting', level='WARNING'):
+                self._processor()._log_slow(100, 10)
@@ -0,0 +1,232 @@
+import os
+import time
+import threading
+
+from unittest import TestCase
+
+from django import test
+from django.conf import settings
+from django.db import router
+
+from framarama.base import utils
+from config import models
+from config.tests import FrameTestCase
+from config.utils import source, finishing
+from config.utils.data import DataContainer, DataType
+
+
+class ProcessorParallelTestCase(TestCase):
+
+    class Context:
+        def evaluate_config(self, step):
+            return None
+
+    class Step:
+        instance = None
+        mime_in = None
+        mime_out = None
+        data_out = 'out'
+
+    class Plugin:
+        def __init__(self, fail=None):
+            self.fail = fail
+            self.threads = set()
+
+        def run_instance(self, instance, step, config, data_in, ctx):
+            self.threads.add(threading.get_ident())
+            if data_in == self.fail:
+                raise Exception('Failed {}'.format(data_in))
+            time.sleep(0.001 * (10 - data_in % 10))  # finish in different order
+            return [data_in * 2]
+
+    def _process(self, plugin, count, concurrency=4):
+        _processor = source.Processor(ProcessorParallelTestCase.Context())
+        _step = ProcessorParallelTestCase.Step()
+        return _processor._process_step_parallel(1, count, plugin, _step, range(count), concurrency)
+
+    def test_order(self):
+        _plugin = ProcessorParallelTestCase.Plugin()
+        self.assertEqual([[_i * 2] for _i in range(30)], list(self._process(_plugin, 30)))
+        self.assertGreater(len(_plugin.threads), 1)
+
+    def test_exception(self):
+        _results = self._process(ProcessorParallelTestCase.Plugin(fail=5), 30)
+        self.assertEqual([[_i * 2] for _i in range(5)], [next(_results) for _i in range(5)])
+        with self.assertRaisesRegex(Exception, 'Failed 5'):
+            next(_results)
+
+
+class ProcessorItemsUpdatesTestCase(TestCase):
+
+    class Context:
+        def __init__(self):
+            self.data = None
+            self.modified = []
+            self.read = 0
+
+        def get_input(self, name):
+            return [DataContainer(data=self.data, data_type=DataType(DataType.TYPE, 'dict'))]
+
+        def is_modified(self):
+            return len(self.modified) == 0 or any(self.modified)
+
+    class Processor(source.Processor):
+        def __init__(self, context):
+            super().__init__(context)
+            self.imported = None
+
+        def _process_items_update(self, source, data_out):
+            _data = iter(data_out.get())
+            self.imported = [next(_data)]
+            self.read = self._context.read  # items read before the import
+            self.imported.extend(_data)
+            return {'cnt': 0, 'create': 0, 'update': 0, 'delete': 0, 'errors': []}
+
+    class Step:
+        data_out = 'out'
+
+    def _data(self, ctx, modified_at, count):
+        # Report the state like a conditional plugin when reading the items
+        for _i in range(count):
+            if _i == 0 or _i == modified_at:
+                ctx.modified.append(_i == modified_at)
+            ctx.read = ctx.read + 1
+            yield {'id': _i}
+
+    def _process(self, modified_at, unchanged=True, count=5000):
+        _ctx = ProcessorItemsUpdatesTestCase.Context()
+        _ctx.data = self._data(_ctx, modified_at, count)
+        _processor = ProcessorItemsUpdatesTestCase.Processor(_ctx)
+        _processor._process_items_updates(None, ProcessorItemsUpdatesTestCase.Step(), True, unchanged)
+        return _processor
+
+    def test_not_modified(self):
+        self.assertIsNone(self._process(None).imported)
+
+    def test_modified(self):
+        _processor = self._process(0)
+        self.assertEqual([{'id': _i} for _i in range(5000)], _processor.imported)
+        self.assertLess(_processor.read, 5000)
+
+    def test_modified_later(self):
+        _processor = self._process(2500)
+        self.assertEqual([{'id': _i} for _i in range(5000)], _processor.imported)
+
+    def test_configuration_changed(self):
+        _processor = self._process(None, unchanged=False)
+        self.assertEqual(5000, len(_processor.imported))
+        self.assertEqual(1, _processor.read)
+
+
+class ProcessorItemsMetaTestCase(FrameTestCase):
+    ITEMS = 3
+
+    def _update(self, metas):
+        _metas = {_item.url: (_item.pk, _values) for _item, _values in metas.items()}
+        return source.Processor(None)._items_meta_update(
+            router.db_for_write(models.ItemMeta), self._source, _metas, [], utils.DateTime.now())
+
+    def _metas(self):
+        return {
+            (_meta.item_id, _meta.name): (_meta.id, _meta.value_text, _meta.value_int)
+            for _meta in models.ItemMeta.objects.filter(item__source=self._source)}
+
+    def test_insert(self):
+        self.assertEqual(2, self._update({self._items[0]: {'rating': 3, 'title': 'A'}, self._items[1]: {'rating': 4}}))
+        _metas = self._metas()
+        self.assertEqual(3, len(_metas))
+        self.assertEqual((None, 3), _metas[(self._items[0].id, 'rating')][1:])
+        self.assertEqual(('A', None), _metas[(self._items[0].id, 'title')][1:])
+
+    def test_update(self):
+        self._update({self._items[0]: {'rating': 3, 'title': 'A'}, self._items[1]: {'rating': 4}})
+        _before = self._metas()
+        self.assertEqual(1, self._update({self._items[0]: {'rating': 5, 'title': 'A'}, self._items[1]: {'rating': 4}}))
+        _after = self._metas()
+        self.assertEqual((_before[(self._items[0].id, 'rating')][0], None, 5), _after[(self._items[0].id, 'rating')])
+        self.assertEqual(_before[(self._items[0].id, 'title')], _after[(self._items[0].id, 'title')])
+        self.assertEqual(_before[(self._items[1].id, 'rating')], _after[(self._items[1].id, 'rating')])
+
+    def test_update_type(self):
+        self._update({self._items[0]: {'rating': 3}})
+        self.assertEqual(1, self._update({self._items[0]: {'rating': 'good'}}))
+        self.assertEqual(('good', None), self._metas()[(self._items[0].id, 'rating')][1:])
+
+    def test_delete(self):
+        self._update({self._items[0]: {'rating': 3, 'title': 'A'}, self._items[1]: {'rating': 4}})
+        self.assertEqual(1, self._update({self._items[0]: {'rating': 3}, self._items[1]: {'rating': 4}}))
+        self.assertEqual({(self._items[0].id, 'rating'), (self._items[1].id, 'rating')}, set(self._metas().keys()))
+
+    def test_unchanged(self):
+        self._update({self._items[0]: {'rating': 3}})
+        self.assertEqual(0, self._update({self._items[0]: {'rating': 3}}))
+
+
+class ProcessorItemsUpdateTestCase(FrameTestCase):
+
+    def _row(self, _i, date='2024-01-01T10:00:00'):
+        return {'id': 'id{}'.format(_i), 'url': '/item{}.jpg'.format(_i), 'date': date}
+
+    def _import(self, rows):
+        _processor = source.Processor(source.Context(self._frame, self._source))
+        return _processor._process_items_update(self._source, DataContainer(data=iter(rows), data_type=DataType(DataType.TYPE, 'dict')))
+
+    def _imported(self):
+        return {_item.url: (_item.id_ext, _item.version) for _item in models.Item.objects.filter(source=self._source)}
+
+    def _stats(self, stats):
+        return {_name: stats[_name] for _name in ['cnt', 'create', 'update', 'delete']} | {'errors': [_error['item'] for _error in stats['errors']]}
+
+    @test.override_settings(FRAMARAMA={**settings.FRAMARAMA, 'CONFIG_SOURCE_IMPORT_CHUNK_SIZE': 2})
+    def test_import(self):
+        _rows = [self._row(_i) for _i in range(5)]
+        _rows.insert(3, self._row(1))  # duplicate
+        _rows.append({'id': 'id9', 'date': '2024-01-01T10:00:00'})  # missing URL
+        self.assertEqual(
+            {'cnt': 7, 'create': 5, 'update': 0, 'delete': 0, 'errors': ['/item1.jpg', None]},
+            self._stats(self._import(_rows)))
+        self.assertEqual({'/item{}.jpg'.format(_i): ('id{}'.format(_i), 0) for _i in range(5)}, self._imported())
+        for _item in models.Item.objects.filter(source=self._source, url__in=['/item3.jpg', '/item4.jpg']):
+            _thumbnail = models.ItemThumbnailData.create(data=b'thumbnail', mime='image/jpeg')
+            _thumbnail.save()
+            _item.thumbnail = _thumbnail
+            _item.save()
+        _files = [_thumbnail.data_file.path for _thumbnail in models.ItemThumbnailData.objects.all()]
+        self.assertEqual(2, len(_files))
+        self._frame.refresh_from_db()
+        _version = self._frame.version
+
+        _rows = [
+            self._row(0),
+            self._row(1, date='2024-02-01T10:00:00'),
+            dict(self._row(2), id='changed'),
+            {'id': 'id3', 'url': '/item3.jpg'},  # missing creation date
+            self._row(5)]
+        self.assertEqual(
+            {'cnt': 5, 'create': 1, 'update': 3, 'delete': 2, 'errors': ['/item3.jpg']},
+            self._stats(self._import(_rows)))
+        self.assertEqual({
+            '/item0.jpg': ('id0', 0),
+            '/item1.jpg': ('id1', 1),
+            '/item2.jpg': ('changed', 1),
+            '/item5.jpg': ('id5', 0)}, self._imported())
+        self.assertEqual(0, models.ItemThumbnailData.objects.count())
+        self.assertEqual([], [_file for _file in _files if os.path.exists(_file)])
+        self._frame.refresh_from_db()
+        self.assertEqual(_version + 1, self._frame.version)
+
+    def _cache_keys(self):
+        return {
+            _item.url: finishing.Processor(finishing.Context(None, None, [], _item, [], {}, None)).get_cache_key()
+            for _item in models.Item.objects.filter(source=self._source)}
+
+    def test_unchanged_cache_key(self):
+        self._import([self._row(_i) for _i in range(3)])
+        _keys = self._cache_keys()
+        self.assertEqual(3, self._import([self._row(_i) for _i in range(3)])['update'])
+        self.assertEqual(_keys, self._cache_keys())
+        self.assertEqual({0}, set(models.Item.objects.filter(source=self._source).values_list('version', flat=True)))
+        self._import([self._row(0, date='2024-02-01T10:00:00')] + [self._row(_i) for _i in range(1, 3)])
+        _changed = self._cache_keys()
+        self.assertNotEqual(_keys['/item0.jpg'], _changed['/item0.jpg'])
+        self.assertEqual(_keys['/item1.jpg'], _changed['/item1.jpg'])
@@ -1,3 +1,22 @@
-from django.test import TestCase
+from django import test
 
-# Create your tests here.
+from framarama.base import utils
+from account.models import User
+from config import models
+
+
+class FrameTestCase(test.TestCase):
+    ''' Test case providing a frame with a source and a number of items '''
+    ITEMS = 0
+
+    def setUp(self):
+        self._user = User.objects.create(username='test')
+        self._frame = models.Frame.objects.create(user=self._user, name='Frame', description='', enabled=True)
+        self._source = models.Source.objects.create(frame=self._frame, name='Source', map_item_url='url')
+        self._items = self._create_items(range(self.ITEMS))
+
+    def _create_items(self, numbers, pk=False):
+        _now = utils.DateTime.now()
+        return [models.Item.objects.create(
+            id=_i if pk else None, frame=self._frame, source=self._source, version=0, url='/item{}.jpg'.format(_i),
+            date_creation=_now, created=_now, updated=_now) for _i in numbers]
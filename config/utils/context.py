@@ -165,6 +165,9 @@ class Context:
         else:
             return None
 
+    def evaluate_config(self, model):
+        return EvaluationPlan.get(model).evaluate(self._resolvers)
+
     def evaluate_model(self, model):
         _result = ResultValue(None)
         for field in model.get_fields():
@@ -177,6 +180,71 @@ class Context:
         return _result
 
 
+class EvaluationPlan:
+    ''' Configuration compiled into constant and templated values '''
+    CONST = 'const'
+    DICT = 'dict'
+    LIST = 'list'
+    TEMPLATE = 'template'
+    CACHE_SIZE = 1024
+
+    _cache = {}
+
+    def __init__(self, expr):
+        self._plan = EvaluationPlan._compile(expr)
+
+    @staticmethod
+    def get(model):
+        if model.pk is None:
+            return EvaluationPlan(model.get_config())
+        _config = model.get_config()
+        _key = (type(model).__name__, model.pk)
+        _config_key = repr(_config)  # models on frontend have no update date
+        _cached = EvaluationPlan._cache.get(_key)
+        if _cached is None or _cached[0] != _config_key:
+            if len(EvaluationPlan._cache) >= EvaluationPlan.CACHE_SIZE:
+                EvaluationPlan._cache.clear()
+            _cached = (_config_key, EvaluationPlan(_config))
+            EvaluationPlan._cache[_key] = _cached
+        return _cached[1]
+
+    @staticmethod
+    def _compile(expr):
+        if type(expr) is dict:
+            _plans = {_k: EvaluationPlan._compile(_v) for _k, _v in expr.items()}
+            if all(_kind == EvaluationPlan.CONST for _kind, _value in _plans.values()):
+                return (EvaluationPlan.CONST, ResultValue({_k: _value for _k, (_kind, _value) in _plans.items()}))
+            return (EvaluationPlan.DICT, _plans)
+        elif type(expr) is list:
+            _plans = [EvaluationPlan._compile(_v) for _v in expr]
+            if all(_kind == EvaluationPlan.CONST for _kind, _value in _plans):
+                return (EvaluationPlan.CONST, ResultValue([_value for _kind, _value in _plans]))
+            return (EvaluationPlan.LIST, _plans)
+        elif expr is None:
+            return (EvaluationPlan.CONST, None)
+        _template = str(expr)
+        if utils.Template.is_static(_template):
+            return (EvaluationPlan.CONST, ResultValue(_template))
+        return (EvaluationPlan.TEMPLATE, _template)
+
+    def is_static(self):
+        return self._plan[0] == EvaluationPlan.CONST
+
+    def evaluate(self, resolvers):
+        return EvaluationPlan._evaluate(self._plan, resolvers)
+
+    @staticmethod
+    def _evaluate(plan, resolvers):
+        _kind, _value = plan
+        if _kind == EvaluationPlan.CONST:
+            return _value
+        elif _kind == EvaluationPlan.DICT:
+            return ResultValue({_k: EvaluationPlan._evaluate(_v, resolvers) for _k, _v in _value.items()})
+        elif _kind == EvaluationPlan.LIST:
+            return ResultValue([EvaluationPlan._evaluate(_v, resolvers) for _v in _value])
+        return ResultValue(utils.Template.render(_value, resolvers))
+
+
 class ContextResolver:
 
     def __call__(self, *args, **kwargs):
@@ -234,3 +302,31 @@ class EvaluatedResolver(ContextResolver):
     def _resolve(self, name):
         _value = self._resolver._resolve(name)
         return self._ctx.evaluate(_value)
+
+
+class LazyResolver(ContextResolver):
+    ''' Resolver created by the function on first access and kept afterwards '''
+
+    def __init__(self, func):
+        self._func = func
+        self._resolver = None
+        self._created = False
+
+    def get_resolver(self):
+        if not self._created:
+            self._resolver = self._func()
+            self._created = True
+        return self._resolver
+
+    def _resolve(self, name):
+        _resolver = self.get_resolver()
+        return _resolver._resolve(name) if _resolver is not None else None
+
+
+class FunctionResolver(ContextResolver):
+
+    def __init__(self, func):
+        self._func = func
+
+    def _resolve(self, name):
+        return self._func(name)
@@ -3,6 +3,7 @@ import sys
 import csv
 import json
 import logging
+import itertools
 
 
 logger = logging.getLogger(__name__)
@@ -57,12 +58,18 @@ class DataConverter:
                 data_type,
                 type(self).__name__,
                 e,
-                data[0:64]
+                data[0:64] if isinstance(data, (str, bytes, list)) else data
             )) from e
     
     def filter(self, data, filter_expr):
         return self._filter(data, filter_expr)
 
+    @staticmethod
+    def materialize(data):
+        if data is None or type(data) in [str, bytes, dict, list]:
+            return data
+        return list(data)
+
 
 class NoopDataConverter(DataConverter):
 
@@ -92,13 +99,13 @@ class JsonDataConverter(DataConverter):
         return json_data
     
     def _to_str(self, json_data):
-        return json.dumps(json_data)
+        return json.dumps(DataConverter.materialize(json_data))
 
     def _filter(self, json_data, filter_expr=None):
         if filter_expr is None:
             return json_data
         import jsonpath
-        return jsonpath.JSONPath(filter_expr).parse(json_data)
+        return jsonpath.JSONPath(filter_expr).parse(DataConverter.materialize(json_data))
 
 
 class CsvDataConverter(DataConverter):
@@ -116,19 +123,24 @@ class CsvDataConverter(DataConverter):
     def _from_str(self, string_data):
         if type(string_data) == bytes:
             string_data = string_data.decode()
-        _lines = [line for line in string_data.splitlines() if len(line)]
-        _sample = "\n".join(_lines[:10])
+        _sample = "\n".join(itertools.islice(self._lines(string_data), 10))
         _sniffer = csv.Sniffer()
         _dialect = _sniffer.sniff(_sample)
         _headers = _sniffer.has_header(_sample)
-        if _headers:
-            _reader = csv.DictReader(_lines, dialect=_dialect)
-        else:
-            _reader = csv.reader(_lines, dialect=_dialect)
-        _result = []
-        for _row in _reader:
-            _result.append(_row)
-        return _result
+        def _rows():
+            if _headers:
+                _reader = csv.DictReader(self._lines(string_data), dialect=_dialect)
+            else:
+                _reader = csv.reader(self._lines(string_data), dialect=_dialect)
+            for _row in _reader:
+                yield _row
+        return DataIterable(_rows)
+
+    def _lines(self, string_data):
+        for _line in io.StringIO(string_data):
+            _line = _line.rstrip('\r\n')
+            if len(_line):
+                yield _line
 
     def _from_dict(self, dict_data):
         return dict_data
@@ -146,6 +158,29 @@ class CsvDataConverter(DataConverter):
         raise Exception("Filtering not possbile in CSV data")
 
 
+class DataIterable:
+    ''' Lazy sequence of data rows '''
+
+    def __init__(self, func):
+        self._func = func
+
+    def __repr__(self):
+        return "<{} func={}>".format(self.__class__.__name__, self._func.__name__)
+
+    def __iter__(self):
+        return iter(self._func())
+
+    def __len__(self):
+        return sum(1 for _row in self)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return list(itertools.islice(self, key.start, key.stop, key.step))
+        for _row in itertools.islice(self, key, None):
+            return _row
+        raise IndexError('{} index out of range'.format(self.__class__.__name__))
+
+
 class DataContainer:
     CONVERTERS = [
         JsonDataConverter(),
@@ -214,10 +249,8 @@ class DataContainer:
         return DataContainer(data=self._data, data_type=self._data_type, conv=self._conv)
 
     def items(self):
-        _result = []
-        for item in list(self._data):
-            _result.append(DataContainer(item, data_type=self._data_type, conv=self._conv))
-        return _result
+        for item in self._data:
+            yield DataContainer(item, data_type=self._data_type, conv=self._conv)
 
     def append(self, data):
         if type(self._data) == str:
@@ -230,3 +263,20 @@ class DataContainer:
             return False
         return True
 
+    @classmethod
+    def merge(cls, containers):
+        _containers = iter(containers)
+        _first = next(_containers, None)
+        if _first is None:
+            return None
+        _data = _first.get()
+        if type(_data) in [str, bytes, dict] or _data is None:
+            _merged = DataContainer(data=dict(_data) if type(_data) == dict else _data, data_type=_first.get_type(), conv=_first._conv)
+            for _container in _containers:
+                _merged.append(_container)
+            return _merged
+        def _rows():
+            yield from _data
+            for _container in _containers:
+                yield from _container.get()
+        return DataContainer(data=_rows(), data_type=_first.get_type(), conv=_first._conv)
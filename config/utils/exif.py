@@ -0,0 +1,263 @@
+import io
+import struct
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+
+class ExifReader:
+    ''' Read EXIF information from the file header without decoding pixels '''
+    TAGS = {
+        0x0100: 'imagewidth',
+        0x0101: 'imagelength',
+        0x0102: 'bitspersample',
+        0x0103: 'compression',
+        0x0106: 'photometricinterpretation',
+        0x010e: 'imagedescription',
+        0x010f: 'make',
+        0x0110: 'model',
+        0x0112: 'orientation',
+        0x0115: 'samplesperpixel',
+        0x011a: 'xresolution',
+        0x011b: 'yresolution',
+        0x011c: 'planarconfiguration',
+        0x0128: 'resolutionunit',
+        0x012d: 'transferfunction',
+        0x0131: 'software',
+        0x0132: 'datetime',
+        0x013b: 'artist',
+        0x013e: 'whitepoint',
+        0x013f: 'primarychromaticities',
+        0x0201: 'jpeginterchangeformat',
+        0x0202: 'jpeginterchangeformatlength',
+        0x0211: 'ycbcrcoefficients',
+        0x0212: 'ycbcrsubsampling',
+        0x0213: 'ycbcrpositioning',
+        0x0214: 'referenceblackwhite',
+        0x8298: 'copyright',
+        0x829a: 'exposuretime',
+        0x829d: 'fnumber',
+        0x8769: 'exifoffset',
+        0x8822: 'exposureprogram',
+        0x8824: 'spectralsensitivity',
+        0x8825: 'gpsinfo',
+        0x8827: 'photographicsensitivity',
+        0x8828: 'oecf',
+        0x8830: 'sensitivitytype',
+        0x8831: 'standardoutputsensitivity',
+        0x8832: 'recommendedexposureindex',
+        0x8833: 'isospeed',
+        0x9000: 'exifversion',
+        0x9003: 'datetimeoriginal',
+        0x9004: 'datetimedigitized',
+        0x9010: 'offsettime',
+        0x9011: 'offsettimeoriginal',
+        0x9012: 'offsettimedigitized',
+        0x9101: 'componentsconfiguration',
+        0x9102: 'compressedbitsperpixel',
+        0x9201: 'shutterspeedvalue',
+        0x9202: 'aperturevalue',
+        0x9203: 'brightnessvalue',
+        0x9204: 'exposurebiasvalue',
+        0x9205: 'maxaperturevalue',
+        0x9206: 'subjectdistance',
+        0x9207: 'meteringmode',
+        0x9208: 'lightsource',
+        0x9209: 'flash',
+        0x920a: 'focallength',
+        0x9214: 'subjectarea',
+        0x927c: 'makernote',
+        0x9286: 'usercomment',
+        0x9290: 'subsectime',
+        0x9291: 'subsectimeoriginal',
+        0x9292: 'subsectimedigitized',
+        0xa000: 'flashpixversion',
+        0xa001: 'colorspace',
+        0xa002: 'pixelxdimension',
+        0xa003: 'pixelydimension',
+        0xa004: 'relatedsoundfile',
+        0xa005: 'interoperabilityoffset',
+        0xa20b: 'flashenergy',
+        0xa20c: 'spatialfrequencyresponse',
+        0xa20e: 'focalplanexresolution',
+        0xa20f: 'focalplaneyresolution',
+        0xa210: 'focalplaneresolutionunit',
+        0xa214: 'subjectlocation',
+        0xa215: 'exposureindex',
+        0xa217: 'sensingmethod',
+        0xa300: 'filesource',
+        0xa301: 'scenetype',
+        0xa302: 'cfapattern',
+        0xa401: 'customrendered',
+        0xa402: 'exposuremode',
+        0xa403: 'whitebalance',
+        0xa404: 'digitalzoomratio',
+        0xa405: 'focallengthin35mmfilm',
+        0xa406: 'scenecapturetype',
+        0xa407: 'gaincontrol',
+        0xa408: 'contrast',
+        0xa409: 'saturation',
+        0xa40a: 'sharpness',
+        0xa40b: 'devicesettingdescription',
+        0xa40c: 'subjectdistancerange',
+        0xa420: 'imageuniqueid',
+        0xa430: 'cameraownername',
+        0xa431: 'bodyserialnumber',
+        0xa432: 'lensspecification',
+        0xa433: 'lensmake',
+        0xa434: 'lensmodel',
+        0xa435: 'lensserialnumber',
+    }
+    TAGS_GPS = {
+        0x0000: 'gpsversionid',
+        0x0001: 'gpslatituderef',
+        0x0002: 'gpslatitude',
+        0x0003: 'gpslongituderef',
+        0x0004: 'gpslongitude',
+        0x0005: 'gpsaltituderef',
+        0x0006: 'gpsaltitude',
+        0x0007: 'gpstimestamp',
+        0x0008: 'gpssatellites',
+        0x0009: 'gpsstatus',
+        0x000a: 'gpsmeasuremode',
+        0x000b: 'gpsdop',
+        0x000c: 'gpsspeedref',
+        0x000d: 'gpsspeed',
+        0x000e: 'gpstrackref',
+        0x000f: 'gpstrack',
+        0x0010: 'gpsimgdirectionref',
+        0x0011: 'gpsimgdirection',
+        0x0012: 'gpsmapdatum',
+        0x0013: 'gpsdestlatituderef',
+        0x0014: 'gpsdestlatitude',
+        0x0015: 'gpsdestlongituderef',
+        0x0016: 'gpsdestlongitude',
+        0x0017: 'gpsdestbearingref',
+        0x0018: 'gpsdestbearing',
+        0x0019: 'gpsdestdistanceref',
+        0x001a: 'gpsdestdistance',
+        0x001b: 'gpsprocessingmethod',
+        0x001c: 'gpsareainformation',
+        0x001d: 'gpsdatestamp',
+        0x001e: 'gpsdifferential',
+        0x001f: 'gpshpositioningerror',
+    }
+    TAG_EXIF_IFD = 0x8769
+    TAG_GPS_IFD = 0x8825
+    TYPES = {
+        1: (1, 'B'),   # byte
+        2: (1, 's'),   # ascii
+        3: (2, 'H'),   # short
+        4: (4, 'L'),   # long
+        5: (8, 'LL'),  # rational
+        6: (1, 'b'),   # signed byte
+        7: (1, 's'),   # undefined
+        8: (2, 'h'),   # signed short
+        9: (4, 'l'),   # signed long
+        10: (8, 'll'), # signed rational
+    }
+    MARKER_SOI = b'\xff\xd8'
+    MARKER_APP1 = 0xe1
+    MARKER_SOS = 0xda
+    EXIF_HEADER = b'Exif\x00\x00'
+
+    @staticmethod
+    def read(source):
+        if type(source) == bytes:
+            return ExifReader.read_stream(io.BytesIO(source))
+        elif type(source) == str:
+            with open(source, 'rb') as f:
+                return ExifReader.read_stream(f)
+        return ExifReader.read_stream(source)
+
+    @staticmethod
+    def read_stream(stream):
+        _segment = ExifReader._segment(stream)
+        if _segment is None:
+            return {}
+        return ExifReader.parse(_segment)
+
+    @staticmethod
+    def parse(data):
+        ''' Parses the TIFF structure of the EXIF segment (with or without header) '''
+        if data.startswith(ExifReader.EXIF_HEADER):
+            data = data[len(ExifReader.EXIF_HEADER):]
+        try:
+            return ExifReader._parse(data)
+        except Exception as e:
+            logger.debug("Error parsing EXIF information: {}".format(e))
+            return {}
+
+    @staticmethod
+    def _segment(stream):
+        if stream.read(2) != ExifReader.MARKER_SOI:
+            return None
+        while True:
+            _marker = stream.read(2)
+            while len(_marker) == 2 and _marker[1] == 0xff:
+                _marker = _marker[1:] + stream.read(1)  # skip fill bytes
+            if len(_marker) != 2 or _marker[0] != 0xff or _marker[1] == ExifReader.MARKER_SOS:
+                return None
+            _length = stream.read(2)
+            if len(_length) != 2:
+                return None
+            _length = struct.unpack('>H', _length)[0] - 2
+            if _marker[1] == ExifReader.MARKER_APP1:
+                _data = stream.read(_length)
+                if _data.startswith(ExifReader.EXIF_HEADER):
+                    return _data[len(ExifReader.EXIF_HEADER):]
+            else:
+                stream.read(_length)
+
+    @staticmethod
+    def _parse(data):
+        _order = {b'II': '<', b'MM': '>'}[data[0:2]]
+        _magic, _offset = struct.unpack(_order + 'HL', data[2:8])
+        if _magic != 42:
+            return {}
+        _exif = {}
+        _pointers = ExifReader._ifd(data, _order, _offset, ExifReader.TAGS, _exif)
+        if ExifReader.TAG_EXIF_IFD in _pointers:
+            ExifReader._ifd(data, _order, _pointers[ExifReader.TAG_EXIF_IFD], ExifReader.TAGS, _exif)
+        if ExifReader.TAG_GPS_IFD in _pointers:
+            ExifReader._ifd(data, _order, _pointers[ExifReader.TAG_GPS_IFD], ExifReader.TAGS_GPS, _exif)
+        return _exif
+
+    @staticmethod
+    def _ifd(data, order, offset, tags, exif):
+        _pointers = {}
+        _count = struct.unpack(order + 'H', data[offset:offset+2])[0]
+        for _i in range(_count):
+            _entry = offset + 2 + _i * 12
+            _tag, _type, _num = struct.unpack(order + 'HHL', data[_entry:_entry+8])
+            if _type not in ExifReader.TYPES:
+                continue
+            _size, _fmt = ExifReader.TYPES[_type]
+            _value_offset = _entry + 8
+            if _size * _num > 4:
+                _value_offset = struct.unpack(order + 'L', data[_entry+8:_entry+12])[0]
+            _value = data[_value_offset:_value_offset + _size * _num]
+            if len(_value) != _size * _num:
+                continue
+            if _tag in [ExifReader.TAG_EXIF_IFD, ExifReader.TAG_GPS_IFD]:
+                _pointers[_tag] = struct.unpack(order + 'L', _value[0:4])[0]
+            _name = tags[_tag] if _tag in tags else '{:#06x}'.format(_tag)  # unknown tags by number
+            _formatted = ExifReader._format(order, _type, _fmt, _num, _value)
+            if _formatted is not None and _name not in exif:
+                exif[_name] = _formatted
+        return _pointers
+
+    @staticmethod
+    def _format(order, tag_type, fmt, num, value):
+        if fmt == 's':
+            _value = value.split(b'\x00', 1)[0] if tag_type == 2 else value
+            try:
+                return _value.decode('ascii').strip()
+            except UnicodeDecodeError:
+                return None
+        _values = struct.unpack(order + fmt * num, value)
+        if len(fmt) == 2:
+            _values = ['{}/{}'.format(_values[_i], _values[_i+1]) for _i in range(0, len(_values), 2)]
+        return ', '.join(str(_value) for _value in _values)
+
@@ -1,3 +1,4 @@
+import io
 import re
 import math
 import logging
@@ -6,10 +7,11 @@ from django.conf import settings
 from django.core.paginator import Paginator
 
 from framarama.base import api
-from framarama.base.utils import Filesystem, Classes, DateTime
+from framarama.base.utils import Filesystem, FileCache, Classes, DateTime, Process
 from config import models
 from config.plugins import PluginContext, FinishingPluginRegistry, ContextPluginRegistry
 from config.utils import context
+from config.utils.exif import ExifReader
 
 
 logger = logging.getLogger(__name__)
@@ -26,6 +28,7 @@ class Context(PluginContext):
         self._item = item
         self._finishings = finishings
         self._image_data = {}
+        self._image_versions = {}
         self._adapter = adapter
         self._device = device
 
@@ -60,7 +63,7 @@ class Context(PluginContext):
         return self._image_data[Context.DEFAULT_IMAGE_NAME]
     
     def set_image(self, image):
-        self._image_data[Context.DEFAULT_IMAGE_NAME] = image
+        self.set_image_data(Context.DEFAULT_IMAGE_NAME, image)
 
     def get_images(self):
         return self._image_data
@@ -70,12 +73,18 @@ class Context(PluginContext):
     
     def set_image_data(self, image_name, image):
         self._image_data[image_name] = image
+        self._image_versions[image_name] = self.get_image_version(image_name) + 1
+
+    def get_image_version(self, image_name):
+        ''' Returns a number changed each time the image is replaced '''
+        return self._image_versions.get(image_name, 0)
 
     def close(self):
         _names = list(self._image_data.keys())
         for _name in _names:
             self._adapter.image_close(self._image_data[_name])
             del self._image_data[_name]
+            self._image_versions[_name] = self.get_image_version(_name) + 1
 
 
 class ProcessingException(Exception):
@@ -93,10 +102,14 @@ class ProcessingException(Exception):
 
 
 class Processor:
+    # Frame fields changing with items or sortings without affecting finishings
+    CONFIG_KEY_IGNORED = ('version', 'rank_version', 'rank_date', 'rank_duration', 'rank_count')
 
     def __init__(self, context):
         self._context = context
         self._instances = {}
+        self._resolved = {}
+        self._image_metas = {}
         self._watermark = []
         self.set_watermark('ribbon', None, None)
 
@@ -254,12 +267,57 @@ class Processor:
         }]
         return [models.Finishing(frame=frame, enabled=True, **_config|{'depth': 1}) for _config in _finishings]
 
+    def get_cache_key(self):
+        ''' Returns a key identifying the result by item and finishing configuration '''
+        _item = self._context.get_item()
+        return FileCache.key([_item.id, _item.url, _item.version], self.get_config_key())
+
+    def get_config_key(self):
+        ''' Returns a key identifying the configuration of the finishings '''
+        _models = [self._context.get_display(), self._context.get_frame()]
+        _models.extend(self._context.get_finishings())
+        _models.extend(self._context.get_contexts())
+        _models.extend(self._watermark)
+        return FileCache.key(
+            # Use attribute names to not resolve related models
+            [{_field.attname: getattr(_model, _field.attname, None) for _field in _model._meta.fields if _field.attname not in Processor.CONFIG_KEY_IGNORED} for _model in _models if _model is not None],
+            self._context.get_variables(),
+            type(self._context.get_adapter()).__name__,
+            settings.FRAMARAMA['FRONTEND_THUMBNAIL_SIZE'])
+
+    def _image_versions(self, names):
+        if names is None:
+            names = sorted(self._context.get_images().keys())
+        return tuple((_name, self._context.get_image_version(_name)) for _name in names)
+
+    def _image_meta(self, name):
+        ''' Returns the meta information of the image computed once per version '''
+        _image = self._context.get_image_data(name)
+        if _image is None:
+            return None
+        _version = self._context.get_image_version(name)
+        _cached = self._image_metas.get(name)
+        if _cached is None or _cached[0] != _version:
+            _cached = (_version, self._context.get_adapter().image_meta(_image))
+            self._image_metas[name] = _cached
+        return _cached[1]
+
+    def _context_resolver(self, index, plugin, model, image):
+        ''' Returns a resolver running the context plugin once per image version '''
+        def resolve():
+            _config = context.ResultValue(model.get_config())
+            _key = self._image_versions(plugin.get_image_names(_config))
+            _cached = self._resolved.get(index)
+            if _cached is None or _cached[0] != _key:
+                _resolvers = plugin.run(model, _config, image, self._context)
+                _cached = (_key, _resolvers.get(model.name))
+                self._resolved[index] = _cached
+            return _cached[1]
+        return context.LazyResolver(resolve)
+
     def _register_context_resolvers(self, plugins, image):
-        _resolvers = {}
-        for _plugin, _model in plugins:
-            _resolvers.update(_plugin.run(_model, context.ResultValue(_model.get_config()), image, self._context))
-        for _name, _resolver in _resolvers.items():
-            self._context.set_resolver(_name, _resolver)
+        for _index, (_plugin, _model) in enumerate(plugins):
+            self._context.set_resolver(_model.name, self._context_resolver(_index, _plugin, _model, image))
 
     def process(self):
         _item = self._context.get_item()
@@ -274,9 +332,12 @@ class Processor:
         logger.info("Finishing {}".format(_item))
         _contexts = []
         _contexts.extend(ContextPluginRegistry.get_enabled(self._context.get_contexts()))
+        _load_config = {'url': _item.url}
+        if _frame.load_downscale and _display.device_width and _display.device_height:
+            _load_config.update({'size_hint_width': _display.device_width, 'size_hint_height': _display.device_height})
         _finishings = []
         _finishings.extend([models.Finishing(frame=_frame, enabled=True, **{
-            'depth': 1, 'plugin': 'image', 'title': 'LOAD', 'plugin_config': { 'url': _item.url }
+            'depth': 1, 'plugin': 'image', 'title': 'LOAD', 'plugin_config': _load_config
         })])
         _finishings.extend(list(self._context.get_finishings()))
         _finishings.extend(self._watermark)
@@ -306,10 +367,6 @@ class Processor:
             _images_in = _finishing.get_image_names_in([Context.DEFAULT_IMAGE_NAME])
             _images_out = _finishing.get_image_names_out([Context.DEFAULT_IMAGE_NAME])
 
-            _image_metas = {}
-            for _image_name, _image in self._context.get_images().items():
-                _image_metas[_image_name] = _adapter.image_meta(_image)
-
             _image = ImageContainer()
             for i, _name in enumerate(_images_in):
                 _image_in = self._context.get_image_data(_name)
@@ -319,19 +376,18 @@ class Processor:
                     _image_in = _adapter.image_clone(_image_in)
                 _image.add_images(_image_in.get_images())
 
-            _image_meta = _adapter.image_meta(_image) if _image.get_images() else {}
-
             self._register_context_resolvers(_contexts, _image)
 
             self._context.set_resolver('display', context.ObjectResolver(_display))
             self._context.set_resolver('frame', context.ObjectResolver(_frame))
             self._context.set_resolver('item', context.ObjectResolver(_item))
-            self._context.set_resolver('image', context.MapResolver(_image_meta))
-            self._context.set_resolver('images', context.MapResolver(_image_metas))
+            self._context.set_resolver('image', context.LazyResolver(
+                lambda _image=_image: context.MapResolver(_adapter.image_meta(_image) if _image.get_images() else {})))
+            self._context.set_resolver('images', context.FunctionResolver(self._image_meta))
 
             try:
                 logger.info("Input: {} = {}".format(_images_in, _image))
-                _image_out = _plugin.run(_finishing, self._context.evaluate(_config), _image, self._context)
+                _image_out = _plugin.run(_finishing, self._context.evaluate_config(_finishing), _image, self._context)
                 logger.info("Output: {} = {}".format(_images_out, _image_out))
             except Exception as e:
                 raise ProcessingException(self._context, _finishing, str(e)) from e
@@ -554,8 +610,9 @@ class Text:
 
 class ImageContainer:
 
-    def __init__(self):
+    def __init__(self, source=None):
         self._images = []
+        self._source = source
 
     def __repr__(self):
         return "<{}: {} images: {}>".format(
@@ -572,13 +629,19 @@ class ImageContainer:
     def get_images(self):
         return self._images
 
+    def get_source(self):
+        return self._source
+
 
 class ImageProcessingAdapter:
 
     @staticmethod
     def get_default():
-        _adapter = Classes.load(settings.FRAMARAMA['IMAGE_PROCESSING_ADAPTER'], fqcn=True)
-        return _adapter()
+        _name = settings.FRAMARAMA['IMAGE_PROCESSING_ADAPTER']
+        try:
+            return Classes.load(_name, fqcn=True)()
+        except ImportError as e:
+            raise ImportError("Image processing adapter {} not available: {}".format(_name, e)) from e
 
     def prepare(self, device):
         raise NotImplementedException()
@@ -589,7 +652,8 @@ class ImageProcessingAdapter:
     def get_font(self, name):
         raise NotImplementedException()
 
-    def image_open(self, url, background=None):
+    def image_open(self, url, background=None, size_hint=None):
+        ''' Opens the image from URL, filename or bytes '''
         raise NotImplementedException()
 
     def image_data(self, image):
@@ -601,6 +665,24 @@ class ImageProcessingAdapter:
     def image_exif(self, image):
         raise NotImplementedException()
 
+    @staticmethod
+    def image_exif_read(source):
+        _media_path = settings.FRAMARAMA['MEDIA_PATH']
+        if type(source) == str and (source.startswith('http://') or source.startswith('https://')):
+            _cached = api.ApiClient.get().get_url_cached(source)
+            if _cached:
+                return ExifReader.read(_cached[0])
+            with api.ApiClient.get().get_url(source, stream=True) as _response:
+                return ExifReader.read_stream(_response.raw)
+        elif type(source) == str and not Filesystem.file_exists(source):
+            source = Filesystem.path_normalize(source, root=_media_path, absolute=True)
+        return ExifReader.read(source)
+
+    def image_exif_meta(self, image):
+        if image.get_source() is not None:
+            return self.image_exif_read(image.get_source())
+        return self.image_exif(image) if image.get_images() else {}
+
     def image_resize(self, image, resize_x, resize_y, keep_aspect):
         raise NotImplementedException()
 
@@ -715,16 +797,30 @@ class WandImageProcessingAdapter(ImageProcessingAdapter):
             for _file in _files:
                 Filesystem.file_delete(_path + '/' + _file[0])
 
-    def image_open(self, source, background=None):
+    def _image_read(self, size_hint, **kwargs):
+        _image = self._wand_image.Image()
+        if size_hint:
+            # Let the JPEG decoder scale by 1/2, 1/4 or 1/8 while staying above the hint
+            _size = max(size_hint.get_width(), size_hint.get_height())
+            _image.options['jpeg:size'] = '{}x{}'.format(_size, _size)
+        _image.read(**kwargs)
+        return _image
+
+    def image_open(self, source, background=None, size_hint=None):
         _media_path = settings.FRAMARAMA['MEDIA_PATH']
         if type(source) == str and (source.startswith('http://') or source.startswith('https://')):
-            _image = self._wand_image.Image(blob=api.ApiClient.get().get_url(source, stream=True).raw)
+            _cached = api.ApiClient.get().get_url_cached(source)
+            if _cached:
+                _image = self._image_read(size_hint, blob=Filesystem.file_read(_cached[0]))
+            else:
+                _image = self._image_read(size_hint, blob=api.ApiClient.get().get_url(source).content)
         elif type(source) == str and Filesystem.file_exists(source):
-            _image = self._wand_image.Image(filename=source)
+            _image = self._image_read(size_hint, filename=source)
         elif type(source) == str and Filesystem.file_exists(Filesystem.path_normalize(source, root=_media_path, absolute=True)):
-            _image = self._wand_image.Image(filename=Filesystem.path_normalize(source, root=_media_path, absolute=True))
+            source = Filesystem.path_normalize(source, root=_media_path, absolute=True)
+            _image = self._image_read(size_hint, filename=source)
         elif type(source) == bytes:
-            _image = self._wand_image.Image(blob=source)
+            _image = self._image_read(size_hint, blob=source)
         else:
             raise Exception('Only URLs, filename or bytes are supported, not {}'.format(source))
         _image.auto_orient()
@@ -733,7 +829,7 @@ class WandImageProcessingAdapter(ImageProcessingAdapter):
             _bg.composite(_image)
             _image.close()
             _image = _bg
-        _image_container = ImageContainer()
+        _image_container = ImageContainer(source)
         _image_container.add_image(_image)
         return _image_container
 
@@ -813,7 +909,7 @@ class WandImageProcessingAdapter(ImageProcessingAdapter):
         return _image_container
 
     def image_clone(self, image):
-        _image_container = ImageContainer()
+        _image_container = ImageContainer(image.get_source())
         for _image in image.get_images():
             _image_container.add_image(_image.clone())
         return _image_container
@@ -894,3 +990,291 @@ class WandImageProcessingAdapter(ImageProcessingAdapter):
             self._apply_drawing(image, _drawing)
 
 
+
+
+class PillowImageProcessingAdapter(ImageProcessingAdapter):
+    ''' Image processing using Pillow '''
+    PILLOW_VERSION = (10, 1)  # has_transparency_data, sized default font
+    FORMAT_DEFAULT = 'JPEG'
+    JPEG_QUALITY = 90
+    FONT_DEFAULT = 'DejaVuSans'
+    FONT_SIZE_DEFAULT = 12
+    _fonts = {}
+
+    def __init__(self):
+        _version = Classes.load('PIL').__version__
+        if tuple(int(_v) for _v in _version.split('.')[0:2]) < PillowImageProcessingAdapter.PILLOW_VERSION:
+            raise ImportError("Pillow {} or newer required, found {}".format(
+                '.'.join(str(_v) for _v in PillowImageProcessingAdapter.PILLOW_VERSION), _version))
+        self._pil_image = Classes.load('PIL.Image')
+        self._pil_image_draw = Classes.load('PIL.ImageDraw')
+        self._pil_image_font = Classes.load('PIL.ImageFont')
+        self._pil_image_filter = Classes.load('PIL.ImageFilter')
+        self._pil_image_ops = Classes.load('PIL.ImageOps')
+        self._pil_image_color = Classes.load('PIL.ImageColor')
+
+    def _color(self, color):
+        if color is None or color.get_color() is None or color.get_color() in ['none', 'transparent']:
+            return None
+        _color = self._pil_image_color.getrgb(color.get_color())
+        _alpha = round(255 * color.get_alpha() / 100) if color.get_alpha() else 255
+        return _color[0:3] + (_alpha,)
+
+    def _font_file(self, name, weight):
+        _pattern = '{}:weight={}'.format(name, 'bold' if weight and weight >= 600 else 'regular')
+        _file = Process.exec_run(['fc-match', '-f', '%{file}', _pattern], silent=True) if Process.exec_search('fc-match') else None
+        return _file.decode() if _file else None
+
+    def _font(self, text):
+        _key = (text.get_font(), text.get_weight(), text.get_size())
+        if _key not in PillowImageProcessingAdapter._fonts:
+            _size = text.get_size() if text.get_size() else self.FONT_SIZE_DEFAULT
+            _font = None
+            for _name in [self._font_file(text.get_font(), text.get_weight()) if text.get_font() else None, text.get_font(), self.FONT_DEFAULT]:
+                try:
+                    _font = self._pil_image_font.truetype(_name, _size) if _name else None
+                except OSError:
+                    continue
+                if _font:
+                    break
+            PillowImageProcessingAdapter._fonts[_key] = _font if _font else self._pil_image_font.load_default(_size)
+        return PillowImageProcessingAdapter._fonts[_key]
+
+    def _apply(self, image, func):
+        _images = image.get_images()
+        for _i, _image in enumerate(_images):
+            _images[_i] = func(_image)
+
+    def _apply_drawing(self, image, func, start=None, end=None, rotate=None):
+        for _image in image.get_images():
+            if not rotate and _image.mode == 'RGB':
+                func(self._pil_image_draw.Draw(_image, 'RGBA'), Position(0, 0))  # blends colors with alpha
+                continue
+            _layer = self._pil_image.new('RGBA', _image.size, (0, 0, 0, 0))
+            if rotate:
+                # Draw on separate area rotated around its center
+                _width = max(1, int(end.get_x() - start.get_x()))
+                _height = max(1, int(end.get_y() - start.get_y()))
+                _area = self._pil_image.new('RGBA', (_width, _height), (0, 0, 0, 0))
+                func(self._pil_image_draw.Draw(_area), Position(-start.get_x(), -start.get_y()))
+                _area = _area.rotate(-rotate, resample=self._pil_image.Resampling.BICUBIC, expand=True)
+                _left = int(start.get_x() + _width / 2 - _area.width / 2)
+                _top = int(start.get_y() + _height / 2 - _area.height / 2)
+                _layer.paste(_area, (_left, _top))
+                _area.close()
+            else:
+                func(self._pil_image_draw.Draw(_layer), Position(0, 0))
+            if _image.mode == 'RGBA':
+                _image.alpha_composite(_layer)
+            else:
+                _image.paste(_layer, (0, 0), _layer)
+            _layer.close()
+
+    def _normalize(self, image):
+        if image.mode in ['RGB', 'RGBA']:
+            return image
+        _mode = 'RGBA' if image.has_transparency_data else 'RGB'
+        _image = image.convert(_mode)
+        image.close()
+        return _image
+
+    def prepare(self, device):
+        pass  # no resources to restrict as all processing is done in memory
+
+    def cleanup(self, device):
+        pass  # no temporary files used
+
+    def image_open(self, source, background=None, size_hint=None):
+        _media_path = settings.FRAMARAMA['MEDIA_PATH']
+        if type(source) == str and (source.startswith('http://') or source.startswith('https://')):
+            _cached = api.ApiClient.get().get_url_cached(source)
+            if _cached:
+                _image = self._pil_image.open(_cached[0])
+            else:
+                _image = self._pil_image.open(io.BytesIO(api.ApiClient.get().get_url(source).content))
+        elif type(source) == str and Filesystem.file_exists(source):
+            _image = self._pil_image.open(source)
+        elif type(source) == str and Filesystem.file_exists(Filesystem.path_normalize(source, root=_media_path, absolute=True)):
+            source = Filesystem.path_normalize(source, root=_media_path, absolute=True)
+            _image = self._pil_image.open(source)
+        elif type(source) == bytes:
+            _image = self._pil_image.open(io.BytesIO(source))
+        else:
+            raise Exception('Only URLs, filename or bytes are supported, not {}'.format(source))
+        _format = _image.format
+        if size_hint:
+            # Let the JPEG decoder scale by 1/2, 1/4 or 1/8 while staying above the hint
+            _size = max(size_hint.get_width(), size_hint.get_height())
+            _image.draft('RGB', (_size, _size))
+        self._pil_image_ops.exif_transpose(_image, in_place=True)
+        _image = self._normalize(_image)
+        _image.info['format'] = _format
+        if background:
+            _bg = self._pil_image.new('RGBA', _image.size, self._color(background))
+            _bg.alpha_composite(_image.convert('RGBA'))
+            _bg.info = _image.info
+            _image.close()
+            _image = _bg
+        _image_container = ImageContainer(source)
+        _image_container.add_image(_image)
+        return _image_container
+
+    def image_data(self, image):
+        _image = image.get_images()[0]
+        _format = _image.info.get('format') or self.FORMAT_DEFAULT
+        _data = io.BytesIO()
+        if _format == 'JPEG':
+            _image.convert('RGB').save(_data, _format, quality=self.JPEG_QUALITY)
+        else:
+            _image.save(_data, _format)
+        return _data.getvalue()
+
+    def image_meta(self, image):
+        _image = image.get_images()[0]
+        return {
+          'width': _image.width,
+          'height': _image.height,
+          'mime': self._pil_image.MIME.get(_image.info.get('format') or self.FORMAT_DEFAULT)
+        }
+
+    def image_exif(self, image):
+        return ExifReader.parse(image.get_images()[0].info.get('exif', b''))
+
+    def image_resize(self, image, resize_x, resize_y, keep_aspect):
+        def resize(i):
+            if keep_aspect:
+                _w_factor = resize_x / i.width
+                _h_factor = resize_y / i.height
+                _factor = _w_factor if _w_factor < _h_factor else _h_factor
+                return i.resize((int(i.width * _factor), int(i.height * _factor)), self._pil_image.Resampling.LANCZOS)
+            return i.resize((resize_x, resize_y), self._pil_image.Resampling.LANCZOS)
+        self._apply(image, resize)
+
+    def image_scale(self, image, factor):
+        self._apply(image, lambda i: i.resize((int(i.width*factor), int(i.height*factor)), self._pil_image.Resampling.LANCZOS))
+
+    def image_rotate(self, image, factor):
+        def rotate(i):
+            if factor % 90:
+                i = i.convert('RGBA')
+            return i.rotate(-factor, resample=self._pil_image.Resampling.BICUBIC, expand=True)
+        self._apply(image, rotate)
+
+    def image_blur(self, image, factor):
+        self._apply(image, lambda i: i.filter(self._pil_image_filter.GaussianBlur(factor)))
+
+    def image_alpha(self, image, background, factor):
+        def alpha(i):
+            i = i.convert('RGBA')
+            if background and factor:
+                _bg = self._pil_image.new('RGBA', i.size, self._color(background)[0:3] + (round(255*factor/100),))
+                i.alpha_composite(_bg)
+                _bg.close()
+            i.putalpha(round(255*factor/100))
+            return i
+        self._apply(image, alpha)
+
+    def image_merge(self, image, alignment, coords=None):
+        _gravity_map = {
+            'top': (0.5, 0),
+            'top-left': (0, 0),
+            'top-right': (1, 0),
+            'bottom': (0.5, 1),
+            'bottom-left': (0, 1),
+            'bottom-right': (1, 1),
+            'left': (0, 0.5),
+            'right': (1, 0.5),
+            'center': (0.5, 0.5),
+        }
+        _first = image.get_images()[0]
+        for _image in image.get_images()[1:]:
+            if coords:
+                _left, _top = coords
+            else:
+                _gravity = _gravity_map[alignment] if alignment in _gravity_map else _gravity_map['center']
+                _left = int((_first.width - _image.width) * _gravity[0])
+                _top = int((_first.height - _image.height) * _gravity[1])
+            _first.paste(_image, (int(_left), int(_top)), _image if _image.mode == 'RGBA' else None)
+        _image_container = ImageContainer()
+        _image_container.add_image(_first)
+        return _image_container
+
+    def image_clone(self, image):
+        _image_container = ImageContainer(image.get_source())
+        for _image in image.get_images():
+            _image_container.add_image(_image.copy())
+        return _image_container
+
+    def image_close(self, image):
+        for _image in image.get_images():
+            _image.close()
+
+    def draw_line(self, image, start, end, brush):
+        def line(draw, offset):
+            _start = start + offset
+            _end = end + offset
+            draw.line(
+                [(_start.get_x(), _start.get_y()), (_end.get_x(), _end.get_y())],
+                fill=self._color(brush.get_stroke_color()), width=brush.get_stroke_width() or 1)
+        self._apply_drawing(image, line)
+
+    def draw_rect(self, image, start, end, brush, radius=None, rotate=None):
+        def rect(draw, offset):
+            _start = start + offset
+            _end = end + offset
+            draw.rounded_rectangle(
+                [_start.get_x(), _start.get_y(), _end.get_x(), _end.get_y()],
+                radius=radius or 0,
+                fill=self._color(brush.get_fill_color()),
+                outline=self._color(brush.get_stroke_color()),
+                width=brush.get_stroke_width() or 0)
+        self._apply_drawing(image, rect, start, end, rotate)
+
+    def draw_circle(self, image, pos, size, brush):
+        # Same as ImageMagick: the size is a point on the perimeter
+        _radius = math.hypot(size.get_width() - pos.get_x(), size.get_height() - pos.get_y())
+        def circle(draw, offset):
+            _pos = pos + offset
+            draw.ellipse(
+                [_pos.get_x() - _radius, _pos.get_y() - _radius, _pos.get_x() + _radius, _pos.get_y() + _radius],
+                fill=self._color(brush.get_fill_color()),
+                outline=self._color(brush.get_stroke_color()),
+                width=brush.get_stroke_width() or 0)
+        self._apply_drawing(image, circle)
+
+    def draw_text(self, image, pos, text, brush, border_brush=None, border_radius=None, border_padding=None, rotate=None):
+        _font = self._font(text)
+        _text = text.get_text()
+        _ascent, _descent = _font.getmetrics()
+        _text_width = _font.getlength(_text)
+        _text_height = _ascent + _descent
+        _descender = -_descent
+        _padding = int(border_padding) if border_padding else 0
+        if text.get_alignment() == Text.ALIGN_RIGHT:
+            _xoffset = -_text_width
+            _anchor = 'rs'
+        elif text.get_alignment() == Text.ALIGN_CENTER:
+            _xoffset = int(-_text_width/2)
+            _anchor = 'ms'
+        else:
+            _xoffset = 0
+            _anchor = 'ls'
+        if text.get_alignment_vertical() == Text.ALIGN_CENTER:
+            _yoffset = int(_text_height/2)
+        else:
+            _yoffset = 0
+        # Same border geometry as the ImageMagick implementation (see there)
+        _x1 = pos.get_x() - _padding + _xoffset + _descender
+        _y1 = pos.get_y() - _padding + _yoffset - _text_height - _descender
+        _x2 = pos.get_x() + _padding + _xoffset + _text_width - _descender
+        _y2 = pos.get_y() + _padding + _yoffset - _descender
+        if border_brush and border_brush.get_stroke_width() is not None:
+            if border_brush.get_stroke_width() == 0:
+                border_brush = Brush(
+                    None, 0,
+                    border_brush.get_fill_color())
+            self.draw_rect(image, Position(_x1, _y1), Position(_x2, _y2), border_brush, radius=border_radius, rotate=rotate)
+        def text_draw(draw, offset):
+            _pos = pos + offset
+            draw.text((_pos.get_x(), _pos.get_y()), _text, font=_font, anchor=_anchor, fill=self._color(brush.get_stroke_color()))
+        self._apply_drawing(image, text_draw, Position(_x1, _y1), Position(_x2, _y2), rotate)
@@ -1,22 +1,42 @@
 import re
+import heapq
+import array
+import bisect
+import time
 import random
+import logging
+import itertools
+import threading
 
-from django.db import connections, models as Model
+from django.apps import apps
+from django.conf import settings
+from django.db import connections, router, transaction, models as Model
 from django.db.models import functions as Function
 
 from framarama.base import utils
+from config import models
 from config.plugins import PluginContext, SortingPluginRegistry
 from config.utils import context
 
 
+logger = logging.getLogger(__name__)
+
+
 class Context(PluginContext):
 
-    def __init__(self, frame, random_item=False, sortings=None, variables=None):
+    def __init__(self, frame, random_item=False, sortings=None, variables=None, random_count=1, exclude=None, cursor=None, limit=None, display_id=None, profile=False, explain=False):
         super().__init__(variables)
         self._frame = frame
         self._random_item = random_item
+        self._random_count = random_count
+        self._exclude = exclude
+        self._cursor = cursor
+        self._limit = limit
+        self._display_id = display_id
+        self._profile = profile
+        self._explain = explain
         self._sortings = sortings
-        self._data = {'Item': self._frame.items.order_by(), 'Model': Model, 'Function': Function}
+        self._data = {'Item': self._frame.items.order_by(), 'Meta': models.ItemMeta.value, 'Model': Model, 'Function': Function}
     
     def get_frame(self):
         return self._frame
@@ -24,6 +44,27 @@ class Context(PluginContext):
     def get_random_item(self):
         return self._random_item
 
+    def get_random_count(self):
+        return self._random_count
+
+    def get_exclude(self):
+        return self._exclude
+
+    def get_cursor(self):
+        return self._cursor if self._cursor else (None, None)
+
+    def get_limit(self):
+        return self._limit
+
+    def get_display_id(self):
+        return self._display_id
+
+    def get_profile(self):
+        return self._profile
+
+    def get_explain(self):
+        return self._explain
+
     def get_sortings(self):
         return self._sortings
 
@@ -32,10 +73,17 @@ class Context(PluginContext):
 
 
 class Processor:
+    COMPILED_SIZE = 1024
+    PROFILE_FETCH_SIZE = 1000
+
+    _compiled = {}
+    _locks = {}
+    _locks_lock = threading.Lock()
 
     def __init__(self, context):
         self._context = context
         self._instances = {}
+        self._profile = []
 
     def process(self):
         '''
@@ -45,62 +93,460 @@ from django.db import models as Model
 from config import models
 Item = models.Item.objects
         '''
-        _result = {'errors':{}}
-        _queries = []
+        _result = {'errors':{}, 'profile': self._profile}
+        _data = self._context.get_data()
+
+        # Use the materialized ranking when picking random items using the
+        # sortings of the frame (evaluating other sortings is always done live).
+        # The ranking is updated by the scheduler when items or sortings are
+        # changed, so it is only calculated here when not available at all and
+        # an outdated ranking is used until the scheduled update finished.
+        if self._context.get_random_item() and self._context.get_sortings() is None:
+            try:
+                _frame = self._context.get_frame()
+                if _frame.rank_version is None:
+                    self.rank_update()
+                elif not self.is_rank_valid(_frame):
+                    self._rank_schedule(_frame)
+                _result['items'] = self._rank_random_items(self._context.get_random_count(), self._context.get_exclude())
+                return _result
+            except Exception as e:
+                logger.warning("Error using materialized ranking, falling back to live query: {}".format(e))
+
+        _query, _query_params = self._query(_result['errors'])
+        if self._context.get_profile():
+            self._profile_query('Ranking', _query, _query_params)
+
+        _items = _data['Item']
+        _start = time.perf_counter()
+        try:
+            _query = "SELECT i.*, rank, weight FROM config_item i, ( " + _query + " ) AS result WHERE result.pk=i.id"
+            if self._context.get_random_item():
+                _rank_max = _items.raw(_query + " ORDER BY result.rank DESC LIMIT 1", _query_params)[0].rank
+                _query = _query + " AND result.rank >= " + str(random.randint(0, _rank_max))
+                _query = _query + " ORDER BY result.rank ASC LIMIT 1"
+            else:
+                _query, _query_params = self._query_page(_query, _query_params)
+            _items = _items.prefetch_related('source').raw(_query, _query_params)
+            len(_items)
+            self._log_slow(time.perf_counter() - _start, len(_items))
+        except Exception as e:
+            _items = _data['Item'].order_by('id').annotate(rank=Model.F('id'), weight=Model.Value(0.0, output_field=Model.FloatField()))
+            _result['errors']['list'] = e
+
+        _result['items'] = _items
+
+        return _result
+
+    def _query(self, errors):
+        _sqls = []
         _data = self._context.get_data()
         _sortings = self._context.get_sortings()
         if not _sortings:
             _sortings = self._context.get_frame().sortings.all()
+
+        # Get raw SQL query using compiler as used in the Query code, but
+        # this defaults to "default" connection and not "config" connection:
+        # https://github.com/django/django/blob/6654289f5b350dfca3dc4f6abab777459b906756/django/db/models/sql/query.py#L293
+        _conn_name = Processor._connection()
+
         for _plugin, _sorting in SortingPluginRegistry.get_enabled(_sortings):
-            _code = _plugin.run(_sorting, context.ResultValue(_sorting.get_config()), self._context)
-            _code = re.sub(r"[\r\n]+\s*", "", _code)  # fix indent by removing newline/whitespaces
             try:
-                _code = _code + ".annotate(pk=Model.F('pk'), rank=Model.F('rank')*Model.Value({}))".format(_sorting.weight)
-                _code = _code + ".values('pk', 'rank')"
-                _queries.append(utils.Process.eval(_code, _data))
+                _sqls.append(self._compile(_plugin, _sorting, _conn_name))
             except Exception as e:
-                _result['errors']['sorting{}'.format(_sorting.id)] = e
+                errors['sorting{}'.format(_sorting.id)] = e
+                if self._context.get_profile():
+                    self._profile.append({'name': _sorting.title or _sorting.plugin, 'error': str(e)})
+                continue
+            if self._context.get_profile():
+                self._profile_query(_sorting.title or _sorting.plugin, *_sqls[-1])
 
         # No query given, use the default ranking
-        if len(_queries) == 0:
-            _queries.append(_data['Item']
+        if len(_sqls) == 0:
+            _sqls.append(_data['Item']
               .annotate(pk=Model.F('id'), rank=Model.Window(expression=Function.Rank(), order_by=Model.F('id').asc()))
               .values('pk', 'rank')
+              .query.get_compiler(_conn_name).as_sql()
            )
 
-        # Get raw SQL query using compiler as used in the Query code, but
-        # this defaults to "default" connection and not "config" connection:
-        # https://github.com/django/django/blob/6654289f5b350dfca3dc4f6abab777459b906756/django/db/models/sql/query.py#L293
-        _conn_name = 'config' if 'config' in connections else 'default'
-
         # Surround queries with subquery to calculate rank differences
+        _queries = []
         _query_params = []
-        for _i, _q in enumerate(_queries):
-            (_sql, _sql_params) = _q.query.get_compiler(_conn_name).as_sql()
+        for _i, (_sql, _sql_params) in enumerate(_sqls):
             _query_params.extend(_sql_params)
-            _queries[_i] = "SELECT pk, (rank - COALESCE(LAG(rank) OVER(ORDER BY rank), 0)) AS rank_diff FROM ( " + str(_sql) + ") AS result_" + str(_i)
+            _queries.append("SELECT pk, (rank - COALESCE(LAG(rank) OVER(ORDER BY rank), 0)) AS rank_diff FROM ( " + str(_sql) + ") AS result_" + str(_i))
         _query = " UNION ALL ".join(_queries)
 
-        _items = _data['Item']
+        # Sum up differences per item and calculate the cumulative weight
+        _query = (
+            "SELECT pk, (SUM(weight) OVER(ORDER BY weight, pk)) AS rank, weight FROM ( SELECT pk, rank AS weight FROM ("
+            "  SELECT pk AS pk, SUM(rank_diff) AS rank FROM (" + str(_query) + ") AS result_diff GROUP BY pk"
+            ") AS result_diff_sum ) AS result_weight"
+        )
+        return _query, _query_params
+
+    def _query_page(self, query, query_params):
+        # Use keyset pagination on weight and item to continue after (or
+        # before) the given cursor instead of counting and skipping results
+        _direction, _values = self._context.get_cursor()
+        _query_params = list(query_params)
+        _order = 'DESC'
+        if _direction == utils.KeysetPage.AFTER:
+            query = query + " AND (result.weight < %s OR (result.weight = %s AND result.pk < %s))"
+            _query_params.extend([_values[0], _values[0], _values[1]])
+        elif _direction == utils.KeysetPage.BEFORE:
+            query = query + " AND (result.weight > %s OR (result.weight = %s AND result.pk > %s))"
+            _query_params.extend([_values[0], _values[0], _values[1]])
+            _order = 'ASC'
+        query = query + " ORDER BY result.weight {0}, result.pk {0}".format(_order)
+        if self._context.get_limit():
+            query = query + " LIMIT {}".format(int(self._context.get_limit()))
+        return query, _query_params
+
+    def _compile(self, plugin, sorting, conn_name):
+        # Compiled queries of stored sortings are kept until the sorting changes
+        _key = None
+        if sorting.id is not None:
+            _key = (sorting.id, sorting.updated, sorting.weight, self._context.get_frame().id, conn_name)
+            _compiled = Processor._compiled.get(_key)
+            if _compiled is not None:
+                return _compiled
+        _code = plugin.run(sorting, context.ResultValue(sorting.get_config()), self._context)
+        _code = re.sub(r"[\r\n]+\s*", "", _code)  # fix indent by removing newline/whitespaces
+        _code = _code + ".annotate(pk=Model.F('pk'), rank=Model.F('rank')*Model.Value({}))".format(sorting.weight)
+        _code = _code + ".values('pk', 'rank')"
+        _sql, _sql_params = utils.Process.eval(_code, self._context.get_data()).query.get_compiler(conn_name).as_sql()
+        _compiled = (str(_sql), tuple(_sql_params))
+        if _key is not None:
+            if len(Processor._compiled) >= Processor.COMPILED_SIZE:
+                Processor._compiled.clear()
+            Processor._compiled[_key] = _compiled
+        return _compiled
+
+    def _profile_query(self, name, query, query_params):
+        # Run the query on its own to get the execution time, the amount of
+        # rows and (optionally) the query plan of the database
+        _profile = {'name': name, 'sql': query, 'params': [str(_param) for _param in query_params]}
         try:
-            _query = (
-                "SELECT i.*, rank, weight FROM config_item i, ( SELECT pk, (SUM(weight) OVER(ORDER BY weight, pk)) AS rank, weight FROM ( SELECT pk, rank AS weight FROM ("
-                "  SELECT pk AS pk, SUM(rank_diff) AS rank FROM (" + str(_query) + ") AS result_diff GROUP BY pk"
-                ") AS result_diff_sum ) AS result_weight ) AS result WHERE result.pk=i.id"
-            )
-            if self._context.get_random_item():
-                _rank_max = _items.raw(_query + " ORDER BY result.rank DESC LIMIT 1", _query_params)[0].rank
-                _query = _query + " AND result.rank >= " + str(random.randint(0, _rank_max))
-                _query = _query + " ORDER BY result.rank ASC LIMIT 1"
-            else:
-                _query = _query + " ORDER BY result.weight DESC, result.pk DESC"
-            _items = _items.prefetch_related('source').raw(_query, _query_params)
-            len(_items)
+            with connections[Processor._connection()].cursor() as _cursor:
+                _start = time.perf_counter()
+                _cursor.execute(query, query_params)
+                _rows = 0
+                while True:
+                    _chunk = _cursor.fetchmany(Processor.PROFILE_FETCH_SIZE)
+                    if not _chunk:
+                        break
+                    _rows = _rows + len(_chunk)
+                _profile['duration'] = time.perf_counter() - _start
+                _profile['rows'] = _rows
+                if self._context.get_explain():
+                    _profile['plan'] = Processor._explain_query(_cursor, query, query_params)
         except Exception as e:
-            _items = _data['Item'].order_by('id').annotate(rank=Model.F('id'))
-            _result['errors']['list'] = e
+            _profile['error'] = str(e)
+        self._profile.append(_profile)
+        return _profile
 
-        _result['items'] = _items
+    @staticmethod
+    def _explain_query(cursor, query, query_params):
+        if cursor.db.vendor == 'sqlite':
+            cursor.execute("EXPLAIN QUERY PLAN " + query, query_params)
+            # Rows contain ID, parent ID, unused column and description
+            _depths = {0: -1}
+            _plan = []
+            for _row in cursor.fetchall():
+                _depths[_row[0]] = _depths.get(_row[1], -1) + 1
+                _plan.append('  ' * _depths[_row[0]] + str(_row[3]))
+            return _plan
+        elif cursor.db.vendor in ['mysql', 'postgresql']:
+            cursor.execute("EXPLAIN " + query, query_params)
+            _columns = [_column[0] for _column in cursor.description]
+            _plan = []
+            for _row in cursor.fetchall():
+                if len(_row) == 1:
+                    _plan.append(str(_row[0]))
+                else:
+                    _plan.append(', '.join(['{}={}'.format(_column, _value) for _column, _value in zip(_columns, _row) if _value is not None]))
+            return _plan
+        return None
+
+    def _log_slow(self, duration, count):
+        _slow = settings.FRAMARAMA['CONFIG_SORTING_SLOW']
+        if _slow is not None and duration >= utils.DateTime.delta(_slow).total_seconds():
+            _sortings = self._context.get_sortings()
+            if not _sortings:
+                _sortings = self._context.get_frame().sortings.all()
+            logger.warning("Slow ranking of {} returning {} items in {:.3f}s using sortings {}".format(
+                self._context.get_frame(), count, duration,
+                ', '.join(['{} ({})'.format(_sorting.title or _sorting.plugin, _sorting.id) for _sorting in _sortings])))
+
+    @staticmethod
+    def _connection():
+        return 'config' if 'config' in connections else 'default'
+
+    def is_rank_valid(self, frame):
+        if frame.rank_version is None or frame.rank_version != frame.version:
+            return False
+        _max_age = utils.DateTime.delta(settings.FRAMARAMA['CONFIG_SORTING_RANK_MAX_AGE'])
+        if _max_age and utils.DateTime.reached(frame.rank_date, _max_age):
+            return False
+        return True
+
+    def _rank_schedule(self, frame):
+        _scheduler = apps.get_app_config('config').get_scheduler()
+        if _scheduler is not None:
+            _scheduler.frame_rank_schedule(frame, postpone=False)
+
+    def rank_update(self, force=False):
+        _frame = self._context.get_frame()
+        if not force and self.is_rank_valid(_frame):
+            return False
+        with Processor._lock(_frame.id):
+            # Another request might have finished updating the ranking already
+            _frame.refresh_from_db(fields=['version', 'rank_version', 'rank_date', 'rank_duration', 'rank_count'])
+            if not force and self.is_rank_valid(_frame):
+                return False
+            _errors = {}
+            _version = _frame.version
+            _query, _query_params = self._query(_errors)
+            if _errors:
+                raise Exception(', '.join([str(_e) for _e in _errors.values()]))
+            self._rank_store(_frame, _version, _query, _query_params)
+        return True
+
+    def _rank_store(self, frame, version, query, query_params):
+        # Replace the ranking and update the frame within a single transaction
+        # so readers either get the previous or the new ranking as a whole
+        _chunk_size = settings.FRAMARAMA['CONFIG_SOURCE_IMPORT_CHUNK_SIZE']
+        _db = router.db_for_write(models.ItemRank)
+        _start = utils.DateTime.now()
+        _count = 0
+        with transaction.atomic(using=_db):
+            models.ItemRank.objects.using(_db).filter(frame_id=frame.id).delete()
+            with connections[_db].cursor() as _cursor:
+                _cursor.execute(query, query_params)
+                while True:
+                    _rows = _cursor.fetchmany(_chunk_size)
+                    if not _rows:
+                        break
+                    models.ItemRank.objects.using(_db).bulk_create([
+                        models.ItemRank(frame_id=frame.id, item_id=_pk, rank=_rank, weight=_weight)
+                        for _pk, _rank, _weight in _rows
+                    ], batch_size=_chunk_size)
+                    _count = _count + len(_rows)
+            frame.rank_version = version
+            frame.rank_date = utils.DateTime.now()
+            frame.rank_duration = frame.rank_date - _start
+            frame.rank_count = _count
+            models.Frame.objects.using(_db).filter(pk=frame.id).update(
+                rank_version=frame.rank_version, rank_date=frame.rank_date,
+                rank_duration=frame.rank_duration, rank_count=frame.rank_count)
+        _duration = frame.rank_duration
+        logger.info("Updated ranking of {} with {} items in {}".format(frame, _count, _duration))
+        self._log_slow(_duration.total_seconds(), _count)
+
+    def _rank_random_items(self, count=1, exclude=None):
+        _frame = self._context.get_frame()
+        _display_id = self._context.get_display_id()
+        if settings.FRAMARAMA['CONFIG_SORTING_SHUFFLE'] and _display_id is not None:
+            _items = self._rank_items(self._rank_shuffle_items(_frame, _display_id, count))
+            if _items:
+                return _items
+        if settings.FRAMARAMA['CONFIG_SORTING_SAMPLER']:
+            _items = self._rank_random_items_sampler(Sampler.get(_frame), count, exclude)
+            if _items:
+                return _items
+        return self._rank_random_items_query(_frame, count, exclude)
+
+    def _rank_shuffle_items(self, frame, display_id, count=1):
+        # Keep the position within the permutation per display in the database
+        # so all server processes continue with the same permutation
+        _db = router.db_for_write(models.Display)
+        _key = [frame.id, frame.rank_version, frame.rank_date.isoformat() if frame.rank_date else None]
+        with transaction.atomic(using=_db):
+            _displays = models.Display.objects.using(_db).select_for_update().filter(pk=display_id)
+            _state = _displays.values_list('items_shuffle', flat=True).first()
+            _items, _state = Shuffle.take(
+                _state, _key, Sampler.get(frame), count, settings.FRAMARAMA['CONFIG_SORTING_SHUFFLE_WINDOW'])
+            _displays.update(items_shuffle=_state)
+        return _items
+
+    def _rank_random_items_sampler(self, sampler, count=1, exclude=None):
+        return self._rank_items([
+            (sampler.get_id(_i), sampler.get_rank(_i), sampler.get_weight(_i))
+            for _i in sampler.sample(count, exclude=exclude)
+        ])
 
+    def _rank_random_items_query(self, frame, count=1, exclude=None):
+        _ranks = models.ItemRank.objects.filter(frame_id=frame.id)
+        _rank_max = _ranks.order_by('-rank').values_list('rank', flat=True).first()
+        if _rank_max is None:
+            return []
+        _picked = {}
+        for _i in range(count * 4):
+            if len(_picked) >= count:
+                break
+            _rank = _ranks.filter(rank__gte=random.uniform(0, _rank_max)).order_by('rank').values_list('item_id', 'rank', 'weight').first()
+            if _rank and (exclude is None or _rank[0] not in exclude):
+                _picked[_rank[0]] = _rank
+        return self._rank_items(_picked.values())
+
+    def _rank_items(self, ranks):
+        _ranks = list(ranks)
+        _items = self._context.get_data()['Item'].select_related('source').in_bulk([_rank[0] for _rank in _ranks])
+        _result = []
+        for _id, _rank, _weight in _ranks:
+            _item = _items.get(_id)
+            if _item is None:
+                continue  # item deleted after the ranking was calculated
+            _item.rank = _rank
+            _item.weight = _weight
+            _result.append(_item)
         return _result
 
+    @staticmethod
+    def _lock(frame_id):
+        with Processor._locks_lock:
+            if frame_id not in Processor._locks:
+                Processor._locks[frame_id] = threading.Lock()
+            return Processor._locks[frame_id]
+
+
+class Sampler:
+    ''' Weighted random selection of items kept in memory '''
+    _samplers = {}
+    _samplers_lock = threading.Lock()
+
+    def __init__(self, key, ids, weights):
+        self._key = key
+        self._ids = array.array('q', ids)
+        # Items with negative weights are never picked (as with the query)
+        self._ranks = array.array('d', itertools.accumulate(max(_weight, 0) for _weight in weights))
+        self._total = self._ranks[-1] if self._ranks else 0
+        self._available = sum(1 for _i in range(len(self._ranks)) if self.get_weight(_i) > 0)
+
+    @staticmethod
+    def get(frame):
+        _key = (frame.rank_version, frame.rank_date)
+        with Sampler._samplers_lock:
+            _sampler = Sampler._samplers.get(frame.id)
+            if _sampler is None or _sampler.get_key() != _key:
+                _sampler = Sampler.load(frame, _key)
+                Sampler._samplers[frame.id] = _sampler
+        return _sampler
+
+    @staticmethod
+    def load(frame, key=None):
+        _ids = array.array('q')
+        _weights = array.array('d')
+        _ranks = models.ItemRank.objects.filter(frame_id=frame.id).order_by('rank', 'item_id').values_list('item_id', 'weight')
+        for _id, _weight in _ranks.iterator(chunk_size=settings.FRAMARAMA['CONFIG_SOURCE_IMPORT_CHUNK_SIZE']):
+            _ids.append(_id)
+            _weights.append(_weight)
+        return Sampler(key, _ids, _weights)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def get_key(self):
+        return self._key
+
+    def get_id(self, index):
+        return self._ids[index]
+
+    def get_rank(self, index):
+        return self._ranks[index]
+
+    def get_weight(self, index):
+        return self._ranks[index] - (self._ranks[index-1] if index > 0 else 0)
+
+    def sample(self, count=1, rnd=random, exclude=None):
+        ''' Returns indexes of up to count items picked without replacement '''
+        _exclude = exclude if exclude else ()
+        _count = min(count, self._available)
+        _picked = {}
+        _attempts = _count * 8 + 32
+        while len(_picked) < _count and _attempts > 0:
+            _index = min(bisect.bisect_right(self._ranks, rnd.random() * self._total), len(self._ranks) - 1)
+            if self._ids[_index] not in _exclude:
+                _picked[_index] = True
+            _attempts = _attempts - 1
+        if len(_picked) < _count:
+            # Too many collisions (e.g. picking most items), use weighted random
+            # keys (Efraimidis-Spirakis) for the remaining items instead
+            _keys = []
+            for _index in range(len(self._ranks)):
+                _weight = self.get_weight(_index)
+                if _weight > 0 and _index not in _picked and self._ids[_index] not in _exclude:
+                    _keys.append((rnd.random() ** (1 / _weight), _index))
+            for _key, _index in heapq.nlargest(_count - len(_picked), _keys):
+                _picked[_index] = True
+        return list(_picked)
+
+
+class Shuffle:
+    ''' Weighted random permutation of the items of a frame per display '''
+    CACHE_SIZE = 16
+
+    _shuffles = {}
+    _shuffles_lock = threading.Lock()
+
+    def __init__(self, sampler, indexes):
+        self._sampler = sampler
+        self._indexes = array.array('l', indexes)
+
+    @staticmethod
+    def take(state, key, sampler, count=1, window=0, rnd=random):
+        ''' Returns the ID, rank and weight of the next count items and the new state '''
+        _key = list(key)
+        if state is None or state['key'] != _key:
+            state = Shuffle.state(_key, state['recent'] if state else [], rnd)
+        _shuffle = Shuffle.get(state, sampler)
+        _result = []
+        _count = min(count, len(_shuffle))
+        while len(_result) < _count:
+            if state['position'] >= len(_shuffle):
+                state = Shuffle.state(_key, state['recent'], rnd)
+                _shuffle = Shuffle.get(state, sampler)
+            _items = _shuffle.get_items(state['position'], _count - len(_result))
+            state['position'] = state['position'] + len(_items)
+            state['recent'] = (state['recent'] + [_id for _id, _rank, _weight in _items])[-window:] if window > 0 else []
+            _result.extend(_items)
+        return _result, state
+
+    @staticmethod
+    def state(key, recent, rnd=random):
+        return {'key': key, 'seed': rnd.getrandbits(32), 'position': 0, 'previous': list(recent), 'recent': list(recent)}
+
+    @staticmethod
+    def get(state, sampler):
+        _key = (sampler, state['seed'], tuple(state['previous']))
+        with Shuffle._shuffles_lock:
+            _shuffle = Shuffle._shuffles.get(_key)
+            if _shuffle is None:
+                _shuffle = Shuffle.build(sampler, state['previous'], random.Random(state['seed']))
+                if len(Shuffle._shuffles) >= Shuffle.CACHE_SIZE:
+                    Shuffle._shuffles.pop(next(iter(Shuffle._shuffles)))
+                Shuffle._shuffles[_key] = _shuffle
+        return _shuffle
+
+    @staticmethod
+    def build(sampler, recent=None, rnd=random):
+        _recent = {_id: _i for _i, _id in enumerate(recent if recent else [])}
+        _keys = []
+        for _index in range(len(sampler)):
+            _weight = sampler.get_weight(_index)
+            if _weight > 0:
+                _keys.append((rnd.random() ** (1 / _weight), _index))
+        _keys.sort(reverse=True)
+        _indexes = [_index for _key, _index in _keys if sampler.get_id(_index) not in _recent]
+        _indexes.extend(sorted(
+            [_index for _key, _index in _keys if sampler.get_id(_index) in _recent],
+            key=lambda _index: _recent[sampler.get_id(_index)]))
+        return Shuffle(sampler, _indexes)
+
+    def __len__(self):
+        return len(self._indexes)
+
+    def get_items(self, position, count=1):
+        _indexes = self._indexes[position:position + count]
+        return [(self._sampler.get_id(_index), self._sampler.get_rank(_index), self._sampler.get_weight(_index)) for _index in _indexes]
@@ -1,7 +1,14 @@
+import os
 import sys
+import hashlib
 import logging
+import itertools
 import zoneinfo
+import collections
+import concurrent.futures
 
+from django.conf import settings
+from django.db import connection, router, transaction
 from django.utils.dateparse import parse_datetime
 
 from framarama.base import utils
@@ -22,6 +29,8 @@ class Context(PluginContext):
         self._frame = frame
         self._source = source
         self._data = {}
+        self._status = []
+        self._modified = []
         self._time_zone = utils.DateTime.tz(self._frame.user.time_zone)
     
     def get_frame(self):
@@ -41,8 +50,35 @@ class Context(PluginContext):
     def set_output(self, name, data):
         self._data[name] = data
 
+    def add_status(self, status):
+        self._status.append(status)
+
+    def get_status(self):
+        return self._status
+
+    def clear_status(self):
+        self._status = []
+        self._modified = []
+
+    def set_modified(self, modified):
+        self._modified.append(modified)
+
+    def is_modified(self):
+        return len(self._modified) == 0 or any(self._modified)
+
+
+class ProcessingException(Exception):
+
+    def __init__(self, step, msg):
+        super().__init__(msg)
+        self.step = step
+
+    def get_step(self):
+        return self.step
+
 
 class Processor:
+    ITEM_UPDATE_FIELDS = ['version', 'id_ext', 'date_creation', 'updated']
 
     def __init__(self, context):
         self._context = context
@@ -54,72 +90,135 @@ class Processor:
             _sources = _sources.filter(pk=self._context.get_source().id)
         for _source in _sources.all():
             logger.info("Processing source {}".format(_source))
+            _previous_success = _source.update_date_end is not None and _source.update_error is None
             _source.update_count = _source.update_count + 1
             _source.update_date_start = utils.DateTime.now()
             _source.save()
+            self._context.clear_status()
 
             try:
                 _last_step = None
+                _steps = []
                 for i, _step in enumerate(_source.steps.all()):
                     _plugin = SourcePluginRegistry.get(_step.plugin)
                     if not _plugin:
                         logger.warn("Unknown plugin {} - skipping.".format(_step.plugin))
                         continue
-                    self._process_step(i+1, _plugin, _step)
+                    _steps.append((i+1, _plugin, _step))
+                _consumers = self._step_consumers([_step for _cnt, _plugin, _step in _steps])
+                _conditional = any(_plugin.impl.CONDITIONAL for _cnt, _plugin, _step in _steps)
+                _fingerprint = self._fingerprint(_source, [_step for _cnt, _plugin, _step in _steps])
+                for (_cnt, _plugin, _step), _step_consumers in zip(_steps, _consumers):
+                    self._process_step(_cnt, _plugin, _step, _step_consumers)
                     _last_step = _step
                 if _last_step and _last_step.data_out:
-                    _stats = self._process_items_updates(_source, _last_step)
-                    _source.item_count_total = _stats['create'] + _stats['update']
-                    _source.item_count_error = len(_stats['errors'])
-                    _source.update_status = _stats['status']
+                    _unchanged = _previous_success and _fingerprint == self._fingerprint_load(_source)
+                    _stats = self._process_items_updates(_source, _last_step, _conditional, _unchanged)
+                    if _stats:
+                        _source.item_count_total = _stats['create'] + _stats['update']
+                        _source.item_count_error = len(_stats['errors'])
+                        self._fingerprint_save(_source, _fingerprint)
+                    _status = _stats['status'] if _stats else 'Import skipped: data not modified'
+                    _source.update_status = '; '.join([_status] + self._context.get_status())[:256]
                 if _last_step:
                     _source.update_error = None
                 _source.update_date_end = utils.DateTime.now()
                 _source.save()
             except Exception as e:
+                _error_step = e.get_step() if isinstance(e, ProcessingException) else _last_step
                 _source.update_date_end = utils.DateTime.now()
                 _source.update_error = "{}: {}".format(
-                    _last_step.title if _last_step else 'General error',
+                    _error_step.title if _error_step else 'General error',
                     getattr(e, 'message', e)
                 )
                 _source.update_status = None
                 _source.save()
                 raise e
 
-    def _process_step(self, cnt, plugin, step):
+    def _step_consumers(self, steps):
+        # Count the steps reading the output of each step (the last step is
+        # read by the item update) to decide how to pass results along
+        _consumers = []
+        for i, _step in enumerate(steps):
+            _count = 0
+            if _step.data_out:
+                _count = 1 if i == len(steps) - 1 else 0
+                for _next in steps[i+1:]:
+                    if _next.data_in == _step.data_out:
+                        _count = _count + 1
+                    if _next.data_out == _step.data_out:
+                        break
+            _consumers.append(_count)
+        return _consumers
+
+    def _process_step(self, cnt, plugin, step, consumers=1):
         if step.data_in:
             _data_input = self._context.get_input(step.data_in)
         else:
             _data_input = [DataContainer(data=None, data_type=DataType(DataType.TYPE, 'string'), conv=NoopDataConverter())]
-        
-        if step.merge_in:
-            if len(_data_input):
-                _first = _data_input[0].copy()
-                for _data in _data_input[1:]:
-                    _first.append(_data)
-                _data_input = [_first]
-            else:
-                _data_input = []
-        
-        _data_output = []
-        for i, _data_in in enumerate(_data_input):
-            _data_out = self._process_step_plugin(cnt, i+1, len(_data_input), plugin, step, _data_in)
 
-            if step.loop_out and len(_data_out):
-                _data_out = _data_out[0].items()
-
-            logger.info("Result: {} items, {}".format(len(_data_out), _data_out))
-
-            _data_output.extend(_data_out)
+        if step.merge_in:
+            _merged = DataContainer.merge(_data_input)
+            _data_input = [_merged] if _merged else []
+
+        # Results are streamed to the single step reading them, shared as list
+        # when read by multiple steps or processed immediately when not used
+        _data_output = self._process_step_output(cnt, plugin, step, _data_input)
+        if consumers == 0:
+            for _data_out in _data_output:
+                pass
+            _data_output = []
+        elif consumers > 1:
+            _data_output = list(_data_output)
         if step.data_out:
             self._context.set_output(step.data_out, _data_output)
 
+    def _process_step_output(self, cnt, plugin, step, data_input):
+        _icnt = len(data_input) if type(data_input) == list else None
+        try:
+            if step.concurrency and step.concurrency > 1:
+                _results = self._process_step_parallel(cnt, _icnt, plugin, step, data_input, step.concurrency)
+            else:
+                _results = (self._process_step_plugin(cnt, i+1, _icnt, plugin, step, _data_in) for i, _data_in in enumerate(data_input))
+            for _data_out in _results:
+                if step.loop_out and len(_data_out):
+                    _data_out = _data_out[0].items()
+
+                logger.info("Result: {}".format(_data_out))
+
+                yield from _data_out
+        except ProcessingException as e:
+            raise e
+        except Exception as e:
+            raise ProcessingException(step, getattr(e, 'message', e)) from e
+
+    def _process_step_parallel(self, cnt, icnt, plugin, step, data_input, concurrency):
+        # Inputs are read in this thread and only a limited amount of them is
+        # processed at once, results are returned in order of the inputs
+        _pending = collections.deque()
+        _executor = concurrent.futures.ThreadPoolExecutor(max_workers=concurrency)
+        try:
+            for i, _data_in in enumerate(data_input):
+                _pending.append(_executor.submit(self._process_step_worker, cnt, i+1, icnt, plugin, step, _data_in))
+                if len(_pending) >= concurrency * 2:
+                    yield _pending.popleft().result()
+            while _pending:
+                yield _pending.popleft().result()
+        finally:
+            _executor.shutdown(cancel_futures=True)
+
+    def _process_step_worker(self, *args):
+        try:
+            return self._process_step_plugin(*args)
+        finally:
+            connection.close()  # connections are opened per thread
+
     def _process_step_plugin(self, cnt, i, icnt, plugin, step, _data_in):
-        logger.info("Run step {}: {}/{} {}".format(cnt, i, icnt, step))
+        logger.info("Run step {}: {}/{} {}".format(cnt, i, icnt if icnt is not None else '-', step))
         if step.mime_in:
             _data_in = DataContainer(data=_data_in, data_type=DataType(DataType.MIME, step.mime_in))
 
-        _data_out = plugin.run_instance(step.instance, step, self._context.evaluate(step.get_config()), _data_in, self._context)
+        _data_out = plugin.run_instance(step.instance, step, self._context.evaluate_config(step), _data_in, self._context)
 
         if not step.data_out:
             return []
@@ -129,8 +228,51 @@ class Processor:
 
         return _data_out
 
-    def _process_items_updates(self, source, last_step):
-        _data_out = self._context.get_input(last_step.data_out)[0].convert(DataType(DataType.TYPE, 'dict'))
+    def _fingerprint(self, source, steps):
+        _md5 = hashlib.md5()
+        _md5.update(utils.Json.from_dict([
+            source.map_item_id_ext,
+            source.map_item_url,
+            source.map_item_date_creation,
+            source.map_item_meta,
+            [[_step.id, _step.updated.isoformat() if _step.updated else None] for _step in steps],
+        ]).encode())
+        return _md5.hexdigest()
+
+    def _fingerprint_file(self, source):
+        return models.Data.path(['source', 'state', '{}.json'.format(source.id)])
+
+    def _fingerprint_load(self, source):
+        _filename = self._fingerprint_file(source)
+        if not utils.Filesystem.file_exists(_filename):
+            return None
+        return utils.Json.to_dict(utils.Filesystem.file_read(_filename)).get('fingerprint')
+
+    def _fingerprint_save(self, source, fingerprint):
+        _filename = self._fingerprint_file(source)
+        utils.Filesystem.path_create(os.path.dirname(_filename))
+        utils.Filesystem.file_write(_filename, utils.Json.from_dict({'fingerprint': fingerprint}).encode())
+
+    def _process_items_updates(self, source, last_step, conditional=False, unchanged=False):
+        _data_out = next(iter(self._context.get_input(last_step.data_out)), None)
+        if _data_out is None:
+            raise Exception("No data available in {}".format(last_step.data_out))
+        _data_out = _data_out.convert(DataType(DataType.TYPE, 'dict'))
+        if conditional and unchanged:
+            # Read the data in chunks until any step reports changed data and
+            # skip the import when no step did (configuration is unchanged)
+            _chunk_size = settings.FRAMARAMA['CONFIG_SOURCE_IMPORT_CHUNK_SIZE']
+            _data = iter(_data_out.get())
+            _read = []
+            for _chunk in utils.Lists.chunked(_data, _chunk_size):
+                _read.extend(_chunk)
+                if self._context.is_modified():
+                    break
+            else:
+                if not self._context.is_modified():
+                    logger.info("Import skipped, data and configuration not modified")
+                    return None
+            _data_out = DataContainer(data=itertools.chain(_read, _data), data_type=DataType(DataType.TYPE, 'dict'))
         _stats = self._process_items_update(source, _data_out)
         _stats['status'] = "Import completed: {} processed ({} created, {} updated, {} deleted, {} errors)".format(
             _stats['cnt'],
@@ -147,73 +289,141 @@ class Processor:
     def _process_items_update(self, source, data_out):
         _frame = self._context.get_frame()
         _time_zone = self._context.get_time_zone()
-        _existing = {_item.url: _item for _item in source.items.all()}
-        _processed = []
+        _chunk_size = settings.FRAMARAMA['CONFIG_SOURCE_IMPORT_CHUNK_SIZE']
+        _db = router.db_for_write(models.Item)
+        _existing = {_item[1]: _item for _item in source.items.values_list('id', 'url', 'version', 'id_ext', 'date_creation')}
+        _processed = set()
         _fields = self._item_mapping(source)
+        _meta_names = [_name for _name in _fields if _name not in ['id', 'url', 'date_creation']]
         _stats = {'cnt': 0, 'create': 0, 'update': 0, 'delete': 0, 'errors': []}
+        _modified = 0
+
+        logger.info("Processing items, {} existing items".format(len(_existing)))
+
+        for _chunk in utils.Lists.chunked(data_out.get(), _chunk_size):
+            _now = utils.DateTime.now()
+            _items_create = []
+            _items_update = []
+            _items_touch = []
+            _metas = {}
+            for _data in _chunk:
+                _stats['cnt'] = _stats['cnt'] + 1
+                _values = self._item_values(_fields, _data, _time_zone)
+
+                _item_id = _values.get('id')
+                _item_url = _values.get('url')
+                _item_date_creation = _values.get('date_creation')
+
+                try:
+                    if _item_id is None:
+                        raise Exception("Item skipped, missing ID: {}".format(_values))
+
+                    if _item_url is None:
+                        raise Exception("Item skipped, missing URL: {}".format(_values))
+
+                    if _item_date_creation is None:
+                        raise Exception("Item skipped, missing creation date: {}".format(_values))
+
+                    if _item_url in _processed:
+                        raise Exception("Item skipped, duplicate: {}".format(_item_url))
+
+                    _pk = None
+                    if _item_url in _existing:
+                        _pk, _url, _version, _id_ext, _date_creation = _existing.pop(_item_url)
+                        if _id_ext == _item_id and _date_creation == _item_date_creation:
+                            _items_touch.append(_pk)
+                        else:
+                            _items_update.append(models.Item(
+                                id=_pk, version=_version + 1, id_ext=_item_id,
+                                date_creation=_item_date_creation, updated=_now))
+                    else:
+                        _items_create.append(models.Item(
+                            frame_id=_frame.id, source_id=source.id, version=0, url=_item_url,
+                            id_ext=_item_id, date_creation=_item_date_creation, created=_now, updated=_now))
+
+                    _processed.add(_item_url)
+                    _metas[_item_url] = (_pk, {_name: _values[_name] for _name in _meta_names if _name in _values})
+                except Exception as e:
+                    _stats['errors'].append({'item': _item_url, 'error': e})
+
+            with transaction.atomic(using=_db):
+                models.Item.objects.using(_db).bulk_create(_items_create, batch_size=_chunk_size)
+                models.Item.objects.using(_db).bulk_update(_items_update, Processor.ITEM_UPDATE_FIELDS, batch_size=_chunk_size)
+                models.Item.objects.using(_db).filter(pk__in=_items_touch).update(updated=_now)
+                _meta_modified = self._items_meta_update(_db, source, _metas, _items_create, _now)
+            _stats['create'] = _stats['create'] + len(_items_create)
+            _stats['update'] = _stats['update'] + len(_items_update) + len(_items_touch)
+            _modified = _modified + len(_items_update) + _meta_modified
+
+            logger.info("Processed {} items ({} created, {} updated, {} deleted, {} errors)".format(
+                _stats['cnt'],
+                _stats['create'],
+                _stats['update'],
+                _stats['delete'],
+                len(_stats['errors'])))
+
+        for _chunk in utils.Lists.chunked([_item[0] for _item in _existing.values()], _chunk_size):
+            _stats['delete'] = _stats['delete'] + self._items_delete(_db, _chunk)
+
+        if _modified or _stats['create'] or _stats['delete']:
+            models.Frame.increase_version(_frame.id, using=_db)
 
-        logger.info("Collected {} items, {} existing items".format(
-            len(data_out.get()),
-            len(_existing)))
-
-        for _data in data_out.get():
-            if _stats['cnt'] % 100 == 0:
-                logger.info("Processed {} items ({} created, {} updated, {} deleted, {} errors)".format(
-                    _stats['cnt'],
-                    _stats['create'],
-                    _stats['update'],
-                    _stats['delete'],
-                    len(_stats['errors'])))
-            _stats['cnt'] = _stats['cnt'] + 1
-            _values = self._item_values(_fields, _data, _time_zone)
-
-            _item_id = _values.get('id')
-            _item_url = _values.get('url')
-            _item_date_creation = _values.get('date_creation')
-
-            try:
-                if _item_id is None:
-                    raise Exception("Item skipped, missing ID: {}".format(_values))
-
-                if _item_url is None:
-                    raise Exception("Item skipped, missing URL: {}".format(_values))
-
-                if _item_date_creation is None:
-                    raise Exception("Item skipped, missing creation date: {}".format(_values))
-
-                if _item_url in _processed:
-                    raise Exception("Item skipped, duplicate: {}".format(_item_url))
+        return _stats
 
-                if _item_url in _existing:
-                    _item = _existing[_item_url]
-                    _item.version = _item.version + 1
-                    _stats_type = 'update'
+    def _items_delete(self, db, ids):
+        with transaction.atomic(using=db):
+            # Remove thumbnails upfront so deleting the items does not need to
+            # resolve and delete each thumbnail within the post_delete signal
+            _files = models.ItemThumbnailData.delete_bulk(
+                models.ItemThumbnailData.objects.using(db).filter(item__id__in=ids))
+            _files.extend(models.DisplayItemThumbnailData.delete_bulk(
+                models.DisplayItemThumbnailData.objects.using(db).filter(displayitem__item__id__in=ids)))
+            _count, _details = models.Item.objects.using(db).filter(pk__in=ids).delete()
+        models.Data.delete_files(_files)
+        return _details.get(models.Item._meta.label, 0)
+
+    def _items_meta_update(self, db, source, metas, items_created, now):
+        # Get IDs of created items (not all databases return them on insert)
+        _ids = {_item.url: _item.pk for _item in items_created if _item.pk is not None}
+        _missing = [_item.url for _item in items_created if _item.pk is None]
+        if _missing:
+            _ids.update(source.items.using(db).filter(url__in=_missing).values_list('url', 'id'))
+        _metas = {_pk if _pk else _ids[_url]: _values for _url, (_pk, _values) in metas.items()}
+
+        # Compare with stored values and only write changed values
+        _existing = collections.defaultdict(dict)
+        for _meta in models.ItemMeta.objects.using(db).filter(item_id__in=_metas.keys()):
+            _existing[_meta.item_id][_meta.name] = _meta
+        _metas_create = []
+        _metas_update = []
+        _metas_delete = []
+        _modified = set()
+        for _item_id, _values in _metas.items():
+            _item_metas = _existing.pop(_item_id, {})
+            for _name, _value in _values.items():
+                _meta_values = models.ItemMeta.get_values(_value)
+                _meta = _item_metas.pop(_name, None)
+                if _meta is None:
+                    _metas_create.append(models.ItemMeta(
+                        item_id=_item_id, name=_name, created=now, updated=now, **_meta_values))
+                elif any(getattr(_meta, _field) != _field_value for _field, _field_value in _meta_values.items()):
+                    for _field, _field_value in _meta_values.items():
+                        setattr(_meta, _field, _field_value)
+                    _meta.updated = now
+                    _metas_update.append(_meta)
                 else:
-                    _item = models.Item()
-                    _item.frame = _frame
-                    _item.source = source
-                    _item.version = 0
-                    _item.url = _item_url
-                    _item.created = utils.DateTime.now()
-                    _stats_type = 'create'
-
-                _item.id_ext = _item_id
-                _item.date_creation = _item_date_creation
-                _item.updated = utils.DateTime.now()
-                _item.save()
-
-                _processed.append(_item_url)
-                if _stats_type == 'update':
-                    _existing.pop(_item_url)
-                _stats[_stats_type] = _stats[_stats_type] + 1
-            except Exception as e:
-                _stats['errors'].append({'item': _item_url, 'error': e})
-
-        for _item in _existing.values():
-            _item.delete()
-            _stats['delete'] = _stats['delete'] + 1
-
-        return _stats
+                    continue
+                _modified.add(_item_id)
+            if _item_metas:
+                _metas_delete.extend([_meta.id for _meta in _item_metas.values()])
+                _modified.add(_item_id)
+
+        _chunk_size = settings.FRAMARAMA['CONFIG_SOURCE_IMPORT_CHUNK_SIZE']
+        models.ItemMeta.objects.using(db).filter(pk__in=_metas_delete).delete()
+        models.ItemMeta.objects.using(db).bulk_update(
+            _metas_update, ['value_text', 'value_int', 'value_date', 'updated'], batch_size=_chunk_size)
+        models.ItemMeta.objects.using(db).bulk_create(_metas_create, batch_size=_chunk_size)
+        return len(_modified)
 
     def _item_mapping(self, source):
         _fields = {
@@ -61,7 +61,11 @@ class BaseConfigView(BaseAuthenticatedView):
         _download_data = BaseConfigView.DEFAULT_THUMBNAIL
         _download_mime = BaseConfigView.DEFAULT_THUMBNAIL_MIME
         try:
-            if item.is_remote():
+            _cached = api.ApiClient.get().get_url_cached(item.url) if item.is_remote() else None
+            if _cached:
+                _download_data = utils.Filesystem.file_read(_cached[0])
+                _download_mime = _cached[1]
+            elif item.is_remote():
                 _response = api.ApiClient.get().get_url(item.url)
                 _response.raise_for_status()
                 _download_data = _response.content
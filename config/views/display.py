@@ -34,8 +34,8 @@ class ThumbnailDisplayView(base.BaseDisplayConfigView):
 
     def _get(self, request, display_id, *args, **kwargs):
         _context = super()._get(request, display_id, *args, **kwargs)
-        _items = self.qs().displayitems.filter(display__id=display_id, thumbnail__isnull=False).order_by('?').all()[:1]
-        self.response_item_thumbnail(_context, _items[0] if len(_items) else None)
+        _item = self.qs().displayitems.filter(display__id=display_id, thumbnail__isnull=False).random()
+        self.response_item_thumbnail(_context, _item)
         return _context
 
 
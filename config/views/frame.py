@@ -1,8 +1,8 @@
 
 from django.conf import settings
 from django.views.generic import RedirectView
-from django.core.paginator import Paginator
 from django.core.exceptions import ValidationError
+from django.db.models import Q
 
 from framarama.base import utils
 from framarama.base.forms import UploadFieldForm
@@ -44,8 +44,8 @@ class ThumbnailFrameView(base.BaseFrameConfigView):
 
     def _get(self, request, frame_id, *args, **kwargs):
         _context = super()._get(request, frame_id, *args, **kwargs)
-        _items = self.qs().items.filter(frame__id=frame_id, thumbnail__isnull=False).order_by('?').all()[:1]
-        self.response_item_thumbnail(_context, _items[0] if len(_items) else None)
+        _item = self.qs().items.filter(frame__id=frame_id, thumbnail__isnull=False).random()
+        self.response_item_thumbnail(_context, _item)
         return _context
 
 
@@ -277,13 +277,23 @@ class ItemsSourceFrameView(base.BaseSourceFrameConfigView):
         _context = super()._get(request, frame_id, source_id, *args, **kwargs)
         _source = self.qs().sources.filter(pk=source_id).get()
         _search = request.GET.get('search', '')
-        _page = request.GET.get('page')
-        _page_size = request.GET.get('page_size', 20)
+        _page_size = utils.KeysetPage.size(request.GET)
+        _direction, _cursor = utils.KeysetPage.cursor(request.GET)
         if _search:
             _items = _source.items.filter(url__icontains=_search)
         else:
             _items = _source.items.all()
-        _context['items'] = Paginator(_items.order_by('created'), _page_size).get_page(_page)
+        if _direction == utils.KeysetPage.AFTER:
+            _created = utils.DateTime.parse(_cursor[0])
+            _items = _items.filter(Q(created__gt=_created) | Q(created=_created, id__gt=_cursor[1])).order_by('created', 'id')
+        elif _direction == utils.KeysetPage.BEFORE:
+            _created = utils.DateTime.parse(_cursor[0])
+            _items = _items.filter(Q(created__lt=_created) | Q(created=_created, id__lt=_cursor[1])).order_by('-created', '-id')
+        else:
+            _items = _items.order_by('created', 'id')
+        _context['items'] = utils.KeysetPage(
+            _items[:_page_size + 1], _page_size,
+            lambda item: [item.created.isoformat(), item.id], _direction)
         _context['search'] = _search
 
         _scheduler = self.get_scheduler()
@@ -330,11 +340,19 @@ class ListSortingFrameView(base.BaseFrameConfigView):
         _context['sortings'] = _frame.sortings.all()
         _context['sorting_plugins'] = plugins.SortingPluginRegistry.all()
         
-        _page = request.GET.get('page')
-        _page_size = request.GET.get('page_size', 20)
-        _processor = sorting.Processor(sorting.Context(_frame))
+        _page_size = utils.KeysetPage.size(request.GET)
+        _cursor = utils.KeysetPage.cursor(request.GET, 2)
+        _processor = sorting.Processor(sorting.Context(_frame, cursor=_cursor, limit=_page_size + 1))
         _result = _processor.process()
-        _result['items'] = Paginator(_result['items'], _page_size).get_page(_page)
+        if 'list' in _result['errors']:
+            # Fallback ordering has no weights to continue from, show first page only
+            _result['items'] = utils.KeysetPage(
+                _result['items'][:_page_size], _page_size,
+                lambda item: [item.weight, item.id])
+        else:
+            _result['items'] = utils.KeysetPage(
+                _result['items'][:_page_size + 1], _page_size,
+                lambda item: [item.weight, item.id], _cursor[0])
         _context.update(_result)
 
         return _context
@@ -357,6 +375,7 @@ class CreateSortingFrameView(base.BaseFrameConfigView):
         _form = _plugin.get_form(request.POST)
         if _form.is_valid():
             _form.save(_plugin, defaults={'frame': _frame}, models=_frame.sortings)
+            self.get_scheduler().frame_rank_schedule(_frame)
             self.redirect(_context, 'frame_sorting_list', args=[_frame.id])
         _context['plugin'] = _plugin
         _context['form'] = _form
@@ -382,6 +401,7 @@ class UpdateSortingFrameView(base.BaseSortingFrameConfigView):
         _form = _sorting_plugin.get_form(request.POST, instance=_sorting)
         if _form.is_valid():
             _form.save(_sorting_plugin)
+            self.get_scheduler().frame_rank_schedule(_frame)
             self.redirect(_context, 'frame_sorting_list', args=[_frame.id])
         _context['form'] = _form
         return _context
@@ -396,6 +416,7 @@ class ActionSortingFrameView(base.BaseSortingFrameConfigView):
         _action = request.GET['action']
         if _action == 'delete':
             self._item_order_delete(_sorting.pk, _frame.sortings)
+            self.get_scheduler().frame_rank_schedule(_frame)
         self.redirect(_context, 'frame_sorting_list', args=[_frame.id])
         return _context
 
@@ -405,8 +426,8 @@ class EvalSortingFrameView(base.BaseSortingFrameConfigView):
         _context = super()._post(request, frame_id, sorting_id, *args, **kwargs)
         _frame = _context['frame']
         _code= request.POST.get('code')
-        _page= request.POST.get('page') or 0
-        _page_size = request.POST.get('page_size') or 20
+        _page_size = utils.KeysetPage.size(request.POST)
+        _explain = request.POST.get('explain') == '1'
         if settings.FRAMARAMA['CONFIG_SORTING_EVAL_QUERY'] and _code:
             try:
                 _plugin = plugins.SortingPluginRegistry.get('custom')
@@ -416,21 +437,21 @@ class EvalSortingFrameView(base.BaseSortingFrameConfigView):
                 _custom.plugin = 'custom'
                 _custom.plugin_config['code'] = _code
 
-                if int(_page_size) > 100:
-                    _page_size = 100
-
-                _processor = sorting.Processor(sorting.Context(_frame, sortings=[_custom]))
+                _cursor = utils.KeysetPage.cursor(request.POST)
+                _processor = sorting.Processor(sorting.Context(_frame, sortings=[_custom], cursor=_cursor, limit=_page_size + 1, profile=True, explain=_explain))
                 _result = _processor.process()
-                _result['items'] = Paginator(_result['items'], _page_size).get_page(_page)
+                _result['items'] = utils.KeysetPage(
+                    list(_result['items'])[:_page_size + 1], _page_size,
+                    lambda item: [item.weight, item.id], _cursor[0])
                 _items = []
                 for _item in _result['items']:
                     _serializer = RankedItemFrameSerializer(_item)
                     _items.append(_serializer.data)
                 self.response_json(_context, {
-                    'start': _result['items'].start_index(),
-                    'end': _result['items'].end_index(),
                     'error': ', '.join([str(_e) for _i, _e in _result['errors'].items()]) if _result['errors'] else None,
-                    'page': _page,
+                    'next': _result['items'].next_cursor(),
+                    'previous': _result['items'].previous_cursor(),
+                    'profile': _result['profile'],
                     'items': _items
                 })
             except Exception as e:
@@ -610,10 +631,7 @@ class PreviewImageFrameView(base.BaseFrameConfigView):
         _frame = _context['frame']
         _items = _frame.items
         _items = _items.filter(id=request.GET['id']) if 'id' in request.GET else _items
-        _items = _items.order_by('?').all()
-        _paginator = Paginator(_items, 1)
-        _page = _paginator.get_page(0)
-        _item = _page.object_list[0] if len(_page.object_list) else None
+        _item = _items.random()
         _width = request.GET['w'] if 'w' in request.GET else 1024
         _height = request.GET['h'] if 'h' in request.GET else 768
         _display = models.Display(**{'name': 'Preivew display', 'description': 'Display for preparing previews', 'enabled': True, 'device_width': int(_width), 'device_height': int(_height)})
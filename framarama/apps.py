@@ -8,6 +8,7 @@ from framarama import jobs
 
 class BaseAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
+    _scheduler = None
 
     def get_scheduler(self):
         return self._scheduler
@@ -121,6 +121,12 @@ class ApiClient(Singleton):
         else:
             return self._http(url, method, data, headers, **kwargs)
 
+    def get_url_cached(self, url: str) -> typing.Union[tuple, None]:
+        _cache = Network.download_cache()
+        if _cache is None:
+            return None
+        return _cache.download(url, lambda url, headers: self.get_url(url, headers=headers, stream=True))
+
     def get_display(self) -> ApiResultItem:
         _data = self._request('/displays')
         if _data and 'results' in _data and len(_data['results']):
@@ -145,6 +151,11 @@ class ApiClient(Singleton):
         _result = self._list(_data, config_models.RankedItem, config_views.RankedItemDisplaySerializer)
         return _result.item(0) if _result.count() > 0 else None
 
+    def get_items_upcoming(self, display_id: int, count: int) -> ApiResultList:
+        return self._list(
+            self._request('/displays/{}/items/upcoming?count={}'.format(display_id, count)),
+            config_models.RankedItem, config_views.RankedItemDisplaySerializer)
+
     def submit_item_hit(self, display_id: int, data: dict, thumbnail: typing.Union[bytes, None]=None, mime: typing.Union[str, None]=None, meta: typing.Union[str, None]=None) -> object:
         if thumbnail or mime:
             _thumbnail = {}
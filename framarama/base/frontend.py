@@ -6,6 +6,7 @@ import time
 import fcntl
 import threading
 import datetime
+import collections
 import jsonpickle
 import base64
 import logging
@@ -18,7 +19,7 @@ from django.db import connections
 
 from frontend import models
 from framarama.base import device
-from framarama.base.utils import Singleton, Config, Filesystem, Process, DateTime, Json
+from framarama.base.utils import Singleton, Config, Filesystem, FileCache, Process, DateTime, Json, Network
 from framarama.base.api import ApiClient, ApiResultItem
 from config.utils import context, finishing
 from config import models as config_models
@@ -289,7 +290,8 @@ class Frontend(Singleton):
                 'address': {
                     'ip': _network_config['ip'] if _network_config else None,
                     'gateway': _network_config['gateway'] if _network_config else None,
-                }
+                },
+                'http': Network.get_stats(),
             }
         if restrictions is None  or 'screen' in restrictions:
             _data['screen'] = self.get_screen()
@@ -304,6 +306,8 @@ class Frontend(Singleton):
                 'error': _config.count_errors,
                 'updated': DateTime.utc(_config.date_items_update) if _config.date_items_update else None,
                 'latest': _latest_items,
+                'cache': _device.get_finishing_cache_stats(),
+                'download': Network.download_cache().get_stats() if Network.download_cache() else None,
             }
         if restrictions is None  or 'app' in restrictions:
             _app_revision = _capability.app_revision()
@@ -341,6 +345,8 @@ class Display(Singleton):
         self._client.register_user_agent('d', self.get_id())
         self._items = None
         self._next = None
+        self._next_queue = collections.deque()
+        self._next_queue_version = None
         self._finishings = None
         self._contexts = None
         self._setting_vars = None
@@ -434,9 +440,45 @@ class Display(Singleton):
 
     def get_next_item(self, refresh=False):
         if self._next is None or refresh:
-            self._next = self._client.get_items_next(self.get_id()).item()
+            _version = self._frame_version(refresh=refresh and self._next_queue_size() > 1)
+            if self._next_queue and self._next_queue_version != _version:
+                logger.info("Frame changed, dropping {} upcoming items".format(len(self._next_queue)))
+                self._next_queue.clear()
+            if not self._next_queue:
+                self._next_queue_fill(_version)
+            if self._next_queue:
+                self._next = self._next_queue.popleft()
+            else:
+                self._next = self._client.get_items_next(self.get_id()).item()
         return self._next
 
+    def _next_queue_size(self):
+        _queue_size = settings.FRAMARAMA['FRONTEND_ITEM_QUEUE_SIZE']
+        return _queue_size if _queue_size else 0
+
+    def _next_queue_fill(self, version):
+        _queue_size = self._next_queue_size()
+        if _queue_size <= 1:
+            return
+        try:
+            _items = self._client.get_items_upcoming(self.get_id(), _queue_size).items()
+            self._next_queue_version = version
+            self._next_queue.extend([_item.item() for _item in _items])
+            logger.info("Retrieved {} upcoming items".format(len(_items)))
+        except Exception as e:
+            logger.warning("Could not retrieve upcoming items, using single item: {}".format(e))
+
+    def _frame_version(self, refresh=False):
+        if refresh:
+            try:
+                _data = self._client.get_display()
+                if _data:
+                    self._data = _data
+            except Exception as e:
+                logger.warning("Could not refresh display: {}".format(e))
+        _frame = self.frame()
+        return _frame.version if _frame else None
+
     def get_contexts(self, refresh=False):
         if self._contexts is None or refresh:
             self._contexts = [_item.item() for _item in self._client.get_contexts(self.get_id()).items()]
@@ -470,6 +512,7 @@ class FrontendDevice(Singleton):
     FILE_STREAM_FORMAT = 'framarama-{}.{}'
     FILE_UPLOAD = DATA_PATH + '/framarama-upload.image'
     FILE_UPLOAD_JSON = DATA_PATH + '/framarama-upload.json'
+    CACHE_FINISHING_PATH = DATA_PATH + '/cache/finishing'
 
     def __init__(self):
         super().__init__()
@@ -482,6 +525,7 @@ class FrontendDevice(Singleton):
         }
         self._capability = None
         self._display_status_force = None
+        self._finishing_cache = None
 
     def _items_rotate(self, count_items_keep=None, start=0, reverse=False):
         return Filesystem.file_rotate(
@@ -498,7 +542,51 @@ class FrontendDevice(Singleton):
     def monitor(self):
         return self._monitor
 
-    def _finish(self, display, item, output):
+    def _disk_data_free(self):
+        _disk_data = self.get_capability().disk_data_free()
+        return _disk_data[1] * 1024 if _disk_data else None
+
+    def get_finishing_cache(self):
+        _size = settings.FRAMARAMA['FRONTEND_FINISHING_CACHE_SIZE']
+        if not _size:
+            return None
+        if self._finishing_cache is None:
+            self._finishing_cache = FileCache(
+                self.CACHE_FINISHING_PATH, _size,
+                settings.FRAMARAMA['FRONTEND_CACHE_FREE'], self._disk_data_free)
+        return self._finishing_cache
+
+    def get_finishing_cache_stats(self):
+        _cache = self.get_finishing_cache()
+        return _cache.get_stats() if _cache else None
+
+    def _finish_cached(self, cache, key, item, output):
+        _files = cache.get(key, ['json', 'image', 'preview'])
+        if _files is None:
+            return None
+        _start = DateTime.now()
+        _cached = jsonpickle.decode(Filesystem.file_read(_files['json']).decode())
+        _result = finishing.ProcessingResult(_cached['image_meta'], None, _cached['preview_meta'], None, _cached['meta'])
+        _json = jsonpickle.encode({
+          'item': item,
+          'image_meta': _result.get_image_meta(),
+          'preview_meta': _result.get_preview_meta(),
+          'meta': _result.get_meta(),
+          'time': DateTime.utc(DateTime.now()),
+          'usage_time': 0,
+        })
+        _output = output()
+        Filesystem.file_write(_output['json'], _json.encode())
+        Filesystem.file_copy(_files['image'], _output['image'])
+        Filesystem.file_copy(_files['preview'], _output['preview'])
+        logger.info("Item taken from cache in {} seconds ({}x{} pixels, mime {})".format(
+            (DateTime.now() - _start).seconds,
+            _result.get_image_width(),
+            _result.get_image_height(),
+            _result.get_image_mime()))
+        return _result
+
+    def _finish(self, display, item, output, cache=True):
         logger.info('Finishing item {}'.format(item))
         _context = finishing.Context(
             display.display(),
@@ -509,11 +597,17 @@ class FrontendDevice(Singleton):
             display.get_setting_variables(),
             finishing.ImageProcessingAdapter.get_default(),
             self)
+        _config = Frontend.get().get_config().get_config()
+        _processor = finishing.Processor(_context)
+        _processor.set_watermark(_config.watermark_type, _config.watermark_shift, _config.watermark_scale)
+        _cache = self.get_finishing_cache() if cache else None
+        _cache_key = _processor.get_cache_key() if _cache else None
+        if _cache:
+            _result = self._finish_cached(_cache, _cache_key, item, output)
+            if _result:
+                return _result
         with _context:
             _start = DateTime.now()
-            _config = Frontend.get().get_config().get_config()
-            _processor = finishing.Processor(_context)
-            _processor.set_watermark(_config.watermark_type, _config.watermark_shift, _config.watermark_scale)
             _result = _processor.process()
             if _result:
                 _json = jsonpickle.encode({
@@ -529,6 +623,19 @@ class FrontendDevice(Singleton):
                 Filesystem.file_write(_files['json'], _json.encode())
                 Filesystem.file_write(_files['image'], _result.get_image_data())
                 Filesystem.file_write(_files['preview'], _result.get_preview_data())
+                if _cache:
+                    try:
+                        _cache.put(_cache_key, {
+                            'json': jsonpickle.encode({
+                              'image_meta': _result.get_image_meta(),
+                              'preview_meta': _result.get_preview_meta(),
+                              'meta': _result.get_meta(),
+                            }).encode(),
+                            'image': _result.get_image_data(),
+                            'preview': _result.get_preview_data(),
+                        })
+                    except Exception as e:
+                        logger.warning("Could not store finished item in cache: {}".format(e))
 
                 logger.info("Item finished in {} seconds ({} bytes, {}x{} pixels, mime {})!".format(
                     (DateTime.now() - _start).seconds,
@@ -546,11 +653,12 @@ class FrontendDevice(Singleton):
 
     def finish_file(self, display, filename):
         _item = config_models.Item(**{'id_ext': -1, 'url': filename, 'date_creation': DateTime.now()})
+        # Uploaded files are shown once, so they are not stored in the cache
         _result = self._finish(display, _item, lambda: {
             'json': self.DATA_PATH + self.FILE_STREAM_FORMAT.format('stream', 'json'),
             'image': self.DATA_PATH + self.FILE_STREAM_FORMAT.format('stream', 'image'),
             'preview': self.DATA_PATH + self.FILE_STREAM_FORMAT.format('stream', 'preview')
-        })
+        }, cache=False)
         if _result:
             return self.get_streamed()[0]
 
@@ -1,3 +1,4 @@
+import random
 import zoneinfo
 
 from django.db import models
@@ -22,6 +23,19 @@ class BaseQuerySet(models.QuerySet):
     def for_import(self):
         return {_i: _model for _i, _model in self.items()}
 
+    def random(self, attempts=3):
+        ''' Returns a random object without sorting all rows (like "ORDER BY RANDOM()") '''
+        _queryset = self.order_by()
+        _range = _queryset.aggregate(models.Min('pk'), models.Max('pk'))
+        if _range['pk__min'] is None:
+            return None
+        for _i in range(attempts):
+            _object = _queryset.filter(pk__gte=random.randint(_range['pk__min'], _range['pk__max'])).order_by('pk').first()
+            if _object is not None:
+                return _object
+        # Objects were deleted in the meantime, just use any remaining object
+        return _queryset.first()
+
 
 class BaseManager(models.Manager):
 
@@ -13,11 +13,17 @@ import threading
 import signal
 import logging
 import json
+import base64
+import hashlib
 import importlib
+import functools
 import traceback
 import requests
+import urllib3
+import http.cookiejar
 import dateutil.parser
 
+from django.conf import settings
 from django.utils import dateparse, timezone
 
 from jinja2 import Undefined
@@ -205,6 +211,149 @@ class Filesystem:
         return os.path.isdir(path)
 
 
+class FileCache:
+    ''' Files stored by key within a directory limited in size '''
+    SCAN_INTERVAL = 600
+
+    def __init__(self, path, max_size, min_free=None, free=None):
+        self._path = path
+        self._max_size = max_size
+        self._min_free = min_free
+        self._free = free if free else lambda: shutil.disk_usage(self._path).free
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'size': None}
+        self._entries = None
+        self._scanned = None
+
+    @staticmethod
+    def key(*values):
+        return hashlib.sha256(json.dumps(values, sort_keys=True, default=str).encode()).hexdigest()
+
+    def file(self, key, ext):
+        return os.path.join(self._path, '{}.{}'.format(key, ext))
+
+    def get(self, key, extensions):
+        ''' Returns the filenames of the entry per extension or None if missing '''
+        _files = {_ext: self.file(key, _ext) for _ext in extensions}
+        try:
+            for _file in _files.values():
+                os.utime(_file)  # mark as recently used
+        except FileNotFoundError:
+            self._count('misses')
+            return None
+        with self._lock:
+            self._stats['hits'] = self._stats['hits'] + 1
+            if self._entries is not None and key in self._entries:
+                self._entries[key][1] = time.time()
+        return _files
+
+    def put(self, key, data, keep=False):
+        ''' Stores the data (bytes or file-like objects) per extension '''
+        Filesystem.path_create(self._path)
+        _size = 0
+        for _ext, _data in data.items():
+            _tmp = os.path.join(self._path, '.{}.{}.{}.tmp'.format(key, _ext, threading.get_ident()))
+            with open(_tmp, 'wb') as f:
+                if type(_data) == bytes:
+                    f.write(_data)
+                else:
+                    shutil.copyfileobj(_data, f)
+                _size = _size + f.tell()
+            os.replace(_tmp, self.file(key, _ext))
+        with self._lock:
+            _entries = self._index()
+            _previous = _entries.get(key)
+            _entries[key] = [_size, time.time()]
+            self._stats['size'] = self._stats['size'] + _size - (_previous[0] if _previous else 0)
+        self.evict(keep=key if keep else None)
+        return {_ext: self.file(key, _ext) for _ext in data.keys()}
+
+    def remove(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def _remove(self, key):
+        for _name, _num in Filesystem.file_match(self._path, '^' + re.escape(key) + r'\.([^.]+)$'):
+            Filesystem.file_delete(os.path.join(self._path, _name))
+        if self._entries is not None and key in self._entries:
+            self._stats['size'] = self._stats['size'] - self._entries.pop(key)[0]
+
+    def _index(self):
+        # The size and usage of the entries is tracked in memory and only read
+        # from the directory periodically to catch up with other processes
+        if self._entries is None or time.time() - self._scanned >= FileCache.SCAN_INTERVAL:
+            _entries = {}
+            with os.scandir(self._path) as it:
+                for _entry in it:
+                    if _entry.name.startswith('.') or not _entry.is_file():
+                        continue
+                    _stat = _entry.stat()
+                    _key = _entry.name.split('.')[0]
+                    _size, _used = _entries.get(_key, [0, 0])
+                    _entries[_key] = [_size + _stat.st_size, max(_used, _stat.st_mtime)]
+            self._entries = _entries
+            self._scanned = time.time()
+            self._stats['size'] = sum([_size for _size, _used in _entries.values()])
+        return self._entries
+
+    def evict(self, keep=None):
+        with self._lock:
+            _entries = self._index()
+            _free = self._free() if self._min_free else None
+            if self._stats['size'] <= self._max_size and (_free is None or _free >= self._min_free):
+                return self._stats['size']
+            for _key, (_entry_size, _used) in sorted(list(_entries.items()), key=lambda _entry: _entry[1][1]):
+                if self._stats['size'] <= self._max_size and (_free is None or _free >= self._min_free):
+                    break
+                if _key == keep:
+                    continue
+                self._remove(_key)
+                _free = _free + _entry_size if _free is not None else None
+                self._stats['evictions'] = self._stats['evictions'] + 1
+            return self._stats['size']
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] = self._stats[name] + 1
+
+
+class DownloadCache(FileCache):
+    ''' Downloaded files stored with their ETag and Last-Modified headers '''
+
+    def download(self, url, request):
+        ''' Returns the filename and mime type of the downloaded URL '''
+        _key = FileCache.key(url)
+        _files = self.get(_key, ['data', 'json'])
+        _meta = Json.to_dict(Filesystem.file_read(_files['json']).decode()) if _files else {}
+        _headers = {}
+        if _meta.get('etag'):
+            _headers['If-None-Match'] = _meta['etag']
+        if _meta.get('modified'):
+            _headers['If-Modified-Since'] = _meta['modified']
+        try:
+            with request(url, _headers) as _response:
+                if _files and _response.status_code == 304:
+                    return _files['data'], _meta.get('mime')
+                _response.raise_for_status()
+                _meta = {
+                    'url': url,
+                    'etag': _response.headers.get('ETag'),
+                    'modified': _response.headers.get('Last-Modified'),
+                    'mime': _response.headers.get('Content-Type'),
+                }
+                _response.raw.decode_content = True
+                _files = self.put(_key, {'data': _response.raw, 'json': Json.from_dict(_meta).encode()}, keep=True)
+        except Exception as e:
+            if _files is None:
+                raise e
+            logger.warning("Using cached download of {} after error: {}".format(url, e))
+        return _files['data'], _meta.get('mime')
+
+
 class Process:
 
     @staticmethod
@@ -499,14 +648,13 @@ class Lists:
     @staticmethod
     def chunked(source, size):
         _result = []
-        for _sid, _sval in source:
-            _result.append((_sid, _sval))
+        for _item in source:
+            _result.append(_item)
             if len(_result) == size:
                 yield _result
-                _result[:] = []
-        else:
-            if len(_result):
-                yield _result
+                _result = []
+        if len(_result):
+            yield _result
 
     @staticmethod
     def process(source, target_match, target=None, source_match=None, size=100, create_func=None, update_func=None, delete_func=None):
@@ -613,29 +761,219 @@ class Lists:
         return _result
 
 
+class KeysetPage:
+    ''' Page of items using keyset (cursor) pagination '''
+    AFTER = 'after'
+    BEFORE = 'before'
+
+    def __init__(self, items, size, keys, direction=None):
+        _items = list(items)
+        if direction == KeysetPage.BEFORE:
+            self._has_previous = len(_items) > size
+            self._has_next = True
+            _items = list(reversed(_items[:size]))
+        else:
+            self._has_previous = direction == KeysetPage.AFTER
+            self._has_next = len(_items) > size
+            _items = _items[:size]
+        self._items = _items
+        self._keys = keys
+
+    @staticmethod
+    def cursor(params, length=None):
+        ''' Returns direction and key values of the cursor in request parameters '''
+        for _direction in [KeysetPage.AFTER, KeysetPage.BEFORE]:
+            _cursor = params.get(_direction)
+            if _cursor:
+                try:
+                    _values = json.loads(base64.urlsafe_b64decode(_cursor.encode()))
+                except ValueError:
+                    break
+                if not isinstance(_values, list) or (length is not None and len(_values) != length):
+                    break
+                if not all([type(_value) in (int, float) for _value in _values]):
+                    break
+                return _direction, _values
+        return None, None
+
+    @staticmethod
+    def size(params, default=20, maximum=100):
+        ''' Returns page size in request parameters limited to maximum '''
+        try:
+            _size = int(params.get('page_size') or default)
+        except ValueError:
+            return default
+        return min(_size, maximum) if _size > 0 else default
+
+    @staticmethod
+    def encode(values):
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __getitem__(self, index):
+        return self._items[index]
+
+    def has_next(self):
+        return self._has_next and len(self._items) > 0
+
+    def has_previous(self):
+        return self._has_previous and len(self._items) > 0
+
+    def next_cursor(self):
+        return KeysetPage.encode(self._keys(self._items[-1])) if self.has_next() else None
+
+    def previous_cursor(self):
+        return KeysetPage.encode(self._keys(self._items[0])) if self.has_previous() else None
+
+
 class Network:
     METHOD_GET = 'GET'
     METHOD_POST = 'POST'
     METHOD_PUT = 'PUT'
     METHOD_HEAD = 'HEAD'
+    LATENCY_BUCKETS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+    RETRY_STATUS = [429, 502, 503, 504]
+
+    CACHE_DOWNLOAD_PATH = settings.FRAMARAMA['DATA_PATH'] + '/cache/download'
+    CACHE_DOWNLOAD_SERVER_PATH = settings.FRAMARAMA['DATA_PATH'] + '/cache/download-server'
+
+    _lock = threading.Lock()
+    _session = None
+    _stats = None
+    _download_caches = {}
+
+    class CookiePolicy(http.cookiejar.DefaultCookiePolicy):
+
+        def set_ok(self, cookie, request):
+            return False  # cookies are passed per request, never kept in shared session
+
+    class HTTPConnectionPool(urllib3.HTTPConnectionPool):
+
+        def _new_conn(self):
+            Network._count('connections')
+            return super()._new_conn()
+
+    class HTTPSConnectionPool(urllib3.HTTPSConnectionPool):
+
+        def _new_conn(self):
+            Network._count('connections')
+            return super()._new_conn()
+
+    class HTTPAdapter(requests.adapters.HTTPAdapter):
+
+        def init_poolmanager(self, *args, **kwargs):
+            super().init_poolmanager(*args, **kwargs)
+            self.poolmanager.pool_classes_by_scheme = {
+                'http': Network.HTTPConnectionPool,
+                'https': Network.HTTPSConnectionPool,
+            }
+
+    @staticmethod
+    def _create_session():
+        _retries = urllib3.util.Retry(
+            total=settings.FRAMARAMA['NETWORK_RETRIES'],
+            backoff_factor=settings.FRAMARAMA['NETWORK_RETRY_BACKOFF'],
+            status_forcelist=Network.RETRY_STATUS,
+            raise_on_status=False)
+        _adapter = Network.HTTPAdapter(
+            pool_connections=settings.FRAMARAMA['NETWORK_POOL_SIZE'],
+            pool_maxsize=settings.FRAMARAMA['NETWORK_POOL_SIZE'],
+            max_retries=_retries)
+        _session = requests.Session()
+        _session.cookies.set_policy(Network.CookiePolicy())
+        _session.mount('http://', _adapter)
+        _session.mount('https://', _adapter)
+        return _session
+
+    @staticmethod
+    def session():
+        with Network._lock:
+            if Network._session is None:
+                Network._session = Network._create_session()
+            return Network._session
+
+    @staticmethod
+    def download_cache(server=False):
+        ''' Returns the download cache of the frontend (or the server) '''
+        if server:
+            _path, _size, _free = Network.CACHE_DOWNLOAD_SERVER_PATH, settings.FRAMARAMA['CONFIG_DOWNLOAD_CACHE_SIZE'], None
+        else:
+            _path, _size, _free = Network.CACHE_DOWNLOAD_PATH, settings.FRAMARAMA['FRONTEND_DOWNLOAD_CACHE_SIZE'], settings.FRAMARAMA['FRONTEND_CACHE_FREE']
+        if not _size:
+            return None
+        with Network._lock:
+            _cache = Network._download_caches.get(_path)
+            if _cache is None:
+                _cache = DownloadCache(_path, _size, _free)
+                Network._download_caches[_path] = _cache
+            return _cache
+
+    @staticmethod
+    def _empty_stats():
+        return {
+            'requests': 0,
+            'errors': 0,
+            'connections': 0,
+            'bytes': 0,
+            'latency': {str(_bucket): 0 for _bucket in Network.LATENCY_BUCKETS + ['inf']},
+        }
+
+    @staticmethod
+    def _count(name, value=1, latency=None):
+        with Network._lock:
+            if Network._stats is None:
+                Network._stats = Network._empty_stats()
+            Network._stats[name] = Network._stats[name] + value
+            if latency is not None:
+                _bucket = str(next((_bucket for _bucket in Network.LATENCY_BUCKETS if latency <= _bucket), 'inf'))
+                Network._stats['latency'][_bucket] = Network._stats['latency'][_bucket] + 1
+
+    @staticmethod
+    def get_stats():
+        with Network._lock:
+            _stats = Network._stats if Network._stats else Network._empty_stats()
+            _stats = dict(_stats, latency=dict(_stats['latency']))
+        _stats['reused'] = max(0, _stats['requests'] - _stats['connections'])
+        return _stats
+
+    @staticmethod
+    def reset():
+        with Network._lock:
+            if Network._session:
+                Network._session.close()
+            Network._session = None
+            Network._stats = None
 
     @staticmethod
     def get_url(url, method, data=None, headers=None, user_agent={}, **kwargs):
         _headers = {}
-        _headers['Connection'] = 'close'
         _headers['User-Agent'] = '/'.join(['framaRAMA'] + [_t+':'+str(_v) for _t, _v in user_agent.items() if _v])
         _headers.update(headers or {})
-        if method == Network.METHOD_GET:
-            _response = requests.get(url, timeout=(15, 30), headers=_headers, **kwargs)
-        elif method == Network.METHOD_POST:
+        kwargs.setdefault('timeout', tuple(settings.FRAMARAMA['NETWORK_TIMEOUT']))
+        if method == Network.METHOD_POST:
             if 'Content-Type' not in _headers:
                 _headers['Content-Type'] = 'application/json; charset=utf-8'
                 kwargs['json'] = data
             else:
                 kwargs['data'] = data
-            _response = requests.post(url, timeout=(15, 30), headers=_headers, **kwargs)
-        else:
+        elif method != Network.METHOD_GET:
             raise Exception("Can not handle HTTP method {}".format(method))
+        try:
+            _response = Network.session().request(method, url, headers=_headers, **kwargs)
+        except Exception as e:
+            Network._count('errors')
+            raise e
+        if kwargs.get('stream'):
+            _bytes = int(_response.headers.get('Content-Length', 0))
+        else:
+            _bytes = len(_response.content)
+        Network._count('requests', latency=_response.elapsed.total_seconds())
+        Network._count('bytes', _bytes)
         return _response
 
 
@@ -653,13 +991,28 @@ class Template:
         _env.filters['keys'] = lambda v: dict(v).keys()
         return _env
 
+    @staticmethod
+    @functools.cache
+    def _environment():
+        return Template._env(undefined=Template.IgnoreUndefined)
+
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def _compile(template):
+        return Template._environment().from_string(template)
+
+    @staticmethod
+    def is_static(template):
+        # Text without any markers (and newlines to normalize) renders as is
+        return '{{' not in template and '{%' not in template and '{#' not in template and '\r' not in template
+
     @staticmethod
     def render(template, globals_vars={}):
         if template is None:
             return None
-        _env = Template._env(undefined=Template.IgnoreUndefined)
-        _env.globals.update(globals_vars)
-        return _env.from_string(template).render()
+        if Template.is_static(template):
+            return template
+        return Template._compile(template).render(globals_vars)
 
     @staticmethod
     def parse(template):
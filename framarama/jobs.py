@@ -5,6 +5,7 @@ from django.utils import timezone
 
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.events import EVENT_JOB_SUBMITTED, EVENT_JOB_EXECUTED, EVENT_JOB_ERROR
+from apscheduler.jobstores.base import JobLookupError
 
 
 class Scheduler:
@@ -54,6 +55,20 @@ class Scheduler:
         else:
             self._add_job(_job_id, func, *args, **kwargs)
 
+    def debounce_job(self, job_id, instance=None, delay=None, *args, **kwargs):
+        if job_id in self._jobs:
+            _job = self._jobs.get(job_id)
+            _func = _job.get(Scheduler.JOB_PARAM_FUNC)
+            _name = _job.get(Scheduler.JOB_PARAM_NAME) + ' triggered'
+            _job_id = self._job_id(job_id, instance)
+            _run_date = timezone.now() + datetime.timedelta(seconds=delay if delay else 0)
+            try:
+                # Postpone pending run instead of adding another one
+                self._scheduler.reschedule_job(_job_id, trigger='date', run_date=_run_date)
+            except JobLookupError:
+                self._add_job(_job_id, _func, trigger='date', run_date=_run_date, name=_name, func_args=args, func_kwargs=kwargs)
+            return _job_id
+
     def add_job(self, job_id, func, trigger='interval', *args, **kwargs):
         self._add_job(job_id, func, trigger=trigger, *args, **kwargs)
 
@@ -112,6 +112,9 @@ LOGGING = {
             'handlers': ['console'],
             'propagate': False,
         },
+        'PIL': {
+            'level': 'INFO',
+        },
     },
     'root': {
         'handlers': ['console'],
@@ -230,16 +233,33 @@ FRAMARAMA = {
     'API_URL': 'http://127.0.0.1:' + environ.get('FRAMARAMA_PORT', '8000'),
     'IMAGE_PROCESSING_ADAPTER': 'config.utils.finishing.WandImageProcessingAdapter',
     'GIT_REMOTE': 'origin',
+    'NETWORK_TIMEOUT': [15, 30],
+    'NETWORK_RETRIES': 3,
+    'NETWORK_RETRY_BACKOFF': 0.5,
+    'NETWORK_POOL_SIZE': 10,
     'AP_NAME': 'framaRAMA',
     'AP_PASS': 'framarama',
     'FRONTEND_KEYSTROKES': False,
     'FRONTEND_ITEM_UPDATE_INTERVAL': '00:05:00',
+    'FRONTEND_ITEM_QUEUE_SIZE': 10,
     'FRONTEND_THUMBNAIL_SIZE': [640, 480],
+    'FRONTEND_FINISHING_CACHE_SIZE': 256 * 1024 * 1024,
+    'FRONTEND_DOWNLOAD_CACHE_SIZE': 256 * 1024 * 1024,
+    'FRONTEND_CACHE_FREE': 512 * 1024 * 1024,
     'FRONTEND_APP_UPDATE_INTERVAL': '23:00:00',
     'FRONTEND_APP_UPDATE_PRECMD': environ.get('FRAMARAMA_APP_UPDATE_PRECMD', ''),
     'FRONTEND_APP_UPDATE_POSTCMD': environ.get('FRAMARAMA_APP_UPDATE_POSTCMD', ''),
     'CONFIG_THUMBNAIL_SIZE': [640, 480],
+    'CONFIG_DOWNLOAD_CACHE_SIZE': 0,
     'CONFIG_SOURCE_UPDATE_INTERVAL': '23:00:00',
+    'CONFIG_SOURCE_IMPORT_CHUNK_SIZE': 1000,
+    'CONFIG_SOURCE_DIR_WORKERS': None,
     'CONFIG_SORTING_EVAL_QUERY': False,
+    'CONFIG_SORTING_RANK_MAX_AGE': '01:00:00',
+    'CONFIG_SORTING_RANK_DELAY': '00:00:10',
+    'CONFIG_SORTING_SAMPLER': True,
+    'CONFIG_SORTING_SHUFFLE': False,
+    'CONFIG_SORTING_SHUFFLE_WINDOW': 50,
+    'CONFIG_SORTING_SLOW': 2.0,
 }
 
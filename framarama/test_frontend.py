@@ -0,0 +1,55 @@
+from django import test
+
+from framarama.base import api, frontend
+
+
+class _ApiClient(api.ApiClient):
+
+    def __init__(self):
+        self._version = 1
+        self._upcoming = 0
+        self._next = 100
+
+    def _ranked(self, _id):
+        return {'id': _id, 'links': [], 'url': '/item{}.jpg'.format(_id), 'rank': _id, 'source': {'id': 1, 'links': []}}
+
+    def _request(self, path, *args, **kwargs):
+        if path == '/displays':
+            return {'results': [{'id': 1, 'links': [], 'name': 'Display', 'frame': {'id': 1, 'links': [], 'version': self._version}}]}
+        elif path.startswith('/displays/1/items/upcoming'):
+            self._upcoming = self._upcoming + 1
+            return {'count': 3, 'results': [self._ranked(self._upcoming * 10 + _i) for _i in range(3)]}
+        elif path.startswith('/displays/1/items/next'):
+            self._next = self._next + 1
+            return {'count': 1, 'results': [self._ranked(self._next)]}
+        raise Exception("Unexpected request {}".format(path))
+
+
+class _Display(frontend.Display):
+
+    def __init__(self, client):
+        self._client = client
+        self._data = client.get_display()
+        self._next = None
+        self._next_queue = frontend.collections.deque()
+        self._next_queue_version = None
+
+
+class DisplayNextItemTestCase(test.TestCase):
+
+    def _next(self, display):
+        return display.get_next_item(True).id
+
+    def test_queue(self):
+        _display = _Display(_ApiClient())
+        self.assertEqual(1, _display.frame().version)
+        self.assertEqual([10, 11, 12, 20], [self._next(_display) for _i in range(4)])
+
+    def test_queue_frame_changed(self):
+        _client = _ApiClient()
+        _display = _Display(_client)
+        self.assertEqual([10, 11], [self._next(_display) for _i in range(2)])
+        _client._version = 2
+        self.assertEqual([20, 21, 22], [self._next(_display) for _i in range(3)])
+        self.assertEqual(2, _display.frame().version)
+
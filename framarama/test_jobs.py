@@ -0,0 +1,36 @@
+import datetime
+
+from unittest import TestCase
+
+from django.utils import timezone
+
+from framarama import jobs
+
+
+class SchedulerTestCase(TestCase):
+
+    def setUp(self):
+        self._scheduler = jobs.Scheduler()
+        self._scheduler.register_job('job', lambda *args, **kwargs: None, manually=True, name='Job')
+
+    def test_debounce_job(self):
+        _job_id = self._scheduler.debounce_job('job', instance=1, delay=10, value=1)
+        self.assertEqual('job_1', _job_id)
+        _job = self._scheduler.get_job(_job_id)
+        self.assertEqual({'value': 1}, _job.kwargs)
+        self.assertEqual('Job triggered', _job.name)
+        _run_date = _job.trigger.run_date
+        self.assertAlmostEqual(10, (_run_date - timezone.now()).total_seconds(), delta=2)
+
+        # Another call postpones the pending run instead of adding another one
+        self.assertEqual(_job_id, self._scheduler.debounce_job('job', instance=1, delay=60, value=1))
+        self.assertEqual(1, len([_job for _job in self._scheduler._scheduler.get_jobs() if _job.id == _job_id]))
+        self.assertGreater(self._scheduler.get_job(_job_id).trigger.run_date, _run_date + datetime.timedelta(seconds=40))
+
+    def test_debounce_job_instances(self):
+        self._scheduler.debounce_job('job', instance=1, delay=10)
+        self._scheduler.debounce_job('job', instance=2, delay=10)
+        self.assertEqual(['job_1', 'job_2'], sorted([_job.id for _job in self._scheduler._scheduler.get_jobs()]))
+
+    def test_debounce_job_unknown(self):
+        self.assertIsNone(self._scheduler.debounce_job('unknown', instance=1))
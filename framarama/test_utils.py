@@ -1,11 +1,17 @@
 import os
 import datetime
 import zoneinfo
+import tempfile
 import jinja2
+import threading
+import http.server
+import requests
 
 from unittest import TestCase
 
+from django.conf import settings
 from django.utils import timezone
+from django.test import override_settings
 
 from framarama.base import utils
 from config.utils import context
@@ -226,6 +232,137 @@ class FilesystemTestCase(TestCase):
             self.assertEqual(_expected, utils.Filesystem.path_normalize(_path, root=_cwd, absolute=True))
 
 
+class FileCacheTestCase(TestCase):
+
+    def test_get(self):
+        with tempfile.TemporaryDirectory() as _path:
+            _cache = utils.FileCache(_path, 1024)
+            _key = utils.FileCache.key('item', 1)
+            self.assertIsNone(_cache.get(_key, ['image', 'json']))
+            _cache.put(_key, {'image': b'data', 'json': b'{}'})
+            _files = _cache.get(_key, ['image', 'json'])
+            self.assertEqual(b'data', utils.Filesystem.file_read(_files['image']))
+            self.assertEqual({'hits': 1, 'misses': 1, 'evictions': 0, 'size': 6}, _cache.get_stats())
+
+    def test_key(self):
+        self.assertEqual(utils.FileCache.key({'a': 1, 'b': 2}), utils.FileCache.key({'b': 2, 'a': 1}))
+        self.assertNotEqual(utils.FileCache.key({'a': 1}), utils.FileCache.key({'a': 2}))
+
+    def test_evict(self):
+        with tempfile.TemporaryDirectory() as _path:
+            _cache = utils.FileCache(_path, 10)
+            _cache.put('a', {'image': b'12345'})
+            os.utime(_cache.file('a', 'image'), (1, 1))
+            _cache.put('b', {'image': b'12345'})
+            os.utime(_cache.file('b', 'image'), (2, 2))
+            _cache.get('a', ['image'])  # recently used
+            _cache.put('c', {'image': b'12345'})
+            self.assertIsNotNone(_cache.get('a', ['image']))
+            self.assertIsNone(_cache.get('b', ['image']))
+            self.assertIsNotNone(_cache.get('c', ['image']))
+            self.assertEqual(1, _cache.get_stats()['evictions'])
+
+    def test_size(self):
+        with tempfile.TemporaryDirectory() as _path:
+            _cache = utils.FileCache(_path, 1024)
+            _cache.put('a', {'image': b'12345', 'preview': b'12'})
+            _cache.put('b', {'image': b'123'})
+            self.assertEqual(10, _cache.get_stats()['size'])
+            _cache.put('a', {'image': b'1', 'preview': b'1'})
+            self.assertEqual(5, _cache.get_stats()['size'])
+            _cache.remove('b')
+            self.assertEqual(2, _cache.get_stats()['size'])
+
+    def test_size_scan(self):
+        with tempfile.TemporaryDirectory() as _path:
+            _cache = utils.FileCache(_path, 1024)
+            _cache.put('a', {'image': b'12345'})
+            utils.Filesystem.file_write(os.path.join(_path, 'other.image'), b'123')  # added by another process
+            _cache.put('b', {'image': b'12'})
+            self.assertEqual(7, _cache.get_stats()['size'])
+            _cache._scanned = _cache._scanned - utils.FileCache.SCAN_INTERVAL
+            _cache.put('c', {'image': b'1'})
+            self.assertEqual(11, _cache.get_stats()['size'])
+
+    def test_evict_free(self):
+        with tempfile.TemporaryDirectory() as _path:
+            _cache = utils.FileCache(_path, 1024, min_free=100, free=lambda: 95)
+            _cache.put('a', {'image': b'12345', 'preview': b'12'})
+            self.assertIsNone(_cache.get('a', ['image']))
+            self.assertEqual([], os.listdir(_path))
+
+
+class DownloadCacheTestCase(TestCase):
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        requests = []
+
+        def do_GET(self):
+            DownloadCacheTestCase.Handler.requests.append(self.headers.get('If-None-Match'))
+            if self.headers.get('If-None-Match') == '"v1"':
+                self.send_response(304)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/jpeg')
+            self.send_header('Content-Length', '4')
+            self.send_header('ETag', '"v1"')
+            self.end_headers()
+            self.wfile.write(b'jpeg')
+
+        def log_message(self, *args):
+            pass
+
+    def setUp(self):
+        DownloadCacheTestCase.Handler.requests = []
+        self._server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), DownloadCacheTestCase.Handler)
+        self._url = 'http://127.0.0.1:{}/image.jpg'.format(self._server.server_address[1])
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _request(self, url, headers):
+        return utils.Network.get_url(url, utils.Network.METHOD_GET, headers=headers, stream=True)
+
+    def test_download(self):
+        with tempfile.TemporaryDirectory() as _path:
+            _cache = utils.DownloadCache(_path, 1024)
+            _file, _mime = _cache.download(self._url, self._request)
+            self.assertEqual(b'jpeg', utils.Filesystem.file_read(_file))
+            self.assertEqual('image/jpeg', _mime)
+            self.assertEqual((_file, _mime), _cache.download(self._url, self._request))
+            self.assertEqual([None, '"v1"'], DownloadCacheTestCase.Handler.requests)
+
+    def test_download_offline(self):
+        with tempfile.TemporaryDirectory() as _path:
+            _cache = utils.DownloadCache(_path, 1024)
+            _file, _mime = _cache.download(self._url, self._request)
+            def _error(url, headers):
+                raise Exception("Not reachable")
+            self.assertEqual((_file, _mime), _cache.download(self._url, _error))
+            with self.assertRaises(Exception):
+                _cache.download(self._url + '?other', _error)
+
+    def test_download_too_large(self):
+        with tempfile.TemporaryDirectory() as _path:
+            _cache = utils.DownloadCache(_path, 1)
+            _file, _mime = _cache.download(self._url, self._request)
+            self.assertEqual(b'jpeg', utils.Filesystem.file_read(_file))
+
+    def test_download_cache_server(self):
+        _settings = settings.FRAMARAMA | {'FRONTEND_DOWNLOAD_CACHE_SIZE': 0, 'CONFIG_DOWNLOAD_CACHE_SIZE': 1024}
+        with override_settings(FRAMARAMA=_settings):
+            self.assertIsNone(utils.Network.download_cache())
+            _cache = utils.Network.download_cache(server=True)
+            self.assertEqual(utils.Network.CACHE_DOWNLOAD_SERVER_PATH, _cache._path)
+            self.assertIs(_cache, utils.Network.download_cache(server=True))
+        utils.Network._download_caches.pop(utils.Network.CACHE_DOWNLOAD_SERVER_PATH)
+
+
 class ProcessTestCase(TestCase):
 
     def test_exec_run(self):
@@ -577,6 +714,15 @@ class ListTestCase(TestCase):
         for _result in utils.Lists.chunked(_data, 10):
             self.assertEqual(10, len(_result))
 
+    def test_chunked_items(self):
+        _data = (_i for _i in range(1, 26))
+        _result = list(utils.Lists.chunked(_data, 10))
+        self.assertEqual([10, 10, 5], [len(_batch) for _batch in _result])
+        self.assertEqual(list(range(1, 26)), [_i for _batch in _result for _i in _batch])
+
+    def test_chunked_empty(self):
+        self.assertEqual([], list(utils.Lists.chunked([], 10)))
+
     def test_process(self):
         for sstart, send, tstart, tend, ccnt, ucnt, dcnt in [
             (1, 51,  1, 51,  0, 50,  0),
@@ -719,6 +865,119 @@ class ListTestCase(TestCase):
         self.assertEquals(22, _result[1]['children'][1]['id'])
 
 
+class KeysetPageTestCase(TestCase):
+
+    def _page(self, items, direction=None):
+        return utils.KeysetPage(items, 3, lambda item: [item], direction)
+
+    def test_first(self):
+        _page = self._page([1, 2, 3, 4])
+        self.assertEqual([1, 2, 3], list(_page))
+        self.assertFalse(_page.has_previous())
+        self.assertTrue(_page.has_next())
+        self.assertEqual((utils.KeysetPage.AFTER, [3]), utils.KeysetPage.cursor({'after': _page.next_cursor()}))
+
+    def test_last(self):
+        _page = self._page([7, 8], utils.KeysetPage.AFTER)
+        self.assertEqual([7, 8], list(_page))
+        self.assertTrue(_page.has_previous())
+        self.assertFalse(_page.has_next())
+        self.assertIsNone(_page.next_cursor())
+        self.assertEqual((utils.KeysetPage.BEFORE, [7]), utils.KeysetPage.cursor({'before': _page.previous_cursor()}))
+
+    def test_before(self):
+        _page = self._page([6, 5, 4, 3], utils.KeysetPage.BEFORE)
+        self.assertEqual([4, 5, 6], list(_page))
+        self.assertTrue(_page.has_previous())
+        self.assertTrue(_page.has_next())
+
+    def test_empty(self):
+        _page = self._page([], utils.KeysetPage.AFTER)
+        self.assertEqual(0, len(_page))
+        self.assertFalse(_page.has_previous())
+        self.assertFalse(_page.has_next())
+
+    def test_cursor_invalid(self):
+        self.assertEqual((None, None), utils.KeysetPage.cursor({'after': 'invalid'}))
+        self.assertEqual((None, None), utils.KeysetPage.cursor({}))
+
+    def test_size(self):
+        self.assertEqual(20, utils.KeysetPage.size({}))
+        self.assertEqual(5, utils.KeysetPage.size({'page_size': '5'}))
+        self.assertEqual(100, utils.KeysetPage.size({'page_size': '1000'}))
+        self.assertEqual(20, utils.KeysetPage.size({'page_size': 'invalid'}))
+        self.assertEqual(20, utils.KeysetPage.size({'page_size': '0'}))
+        self.assertEqual(20, utils.KeysetPage.size({'page_size': '-5'}))
+
+    def test_cursor_values(self):
+        _encode = utils.KeysetPage.encode
+        self.assertEqual((utils.KeysetPage.AFTER, [1.5, 3]), utils.KeysetPage.cursor({'after': _encode([1.5, 3])}, 2))
+        self.assertEqual((None, None), utils.KeysetPage.cursor({'after': _encode([1.5])}, 2))
+        self.assertEqual((None, None), utils.KeysetPage.cursor({'after': _encode([1.5, 3, 4])}, 2))
+        self.assertEqual((None, None), utils.KeysetPage.cursor({'after': _encode({'weight': 1.5})}, 2))
+        self.assertEqual((None, None), utils.KeysetPage.cursor({'before': _encode(['1.5', None])}, 2))
+        self.assertEqual((None, None), utils.KeysetPage.cursor({'before': _encode(1)}))
+
+
+class NetworkTestCase(TestCase):
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            _body = b'{"cookie": "' + self.headers.get('Cookie', '').encode() + b'"}'
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(_body)))
+            self.send_header('Set-Cookie', 'session=abc')
+            self.end_headers()
+            self.wfile.write(_body)
+
+        def log_message(self, *args):
+            pass
+
+    def setUp(self):
+        utils.Network.reset()
+        self._server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), NetworkTestCase.Handler)
+        self._url = 'http://127.0.0.1:{}/'.format(self._server.server_address[1])
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        utils.Network.reset()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def test_get_url_reuse(self):
+        for _i in range(3):
+            self.assertEqual(200, utils.Network.get_url(self._url, utils.Network.METHOD_GET).status_code)
+        _stats = utils.Network.get_stats()
+        self.assertEqual(3, _stats['requests'])
+        self.assertEqual(1, _stats['connections'])
+        self.assertEqual(2, _stats['reused'])
+        self.assertEqual(3 * len(b'{"cookie": ""}'), _stats['bytes'])
+        self.assertEqual(3, sum(_stats['latency'].values()))
+
+    def test_get_url_cookies(self):
+        _response = utils.Network.get_url(self._url, utils.Network.METHOD_GET)
+        self.assertEqual({'session': 'abc'}, requests.utils.dict_from_cookiejar(_response.cookies))
+        self.assertEqual({'cookie': ''}, utils.Network.get_url(self._url, utils.Network.METHOD_GET).json())
+        self.assertEqual({'cookie': 'a=b'}, utils.Network.get_url(self._url, utils.Network.METHOD_GET, cookies={'a': 'b'}).json())
+
+    def test_get_url_error(self):
+        _retries = settings.FRAMARAMA['NETWORK_RETRIES']
+        settings.FRAMARAMA['NETWORK_RETRIES'] = 0
+        try:
+            with self.assertRaises(Exception):
+                utils.Network.get_url('http://127.0.0.1:1/', utils.Network.METHOD_GET)
+        finally:
+            settings.FRAMARAMA['NETWORK_RETRIES'] = _retries
+        self.assertEqual(1, utils.Network.get_stats()['errors'])
+
+    def test_get_url_method(self):
+        with self.assertRaises(Exception):
+            utils.Network.get_url(self._url, 'DELETE')
+
+
 class TemplateTestCase(TestCase):
 
     def test_render_none(self):
@@ -791,6 +1050,21 @@ hello \"\"\" world \"\"\"
 """
         self.assertEqual('\n<html>\n<head>\n  <script>\n  function dummy() {\n    return \'hello world\';\n  }\n  </script>\n</head>\n<body/>\n</html>\n', utils.Template.render(_text))
 
+    def test_render_cached(self):
+        self.assertEqual('first', utils.Template.render('{{test}}', {'test': 'first'}))
+        self.assertEqual('second', utils.Template.render('{{test}}', {'test': 'second'}))
+        self.assertEqual('', utils.Template.render('{{test}}'))
+
+    def test_render_newlines(self):
+        self.assertEqual('hello\nworld', utils.Template.render('hello\r\nworld'))
+
+    def test_is_static(self):
+        self.assertTrue(utils.Template.is_static('hello world'))
+        self.assertTrue(utils.Template.is_static('{ "json": true }'))
+        self.assertFalse(utils.Template.is_static('{{test}}'))
+        self.assertFalse(utils.Template.is_static('{% if test %}{% endif %}'))
+        self.assertFalse(utils.Template.is_static('{# comment #}'))
+
     def test_parse_none(self):
         utils.Template.parse(None)
 